@@ -1 +1,23 @@
-__version__ = "1.0.0"
\ No newline at end of file
+import importlib
+
+# subpackages and top-level helpers are loaded on first access (PEP 562):
+# `import aetherpy` imports neither Numba nor rasterio or matplotlib
+_SUBMODULES = ("accel", "core", "data", "io")
+_EXPORTS = {
+    "warmup": "accel.numba_kernels",
+}
+
+__all__ = ["warmup"]
+
+def __getattr__(name):
+    if name in _SUBMODULES:
+        return importlib.import_module(f".{name}", __name__)
+    if name in _EXPORTS:
+        value = getattr(importlib.import_module(f".{_EXPORTS[name]}", __name__),
+                        name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__) | set(_SUBMODULES))
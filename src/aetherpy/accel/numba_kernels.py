@@ -0,0 +1,169 @@
+# aetherpy/accel/numba_kernels.py
+
+import importlib
+import time
+import numpy as np
+
+__all__ = ["KERNEL_MODULES", "kernels", "warmup"]
+
+# modules defining Numba kernels; every kernel is compiled with cache=True,
+# so compiled machine code is kept in the module's __pycache__ (or in
+# NUMBA_CACHE_DIR) and reused by later processes
+KERNEL_MODULES = (
+    "aetherpy.core.utils",
+    "aetherpy.core.los",
+    "aetherpy.core.links",
+    "aetherpy.core.raycast",
+    "aetherpy.core.templates",
+    "aetherpy.core.constrained",
+    "aetherpy.core.sweep",
+    "aetherpy.core.cumulative",
+    "aetherpy.core.multiobserver",
+    "aetherpy.core.siting",
+    "aetherpy.core.incremental",
+    "aetherpy.core.visibility_matrix",
+    "aetherpy.data.pyramid",
+)
+
+def kernels():
+    """
+    All Numba kernels of aetherpy, as {"module.name": dispatcher}.
+    """
+    from numba.core.registry import CPUDispatcher
+
+    found = {}
+    for name in KERNEL_MODULES:
+        module = importlib.import_module(name)
+        for attr, obj in vars(module).items():
+            if (isinstance(obj, CPUDispatcher)
+                    and obj.py_func.__module__ == name):
+                found[f"{name}.{attr}"] = obj
+    return found
+
+def warmup(dtypes=(np.float64,), readonly=False, verbose=False):
+    """
+    Compile (or load from the on-disk cache) every kernel variant used by
+    the public functions, so that the first real call pays no JIT latency.
+
+    Each variant – nearest and bilinear sampling, with and without Earth
+    curvature, every viewshed engine and output – is run once on a tiny
+    synthetic DEM. With a warm cache this takes well under a second; run
+    it once when building an image or at worker start-up.
+
+    Parameters
+    ----------
+    dtypes : sequence of dtypes
+        DEM dtypes to compile for: float64 (DEM default), float32 (native
+        dtype of many LazyDEM rasters) and/or int16, int32 (quantized
+        DEM precisions).
+    readonly : bool
+        Also compile for read-only DEM arrays, as handed out by memory-
+        mapped LazyDEM caches and the "process" backend.
+    verbose : bool
+        Print the time spent on every variant group.
+
+    Returns
+    -------
+    seconds : float
+        Total warm-up time.
+    """
+    from ..core.cumulative import cumulative_viewshed
+    from ..core.incremental import ViewshedCache, InverseVisibilityCache
+    from ..core.links import link_profile, link_clearance
+    from ..core.los import is_visible, is_visible_many, clearance_many
+    from ..core.multiobserver import inverse_visibility
+    from ..core.raycast import raycast
+    from ..core.siting import visibility_signatures, greedy_sites
+    from ..core.sweep import (ENGINES, _viewshed, _viewshed_heights,
+                              viewshed_batch)
+    from ..core.utils import parse_constraints
+    from ..data.loader import DEM
+
+    yy, xx = np.mgrid[:12, :12]
+    terrain = 3.0 * np.sin(xx / 2.0) * np.cos(yy / 3.0)
+    targets = np.zeros(terrain.shape, dtype=bool)
+    targets[5:7, 5:7] = True
+    src, dst = [(1, 1), (10, 3)], [(8, 9), (2, 10)]
+
+    t_start = time.perf_counter()
+    for dtype in dtypes:
+        for ro in ((False, True) if readonly else (False,)):
+            dem = DEM(terrain.astype(dtype), dtype=None)
+            if ro:
+                dem.array.flags.writeable = False
+            for interpolation in ("nearest", "bilinear"):
+                for k in (0.0, 1.3):
+                    t0 = time.perf_counter()
+                    constraints = parse_constraints(6.0)
+                    for engine in ENGINES:
+                        for output in ("mask", "horizon"):
+                            _viewshed(dem, (5, 5), 1.0, constraints,
+                                      interpolation, k, engine, output)
+                        _viewshed(dem, (5, 5), 1.0, parse_constraints(),
+                                  interpolation, k, engine)
+                        viewshed_batch(dem, src, max_dist=6.0,
+                                       interpolation=interpolation,
+                                       curvature_k=k, engine=engine)
+                        cumulative_viewshed(dem, src, max_dist=6.0,
+                                            interpolation=interpolation,
+                                            curvature_k=k, engine=engine)
+                        cumulative_viewshed(dem, src, weights=[1.0, 2.0],
+                                            interpolation=interpolation,
+                                            curvature_k=k, engine=engine)
+                    _viewshed_heights(dem, (5, 5), [1.0, 4.0], constraints,
+                                      interpolation, k, "mask", False, 0.0)
+                    for pyramid in (None, True):
+                        is_visible(dem, src[0], dst[0], 1.0, 0.0,
+                                   interpolation, k, pyramid=pyramid)
+                        is_visible_many(dem, src, dst, 1.0, 0.0,
+                                        interpolation, k, pyramid=pyramid)
+                    clearance_many(dem, src, dst, 1.0, 0.0, interpolation, k)
+                    link_profile(dem, src[0], dst[0], 1.0, 0.0, 5.8e9,
+                                 interpolation, k)
+                    link_clearance(dem, src, dst, 1.0, 0.0, 5.8e9,
+                                   interpolation, k)
+                    for pyramid in (None, True):
+                        raycast(dem, [(1.0, 1.5, 4.0)], [(8.5, 9.0, 0.0)],
+                                "grid", interpolation, k, pyramid)
+                    for engine in ("naive", "r2"):
+                        inverse_visibility(dem, targets, obs_h=1.0,
+                                           interpolation=interpolation,
+                                           max_dist=6.0, curvature_k=k,
+                                           engine=engine)
+                        inverse_visibility(dem, targets, obs_h=1.0,
+                                           interpolation=interpolation,
+                                           max_dist=6.0, curvature_k=k,
+                                           engine=engine, return_matrix=True)
+                        inverse_visibility(dem, targets, obs_h=[1.0, 4.0],
+                                           interpolation=interpolation,
+                                           max_dist=6.0, curvature_k=k,
+                                           engine=engine)
+                        sig = visibility_signatures(
+                            dem, targets, obs_h=1.0,
+                            interpolation=interpolation, max_dist=6.0,
+                            curvature_k=k, engine=engine)
+                    inverse_visibility(dem, targets, obs_h=1.0, tgt_h=1.0,
+                                       interpolation=interpolation,
+                                       max_dist=6.0, curvature_k=k,
+                                       symmetric=True)
+                    greedy_sites(sig, 2)
+                    greedy_sites(sig, 2, lazy=False)
+                    # incremental updates after an edit of a private copy
+                    edited = DEM(terrain.astype(dtype), dtype=None)
+                    caches = [ViewshedCache(edited, src, 1.0, 6.0,
+                                            interpolation, curvature_k=k,
+                                            engine=engine)
+                              for engine in ENGINES]
+                    caches += [InverseVisibilityCache(edited, targets, 1.0,
+                                                      interpolation, 6.0,
+                                                      curvature_k=k,
+                                                      engine=engine)
+                               for engine in ("naive", "r2")]
+                    edited.edit(6, 2, [[5.0]])
+                    for cache in caches:
+                        cache.update()
+                    if verbose:
+                        print(f"warmup {np.dtype(dtype).name}"
+                              f"{' read-only' if ro else ''} {interpolation} "
+                              f"k={k}: {time.perf_counter() - t0:.2f} s")
+    return time.perf_counter() - t_start
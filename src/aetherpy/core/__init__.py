@@ -1,4 +1,32 @@
-from .los   import is_visible
-from .sweep import viewshed_sweep
+import importlib
 
-__all__ = ["is_visible", "viewshed_sweep"]
+# public name → submodule; submodules (and Numba) are imported on first
+# access (PEP 562), so `import aetherpy.core` itself is cheap
+_EXPORTS = {
+    "is_visible":          "los",
+    "is_visible_many":     "los",
+    "clearance_many":      "los",
+    "viewshed_sweep":      "sweep",
+    "viewshed_batch":      "sweep",
+    "iter_viewsheds":      "sweep",
+    "cumulative_viewshed": "cumulative",
+    "link_profile":        "links",
+    "link_clearance":      "links",
+    "raycast":             "raycast",
+    "surface_points":      "raycast",
+    "ViewshedCache":       "incremental",
+    "InverseVisibilityCache": "incremental",
+}
+
+__all__ = list(_EXPORTS)
+
+def __getattr__(name):
+    if name in _EXPORTS:
+        value = getattr(importlib.import_module(f".{_EXPORTS[name]}", __name__),
+                        name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
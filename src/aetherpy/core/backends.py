@@ -0,0 +1,197 @@
+# aetherpy/core/backends.py
+
+import os
+import mmap
+import multiprocessing
+import numpy as np
+from collections import deque
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+from numba import get_num_threads, set_num_threads, parallel_chunksize, config
+
+BACKENDS = ("numba", "process", "joblib")
+
+__all__ = ["BACKENDS"]
+
+def n_workers(n_jobs=None):
+    """
+    Number of workers for an `n_jobs` value: None → all cores, negative
+    values count back from the number of cores as in joblib (-1 = all).
+    """
+    n_cpu = os.cpu_count() or 1
+    if n_jobs is None:
+        return n_cpu
+    n_jobs = int(n_jobs)
+    if n_jobs == 0:
+        raise ValueError("n_jobs must not be 0")
+    return max(1, n_jobs if n_jobs > 0 else n_cpu + 1 + n_jobs)
+
+def check_backend(backend):
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend {backend!r}; expected one of {BACKENDS}")
+
+def task_chunks(n, workers, chunk_size=None):
+    """
+    Split task indices 0…n-1 into contiguous chunks, by default about four
+    per worker so that the pool can balance uneven chunks.
+    """
+    if chunk_size is None:
+        chunk_size = -(-n // (4 * workers))
+    chunk_size = max(1, int(chunk_size))
+    return [np.arange(i, min(i + chunk_size, n)) for i in range(0, n, chunk_size)]
+
+@contextmanager
+def numba_schedule(n_tasks, n_jobs=None, chunk_size=None):
+    """
+    Run the parallel kernels of the block on min(n_tasks, n_jobs) Numba
+    threads, with `prange` iterations handed out dynamically in chunks of
+    `chunk_size` (default 1) instead of one static block per thread.
+    Kernels keep per-thread state indexed by `numba.get_thread_id()`;
+    yields the number of threads.
+    """
+    prev = get_num_threads()
+    limit = prev if n_jobs is None else min(n_workers(n_jobs),
+                                            config.NUMBA_NUM_THREADS)
+    n_threads = max(1, min(n_tasks, limit))
+    set_num_threads(n_threads)
+    try:
+        with parallel_chunksize(1 if chunk_size is None else int(chunk_size)):
+            yield n_threads
+    finally:
+        set_num_threads(prev)
+
+def map_chunks(func, shared, chunks, args=(), backend="process", n_jobs=None):
+    """
+    Evaluate `func(*shared, chunk, *args)` for every chunk of task indices
+    in worker processes and return the results in completion order.
+
+    The arrays in `shared` (DEM and masks) are handed to the workers once:
+    "process" places them in shared memory – or reopens them, if they are
+    np.memmap views of a file – and "joblib" lets joblib memory-map them.
+    Workers run the Numba kernels on a single thread each; chunks are
+    picked up by whichever worker is free. Workers are started from a fork
+    server (spawned on Windows), since forking a process whose Numba
+    thread pool is running is not safe.
+    """
+    workers = min(n_workers(n_jobs), len(chunks))
+    if workers == 0:
+        return []
+    if backend == "joblib":
+        from joblib import Parallel, delayed
+        return Parallel(n_jobs=workers)(
+            delayed(_single_threaded)(func, shared, chunk, args)
+            for chunk in chunks
+        )
+
+    with _shared_pool(shared, workers) as pool:
+        futures = [pool.submit(_run_shared, func, chunk, args)
+                   for chunk in chunks]
+        return [f.result() for f in as_completed(futures)]
+
+def imap_chunks(func, shared, chunks, args=(), backend="process",
+                n_jobs=None, prefetch=2):
+    """
+    Like `map_chunks`, but a generator yielding the results in the order of
+    `chunks` while at most `workers + prefetch` chunks are in flight, so
+    that the results held at any time stay bounded however many chunks
+    there are.
+    """
+    workers = min(n_workers(n_jobs), len(chunks))
+    if workers == 0:
+        return
+    depth = workers + max(0, int(prefetch))
+    if backend == "joblib":
+        from joblib import Parallel, delayed
+        yield from Parallel(n_jobs=workers, return_as="generator",
+                            pre_dispatch=depth)(
+            delayed(_single_threaded)(func, shared, chunk, args)
+            for chunk in chunks
+        )
+        return
+
+    with _shared_pool(shared, workers) as pool:
+        pending = deque()
+        todo = iter(chunks)
+        for chunk in todo:
+            pending.append(pool.submit(_run_shared, func, chunk, args))
+            if len(pending) >= depth:
+                break
+        try:
+            while pending:
+                result = pending.popleft().result()
+                for chunk in todo:
+                    pending.append(pool.submit(_run_shared, func, chunk, args))
+                    break
+                yield result
+        finally:
+            # consumer stopped early: drop the chunks not yet started
+            for future in pending:
+                future.cancel()
+
+@contextmanager
+def _shared_pool(shared, workers):
+    """
+    Process pool whose workers hold the `shared` arrays (see `_share`);
+    the shared memory is released on exit.
+    """
+    specs, handles = [], []
+    try:
+        for a in shared:
+            spec, shm = _share(a)
+            specs.append(spec)
+            if shm is not None:
+                handles.append(shm)
+        with ProcessPoolExecutor(max_workers=workers, mp_context=_context(),
+                                 initializer=_init_worker,
+                                 initargs=(specs,)) as pool:
+            yield pool
+    finally:
+        for shm in handles:
+            shm.close()
+            shm.unlink()
+
+def _context():
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context(
+        "forkserver" if "forkserver" in methods else "spawn")
+
+def _share(a):
+    """
+    Worker-side description of a shared array and the parent's handle.
+    """
+    if isinstance(a, np.memmap) and isinstance(a.base, mmap.mmap):
+        return ("memmap", a.filename, a.shape, a.dtype.str, a.offset), None
+    a = np.ascontiguousarray(a)
+    if a.nbytes == 0:
+        return ("array", a), None
+    shm = shared_memory.SharedMemory(create=True, size=a.nbytes)
+    np.ndarray(a.shape, a.dtype, buffer=shm.buf)[...] = a
+    return ("shm", shm.name, a.shape, a.dtype.str), shm
+
+_WORKER = {}
+
+def _init_worker(specs):
+    set_num_threads(1)
+    arrays, handles = [], []
+    for spec in specs:
+        if spec[0] == "array":
+            arrays.append(spec[1])
+        elif spec[0] == "memmap":
+            _, path, shape, dtype, offset = spec
+            arrays.append(np.memmap(path, dtype=dtype, mode="r",
+                                    offset=offset, shape=shape))
+        else:
+            _, name, shape, dtype = spec
+            shm = shared_memory.SharedMemory(name=name)
+            handles.append(shm)
+            arrays.append(np.ndarray(shape, dtype, buffer=shm.buf))
+    _WORKER["arrays"] = arrays
+    _WORKER["handles"] = handles
+
+def _run_shared(func, chunk, args):
+    return func(*_WORKER["arrays"], chunk, *args)
+
+def _single_threaded(func, shared, chunk, args):
+    set_num_threads(1)
+    return func(*shared, chunk, *args)
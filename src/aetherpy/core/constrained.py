@@ -0,0 +1,157 @@
+# aetherpy/core/constrained.py
+
+import functools
+import math
+import numpy as np
+from collections import namedtuple
+from numba import njit
+from .templates import TEMPLATE_MAX_BYTES
+from .utils import half_extent, in_constraints
+
+__all__ = ["ConstraintTemplate", "constraint_template", "sector_box"]
+
+# Namedtuple holding the translation-invariant part of the distance, azimuth
+# and elevation-angle filters of `in_constraints` for one parameter set.
+# Offsets (dr, dc) from the viewpoint are cells; inside/dist cover the box
+# r_lo <= dr <= r_hi, c_lo <= dc <= c_hi and are empty (0, 0) when the box
+# is unbounded or too large, in which case `admits` evaluates the filters
+# directly.
+ConstraintTemplate = namedtuple(
+    "ConstraintTemplate",
+    [
+        "res_y", "res_x",      # pixel size the template was built for
+        "maxd", "min_d",       # distance limits (maxd < 0 = unlimited)
+        "az1", "az2",          # azimuth sector (radians)
+        "elev_min", "elev_max",  # elevation-angle limits (radians)
+        "tan_min", "tan_max",  # their tangents (±inf when not limited)
+        "r_lo", "r_hi",        # row offsets of the sector's bounding box
+        "c_lo", "c_hi",        # column offsets of the sector's bounding box
+        "inside",              # bool: offset passes the distance/azimuth filters
+        "dist",                # float64 distance of the offset
+    ]
+)
+
+@njit(cache=True)
+def _in_sector(ang, az1, az2):
+    # azimuth test of `in_constraints`, wrap-around included
+    if az2 >= az1:
+        return az1 <= ang <= az2
+    return ang >= az1 or ang <= az2
+
+@njit(cache=True)
+def sector_box(maxd, az1, az2, res_y, res_x, nrows, ncols):
+    """
+    Inclusive (r_lo, r_hi, c_lo, c_hi) row/column offsets bounding the
+    cells of an azimuth sector of radius maxd (maxd < 0: the extent of an
+    nrows × ncols raster). The box spans the apex, the two sector edges
+    and the axis directions inside the sector, so a 30° camera field of
+    view covers a fraction of the full max_dist square.
+    """
+    if maxd >= 0.0:
+        half_r, half_c = half_extent(maxd, res_y, res_x)
+    else:
+        half_r, half_c = nrows - 1, ncols - 1
+    if az1 <= 0.0 and az2 >= 2 * math.pi:
+        return -half_r, half_r, -half_c, half_c
+    s_lo = s_hi = c_lo = c_hi = 0.0
+    for k in range(6):
+        if k == 0:
+            ang = az1
+        elif k == 1:
+            ang = az2
+        else:
+            ang = (k - 2) * 0.5 * math.pi
+            if not _in_sector(ang, az1, az2):
+                continue
+        # angles are atan2(dy, dx): sine along rows, cosine along columns
+        s = math.sin(ang)
+        c = math.cos(ang)
+        s_lo, s_hi = min(s_lo, s), max(s_hi, s)
+        c_lo, c_hi = min(c_lo, c), max(c_hi, c)
+    # the tolerance absorbs rounding of sin/cos (e.g. sin(pi) != 0) and
+    # cannot drop an integer offset within the exact bounds
+    return (max(int(math.floor(s_lo * half_r + 1e-9)), -half_r),
+            min(int(math.ceil(s_hi * half_r - 1e-9)), half_r),
+            max(int(math.floor(c_lo * half_c + 1e-9)), -half_c),
+            min(int(math.ceil(c_hi * half_c - 1e-9)), half_c))
+
+@njit(cache=True)
+def _fill_constraints(r_lo, c_lo, res_y, res_x, maxd, min_d, az1, az2,
+                      inside, dist):
+    """
+    Distance and azimuth filters of every offset of the box, exactly as
+    evaluated by `in_constraints`.
+    """
+    for a in range(inside.shape[0]):
+        dy = (r_lo + a) * res_y
+        for b in range(inside.shape[1]):
+            dx = (c_lo + b) * res_x
+            dist2 = dy*dy + dx*dx
+            dist[a, b] = math.sqrt(dist2)
+            inside[a, b] = in_constraints(dy, dx, dist2, 0.0, maxd, min_d,
+                                          az1, az2, -math.pi / 2, math.pi / 2)
+
+@njit(cache=True)
+def sector_window(ct, r0, c0, nrows, ncols):
+    """
+    Inclusive (r_lo, r_hi, c_lo, c_hi) raster bounds of the cells a
+    viewpoint at (r0, c0) has to visit under the template `ct`.
+    """
+    return (max(r0 + ct.r_lo, 0), min(r0 + ct.r_hi, nrows - 1),
+            max(c0 + ct.c_lo, 0), min(c0 + ct.c_hi, ncols - 1))
+
+@njit(cache=True)
+def admits(ct, dr, dc, dh):
+    """
+    `in_constraints` for the cell at offset (dr, dc) from the viewpoint and
+    height difference dh: one lookup of the precomputed distance/azimuth
+    flag, then the elevation-angle limits as dh against dist·tan(limit),
+    without atan2 or sqrt. Falls back to `in_constraints` without masks.
+    """
+    if ct.inside.shape[0] > 0:
+        a = dr - ct.r_lo
+        b = dc - ct.c_lo
+        if not ct.inside[a, b]:
+            return False
+        d = ct.dist[a, b]
+        if d > 0.0:
+            return d * ct.tan_min <= dh <= d * ct.tan_max
+    dy = dr * ct.res_y
+    dx = dc * ct.res_x
+    return in_constraints(dy, dx, dy*dy + dx*dx, dh, ct.maxd, ct.min_d,
+                          ct.az1, ct.az2, ct.elev_min, ct.elev_max)
+
+@functools.lru_cache(maxsize=8)
+def constraint_template(res_y, res_x, maxd, min_d=0.0, az1=0.0,
+                        az2=2 * math.pi, elev_min=-math.pi / 2,
+                        elev_max=math.pi / 2, nrows=0, ncols=0):
+    """
+    Build (or fetch from the LRU cache) the ConstraintTemplate of a set of
+    kernel constraints, as returned by `parse_constraints` (in the units of
+    `kernel_units`).
+
+    The distance and azimuth filters only depend on the offset from the
+    viewpoint, so they are evaluated once per offset of the sector's
+    bounding box and shared by every viewpoint; the kernels then test only
+    the elevation angle, which depends on the terrain. With unlimited maxd
+    the raster size (nrows, ncols) bounds the box and no masks are built;
+    masks over TEMPLATE_MAX_BYTES are not built either.
+    """
+    res_y, res_x, maxd, min_d = float(res_y), float(res_x), float(maxd), float(min_d)
+    r_lo, r_hi, c_lo, c_hi = sector_box(maxd, az1, az2, res_y, res_x,
+                                        nrows, ncols)
+    shape = (r_hi - r_lo + 1, c_hi - c_lo + 1)
+    if maxd < 0.0 or shape[0] * shape[1] * 9 > TEMPLATE_MAX_BYTES:
+        shape = (0, 0)
+    inside = np.zeros(shape, np.bool_)
+    dist = np.zeros(shape, np.float64)
+    if shape[0] > 0:
+        _fill_constraints(r_lo, c_lo, res_y, res_x, maxd, min_d, az1, az2,
+                          inside, dist)
+    inside.flags.writeable = False
+    dist.flags.writeable = False
+    tan_min = -math.inf if elev_min <= -math.pi / 2 else math.tan(elev_min)
+    tan_max = math.inf if elev_max >= math.pi / 2 else math.tan(elev_max)
+    return ConstraintTemplate(res_y, res_x, maxd, min_d, float(az1), float(az2),
+                              float(elev_min), float(elev_max), tan_min, tan_max,
+                              r_lo, r_hi, c_lo, c_hi, inside, dist)
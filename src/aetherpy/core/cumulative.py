@@ -0,0 +1,234 @@
+# aetherpy/core/cumulative.py
+
+import numpy as np
+from numba import njit, prange, get_num_threads, get_thread_id
+from .backends import (check_backend, numba_schedule, map_chunks, task_chunks,
+                       n_workers)
+from .sweep import ENGINES, _naive_into, _r2_into, _xdraw_into
+from .templates import ray_template, empty_template, _r2_template_into
+from .utils import (parse_constraints, window_bounds, half_extent,
+                    kernel_units, report_voids)
+
+__all__ = ["cumulative_viewshed"]
+
+def cumulative_viewshed(
+    dem,
+    observers,
+    weights=None,
+    obs_h=0.0,
+    max_dist=None,
+    interpolation="nearest",
+    azimuth_range=None,
+    elev_angle_range=None,
+    dist_range=None,
+    curvature_k=0.0,
+    engine="naive",
+    out=None,
+    tgt_h=0.0,
+    backend="numba",
+    n_jobs=None,
+    chunk_size=None,
+    precision=None,
+):
+    """
+    Cumulative (total) viewshed: how many observers – or how much observer
+    weight – see each cell.
+
+    All observers are swept in one parallel Numba kernel. Threads pick up
+    observers dynamically; every thread sweeps into its own scratch window
+    and adds it to its own accumulator (covering the union of the observer
+    windows), and the thread accumulators are added to the output at the
+    end. No per‐observer mask is ever returned or stored.
+
+    Parameters
+    ----------
+    dem : DEM
+    observers : (N, 2) array‐like of (row, col)
+    weights : (N,) array‐like, optional
+        Weight of every observer. Without weights the result counts observers.
+    obs_h : float or (N,) array‐like
+        Observer height above terrain, scalar or per observer.
+    max_dist, interpolation, azimuth_range, elev_angle_range, dist_range,
+    curvature_k, engine :
+        As in `viewshed_sweep`.
+    out : 2D ndarray, optional
+        Raster of the DEM's shape (e.g. a np.memmap) the result is added
+        into, so successive batches stream into one output; int32 for
+        counts, float32 for weights.
+    tgt_h : float
+        Height of the targets above terrain, as in `viewshed_sweep`.
+    backend : "numba", "process" or "joblib"
+        "numba" runs the kernel on Numba threads. "process" and "joblib"
+        split the observers into chunks that worker processes (each
+        single‐threaded) pick up as they become free; the DEM is shared
+        with the workers rather than pickled per chunk.
+    n_jobs : int or None
+        Number of threads or worker processes; None uses every core
+        (the current Numba thread count for "numba"), negative values
+        count back from the number of cores.
+    chunk_size : int or None
+        Observers per scheduling chunk: per dynamically scheduled `prange`
+        chunk for "numba" (default 1), per worker task otherwise (default
+        about four tasks per worker).
+    precision : None or str
+        Storage precision the DEM is converted to, as in `viewshed_sweep`.
+
+    Returns
+    -------
+    total : 2D ndarray
+        int32 observer counts, or float32 weight sums if `weights` is given.
+        Void cells of the DEM are never counted, and observers on void
+        cells are skipped.
+    """
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown engine {engine!r}; expected one of {ENGINES}")
+    check_backend(backend)
+    dem = dem.with_precision(precision)
+    nrows, ncols = dem.array.shape
+
+    obs = np.ascontiguousarray(observers, dtype=np.int64).reshape(-1, 2)
+    n = obs.shape[0]
+    if ((obs < 0).any() or (obs[:, 0] >= nrows).any()
+            or (obs[:, 1] >= ncols).any()):
+        raise ValueError("observers contains cells outside the DEM")
+    heights = np.ascontiguousarray(
+        np.broadcast_to(np.asarray(obs_h, np.float64), (n,))
+    )
+
+    # accumulate weights in float32, plain counts in int32
+    dtype = np.int32 if weights is None else np.float32
+    w = (np.ones(n, dtype) if weights is None
+         else np.ascontiguousarray(weights, dtype=dtype).reshape(n))
+    if out is None:
+        out = np.zeros((nrows, ncols), dtype)
+    elif out.shape != (nrows, ncols) or out.dtype != dtype:
+        raise ValueError(f"out must be a {np.dtype(dtype).name} array of the DEM's shape")
+
+    # observers on void cells are skipped
+    valid = dem.valid
+    if valid is not None:
+        keep = valid[obs[:, 0], obs[:, 1]]
+        report_voids("cumulative_viewshed", n - int(keep.sum()), "observers")
+        obs, heights, w = obs[keep], heights[keep], w[keep]
+        n = obs.shape[0]
+    if n == 0:
+        return out
+
+    maxd, min_d, az1, az2, elev_min, elev_max = parse_constraints(
+        max_dist, dist_range, azimuth_range, elev_angle_range
+    )
+    heights, tgt_h, maxd, min_d, res_y, res_x, curvature_k = kernel_units(
+        dem, heights, float(tgt_h), maxd, min_d, float(curvature_k))
+    use_bi = (interpolation.lower() == "bilinear")
+
+    tpl = None
+    if engine == "r2":
+        tpl = ray_template(res_y, res_x, maxd, interpolation, curvature_k)
+    use_tpl = tpl is not None
+    if not use_tpl:
+        tpl = empty_template()
+
+    args = (obs, heights, tgt_h, w, maxd, res_y, res_x,
+            use_bi, az1, az2, elev_min, elev_max, min_d, curvature_k,
+            ENGINES.index(engine), tpl, use_tpl)
+    if backend == "numba":
+        with numba_schedule(n, n_jobs, chunk_size):
+            parts = [_cumulative_chunk(dem.array, np.arange(n), *args)]
+    else:
+        chunks = task_chunks(n, n_workers(n_jobs), chunk_size)
+        parts = map_chunks(_cumulative_chunk, (dem.array,), chunks, args,
+                           backend, n_jobs)
+
+    # merge the partial accumulators into the output
+    for r_lo, c_lo, acc in parts:
+        rows = slice(r_lo, r_lo + acc.shape[0])
+        cols = slice(c_lo, c_lo + acc.shape[1])
+        if valid is not None:
+            acc[~valid[rows, cols]] = 0
+        out[rows, cols] += acc
+    return out
+
+
+def _cumulative_chunk(arr, subset, obs, heights, tgt_h, w,
+                      maxd, res_y, res_x, use_bi,
+                      az1, az2, elev_min, elev_max, min_d, curvature_k,
+                      engine_id, tpl, use_tpl):
+    """
+    Cumulative viewshed of the observers `subset`, as (r_lo, c_lo, acc)
+    with acc covering the union of their max_dist windows.
+    """
+    nrows, ncols = arr.shape
+    r_lo, r_hi, c_lo, c_hi = nrows - 1, 0, ncols - 1, 0
+    for r0, c0 in obs[subset]:
+        a, b, c, d = window_bounds(r0, c0, maxd, res_y, res_x, nrows, ncols)
+        r_lo, r_hi = min(r_lo, a), max(r_hi, b)
+        c_lo, c_hi = min(c_lo, c), max(c_hi, d)
+    partial = np.zeros((get_num_threads(), r_hi - r_lo + 1, c_hi - c_lo + 1),
+                       w.dtype)
+
+    _cumulative_jit(
+        arr, obs, subset, heights, tgt_h, w, partial, r_lo, c_lo,
+        maxd, res_y, res_x, use_bi,
+        az1, az2, elev_min, elev_max, min_d, curvature_k,
+        engine_id, tpl, use_tpl
+    )
+    return r_lo, c_lo, partial.sum(axis=0, dtype=w.dtype)
+
+
+@njit(parallel=True, cache=True)
+def _cumulative_jit(
+    arr, observers, subset, obs_h, tgt_h, weights, partial, r_lo, c_lo,
+    maxd, res_y, res_x, use_bilinear,
+    az1, az2, elev_min, elev_max, min_d, curvature_k,
+    engine_id, tpl, use_tpl
+):
+    """
+    Numba‐parallel cumulative viewshed helper; engine_id indexes ENGINES.
+    The observers `subset` are scheduled dynamically over the threads;
+    thread k sweeps each of its observers into its own scratch window and
+    adds their weight to partial[k] (origin r_lo, c_lo), so partial needs
+    one layer per Numba thread.
+    """
+    nrows, ncols = arr.shape
+    n = subset.shape[0]
+
+    if maxd >= 0.0:
+        half_r, half_c = half_extent(maxd, res_y, res_x)
+        sh_r, sh_c = min(2 * half_r + 1, nrows), min(2 * half_c + 1, ncols)
+    else:
+        sh_r, sh_c = nrows, ncols
+    no_hz = np.empty((0, 0))
+    scratch = np.zeros((partial.shape[0], sh_r, sh_c), np.bool_)
+
+    for k in prange(n):
+        o = subset[k]
+        tid = get_thread_id()
+        acc = partial[tid]
+        r0 = observers[o, 0]
+        c0 = observers[o, 1]
+        wr_lo, wr_hi, wc_lo, wc_hi = window_bounds(r0, c0, maxd, res_y,
+                                                   res_x, nrows, ncols)
+        vs = scratch[tid, :wr_hi - wr_lo + 1, :wc_hi - wc_lo + 1]
+        vs[:] = False
+        if use_tpl:
+            _r2_template_into(arr, vs, no_hz, wr_lo, wc_lo, r0, c0,
+                              obs_h[o], tgt_h, tpl, use_bilinear, maxd, min_d,
+                              az1, az2, elev_min, elev_max)
+        elif engine_id == 0:
+            _naive_into(arr, vs, no_hz, wr_lo, wc_lo, r0, c0, obs_h[o], tgt_h,
+                        maxd, res_y, res_x, use_bilinear,
+                        az1, az2, elev_min, elev_max, min_d, curvature_k)
+        elif engine_id == 1:
+            _r2_into(arr, vs, no_hz, wr_lo, wc_lo, r0, c0, obs_h[o], tgt_h,
+                     maxd, res_y, res_x, use_bilinear,
+                     az1, az2, elev_min, elev_max, min_d, curvature_k)
+        else:
+            _xdraw_into(arr, vs, no_hz, wr_lo, wc_lo, r0, c0, obs_h[o], tgt_h,
+                        maxd, res_y, res_x, use_bilinear,
+                        az1, az2, elev_min, elev_max, min_d, curvature_k)
+
+        w = weights[o]
+        for i in range(wr_hi - wr_lo + 1):
+            for j in range(wc_hi - wc_lo + 1):
+                if vs[i, j]:
+                    acc[wr_lo - r_lo + i, wc_lo - c_lo + j] += w
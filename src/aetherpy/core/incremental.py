@@ -0,0 +1,489 @@
+# aetherpy/core/incremental.py
+
+import numpy as np
+from collections import namedtuple
+from numba import njit, prange, get_num_threads, get_thread_id
+from .backends import numba_schedule
+from .constrained import sector_window, admits
+from .los import _is_visible, _is_visible_bilinear
+from .multiobserver import _matrix_result
+from .siting import VisibilitySignatures, visibility_signatures, _signature_plan
+from .sweep import (_r2_ray, _r2_into, _batch_plan, _batch_chunk,
+                    _batch_windows, viewshed_batch)
+from .templates import _r2_template_ray, _r2_template_into
+from .utils import half_extent, in_constraints, window_bounds
+
+__all__ = ["CacheUpdate", "ViewshedCache", "InverseVisibilityCache"]
+
+# Namedtuple returned by the `update` methods of the caches
+CacheUpdate = namedtuple(
+    "CacheUpdate",
+    [
+        "full",      # int64 indices of the viewpoints swept again in full
+        "partial",   # int64 indices of those updated in the affected cells
+    ]
+)
+
+# A cell's value reaches the sight lines passing within one cell of it
+# (nearest cells lie within half a cell of the line, bilinear samples read
+# the next row and column). A cell can change if its line from the
+# viewpoint passes within _CELL_MARGIN cells of an edit; every R2 ray
+# through such a cell passes within _RAY_MARGIN cells of it.
+_CELL_MARGIN = 2
+_RAY_MARGIN = 3
+
+@njit(cache=True)
+def _clip(p, q, t0, t1):
+    # one Liang–Barsky boundary: the part of [t0, t1] with p·t <= q
+    if p == 0.0:
+        return (t0, t1) if q >= 0.0 else (1.0, 0.0)
+    t = q / p
+    if p < 0.0:
+        return max(t0, t), t1
+    return t0, min(t1, t)
+
+@njit(cache=True)
+def _hits(r0, c0, r1, c1, rects, margin):
+    """
+    True if the segment (r0, c0) → (r1, c1) meets one of the inclusive
+    (r_lo, r_hi, c_lo, c_hi) rects grown by `margin` cells.
+    """
+    dr = float(r1 - r0)
+    dc = float(c1 - c0)
+    for k in range(rects.shape[0]):
+        t0, t1 = _clip(-dr, r0 - (rects[k, 0] - margin), 0.0, 1.0)
+        t0, t1 = _clip(dr, rects[k, 1] + margin - r0, t0, t1)
+        t0, t1 = _clip(-dc, c0 - (rects[k, 2] - margin), t0, t1)
+        t0, t1 = _clip(dc, rects[k, 3] + margin - c0, t0, t1)
+        if t0 <= t1:
+            return True
+    return False
+
+@njit(cache=True)
+def _shadow_box(r0, c0, rects, margin, r_lo, r_hi, c_lo, c_hi):
+    """
+    Bounding box, within r_lo..r_hi × c_lo..c_hi, of the cells whose line
+    from (r0, c0) meets a grown rect: a rect side facing away from the
+    viewpoint bounds the shadow, on the other sides it reaches the box.
+    """
+    b_rlo, b_rhi, b_clo, b_chi = r_hi + 1, r_lo - 1, c_hi + 1, c_lo - 1
+    for k in range(rects.shape[0]):
+        lo_r = rects[k, 0] - margin
+        hi_r = rects[k, 1] + margin
+        lo_c = rects[k, 2] - margin
+        hi_c = rects[k, 3] + margin
+        b_rlo = min(b_rlo, lo_r if lo_r >= r0 else r_lo)
+        b_rhi = max(b_rhi, hi_r if hi_r <= r0 else r_hi)
+        b_clo = min(b_clo, lo_c if lo_c >= c0 else c_lo)
+        b_chi = max(b_chi, hi_c if hi_c <= c0 else c_hi)
+    return (max(b_rlo, r_lo), min(b_rhi, r_hi),
+            max(b_clo, c_lo), min(b_chi, c_hi))
+
+@njit(cache=True)
+def _r2_rewalk(arr, vs, r_off, c_off, obs_r, obs_c, height0, tgt_h, maxd,
+               res_y, res_x, use_bilinear, az1, az2, elev_min, elev_max,
+               min_d, curvature_k, tpl, use_tpl, rects):
+    """
+    Walk the R2 rays of a viewpoint (those of `_r2_into`, or of the
+    template) that pass within _RAY_MARGIN cells of a rect into `vs`.
+    """
+    nrows, ncols = arr.shape
+    no_hz = np.empty((0, 0))
+    if maxd >= 0.0:
+        half_r, half_c = half_extent(maxd, res_y, res_x)
+        r_lo, r_hi = obs_r - half_r, obs_r + half_r
+        c_lo, c_hi = obs_c - half_c, obs_c + half_c
+    else:
+        r_lo, r_hi, c_lo, c_hi = 0, nrows - 1, 0, ncols - 1
+
+    # perimeter cells in the ray order of `_r2_into` and of the template
+    n_top = 2 * (c_hi - c_lo + 1)
+    for ray in range(n_top + 2 * max(r_hi - r_lo - 1, 0)):
+        if ray < n_top:
+            r = r_lo if ray % 2 == 0 else r_hi
+            c = c_lo + ray // 2
+        else:
+            r = r_lo + 1 + (ray - n_top) // 2
+            c = c_lo if ray % 2 == 0 else c_hi
+        if r == obs_r and c == obs_c:
+            continue
+        if not _hits(obs_r, obs_c, r, c, rects, _RAY_MARGIN):
+            continue
+        if use_tpl:
+            _r2_template_ray(arr, vs, no_hz, r_off, c_off, obs_r, obs_c,
+                             height0, tgt_h, tpl, ray, use_bilinear, maxd,
+                             min_d, az1, az2, elev_min, elev_max)
+        else:
+            _r2_ray(arr, vs, no_hz, r_off, c_off, obs_r, obs_c, height0, r, c,
+                    tgt_h, maxd, res_y, res_x, use_bilinear,
+                    az1, az2, elev_min, elev_max, min_d, curvature_k)
+
+@njit(parallel=True, cache=True)
+def _update_windows_jit(arr, observers, subset, obs_h, tgt_h, stack, rects,
+                        maxd, res_y, res_x, use_bilinear,
+                        az1, az2, elev_min, elev_max, min_d, curvature_k,
+                        engine_id, tpl, use_tpl):
+    """
+    Numba-parallel update of the windows of `viewshed_batch` (observer
+    subset[k] in stack[k]) after the rects were edited: only the cells in
+    the shadow of an edit are evaluated again, by the naive engine
+    (engine_id 0) or by the R2 rays that reach them (engine_id 1).
+    """
+    nrows, ncols = arr.shape
+    for k in prange(subset.shape[0]):
+        o = subset[k]
+        r0 = observers[o, 0]
+        c0 = observers[o, 1]
+        r_lo, r_hi, c_lo, c_hi = window_bounds(r0, c0, maxd, res_y, res_x,
+                                               nrows, ncols)
+        vs = stack[k, :r_hi - r_lo + 1, :c_hi - c_lo + 1]
+        b_rlo, b_rhi, b_clo, b_chi = _shadow_box(r0, c0, rects, _CELL_MARGIN,
+                                                 r_lo, r_hi, c_lo, c_hi)
+        if b_rlo > b_rhi or b_clo > b_chi:
+            continue
+        height0 = arr[r0, c0] + obs_h[o]
+        if engine_id == 1:
+            fresh = np.zeros(vs.shape, np.bool_)
+            _r2_rewalk(arr, fresh, r_lo, c_lo, r0, c0, height0, tgt_h, maxd,
+                       res_y, res_x, use_bilinear, az1, az2, elev_min,
+                       elev_max, min_d, curvature_k, tpl, use_tpl, rects)
+        for i in range(b_rlo, b_rhi + 1):
+            for j in range(b_clo, b_chi + 1):
+                if not _hits(r0, c0, i, j, rects, _CELL_MARGIN):
+                    continue
+                if engine_id == 1:
+                    visible = fresh[i - r_lo, j - c_lo]
+                else:
+                    # as in `_naive_into`
+                    dy = (i - r0) * res_y
+                    dx = (j - c0) * res_x
+                    visible = in_constraints(dy, dx, dy*dy + dx*dx,
+                                             arr[i, j] - height0, maxd, min_d,
+                                             az1, az2, elev_min, elev_max)
+                    if visible and use_bilinear:
+                        visible = _is_visible_bilinear(
+                            arr, r0, c0, i, j, obs_h[o], tgt_h,
+                            res_y, res_x, curvature_k)
+                    elif visible:
+                        visible = _is_visible(
+                            arr, r0, c0, i, j, obs_h[o], tgt_h,
+                            res_y, res_x, curvature_k)
+                vs[i - r_lo, j - c_lo] = visible
+
+@njit(parallel=True, cache=True)
+def _update_bits_jit(arr, targets, subset, word_start, full, cand_id, bits,
+                     rects, obs_h, tgt_h, maxd, res_y, res_x, use_bilinear,
+                     az1, az2, elev_min, elev_max, min_d, curvature_k,
+                     use_r2, tpl, use_tpl, ct, n_threads):
+    """
+    Numba-parallel update of the signature bits of the targets `subset`
+    (sorted) after the rects were edited. The targets of one signature
+    word, subset[word_start[g]:word_start[g + 1]], are handled by a single
+    thread. Targets with full[s] set are traced again against every
+    candidate as in `_signature_bits_jit`, the others only against the
+    candidates in the shadow of an edit.
+    """
+    nrows, ncols = arr.shape
+    if not use_r2:
+        sh_r, sh_c = 0, 0
+    elif maxd >= 0.0:
+        half_r, half_c = half_extent(maxd, res_y, res_x)
+        sh_r, sh_c = min(2 * half_r + 1, nrows), min(2 * half_c + 1, ncols)
+    else:
+        sh_r, sh_c = nrows, ncols
+    no_hz = np.empty((0, 0))
+    scratch = np.zeros((n_threads, sh_r, sh_c), np.bool_)
+
+    for g in prange(word_start.size - 1):
+        tid = get_thread_id()
+        for s in range(word_start[g], word_start[g + 1]):
+            t = subset[s]
+            w = t // 64
+            bit = np.uint64(1) << np.uint64(t - 64 * w)
+            ti = targets[t, 0]
+            tj = targets[t, 1]
+            height0 = arr[ti, tj] + tgt_h
+            wr_lo, wr_hi, wc_lo, wc_hi = window_bounds(ti, tj, maxd, res_y,
+                                                       res_x, nrows, ncols)
+            sr_lo, sr_hi, sc_lo, sc_hi = sector_window(ct, ti, tj,
+                                                       nrows, ncols)
+            if not full[s]:
+                sr_lo, sr_hi, sc_lo, sc_hi = _shadow_box(
+                    ti, tj, rects, _CELL_MARGIN, sr_lo, sr_hi, sc_lo, sc_hi)
+                if sr_lo > sr_hi or sc_lo > sc_hi:
+                    continue
+            vs = scratch[tid, :wr_hi - wr_lo + 1, :wc_hi - wc_lo + 1]
+            if use_r2:
+                vs[sr_lo - wr_lo:sr_hi - wr_lo + 1,
+                   sc_lo - wc_lo:sc_hi - wc_lo + 1] = False
+                if not full[s]:
+                    _r2_rewalk(arr, vs, wr_lo, wc_lo, ti, tj, height0, obs_h,
+                               maxd, res_y, res_x, use_bilinear, az1, az2,
+                               elev_min, elev_max, min_d, curvature_k,
+                               tpl, use_tpl, rects)
+                elif use_tpl:
+                    _r2_template_into(arr, vs, no_hz, wr_lo, wc_lo,
+                                      ti, tj, tgt_h, obs_h, tpl,
+                                      use_bilinear, maxd, min_d,
+                                      az1, az2, elev_min, elev_max)
+                else:
+                    _r2_into(arr, vs, no_hz, wr_lo, wc_lo, ti, tj, tgt_h,
+                             obs_h, maxd, res_y, res_x, use_bilinear,
+                             az1, az2, elev_min, elev_max, min_d,
+                             curvature_k)
+            for i in range(sr_lo, sr_hi + 1):
+                for j in range(sc_lo, sc_hi + 1):
+                    c = cand_id[i, j]
+                    if c < 0:
+                        continue
+                    if not full[s] and not _hits(ti, tj, i, j, rects,
+                                                 _CELL_MARGIN):
+                        continue
+                    # the pair test of `_signature_bits_jit`
+                    if not admits(ct, i - ti, j - tj, arr[i, j] - height0):
+                        visible = False
+                    elif i == ti and j == tj:
+                        visible = True
+                    elif use_r2:
+                        visible = vs[i - wr_lo, j - wc_lo]
+                    elif use_bilinear:
+                        visible = _is_visible_bilinear(
+                            arr, ti, tj, i, j, tgt_h, obs_h,
+                            res_y, res_x, curvature_k
+                        )
+                    else:
+                        visible = _is_visible(
+                            arr, ti, tj, i, j, tgt_h, obs_h,
+                            res_y, res_x, curvature_k
+                        )
+                    if visible:
+                        bits[c, w] |= bit
+                    else:
+                        bits[c, w] &= ~bit
+
+def _affected(points, rects, maxd, res_y, res_x, shape):
+    """
+    (touched, inside) bool masks of the viewpoints whose max_dist window
+    reaches within one cell of an edited rect, and of those lying within
+    _CELL_MARGIN cells of one (their own height may have changed).
+    """
+    if maxd >= 0.0:
+        half_r, half_c = half_extent(maxd, res_y, res_x)
+    else:
+        half_r, half_c = shape
+    r, c = points[:, 0:1], points[:, 1:2]
+    lo_r, hi_r, lo_c, hi_c = rects.T
+    touched = ((r + half_r >= lo_r - 1) & (r - half_r <= hi_r + 1)
+               & (c + half_c >= lo_c - 1) & (c - half_c <= hi_c + 1))
+    inside = ((r >= lo_r - _CELL_MARGIN) & (r <= hi_r + _CELL_MARGIN)
+              & (c >= lo_c - _CELL_MARGIN) & (c <= hi_c + _CELL_MARGIN))
+    return touched.any(axis=1), inside.any(axis=1)
+
+def _dirty_rects(dem, since):
+    """
+    int64 (n, 4) array of the windows edited after version `since`.
+    """
+    return np.array(dem.dirty_windows(since), dtype=np.int64).reshape(-1, 4)
+
+class ViewshedCache:
+    """
+    Viewsheds of a fixed set of observers that follow edits of the DEM.
+
+    The masks are computed once by `viewshed_batch`; after the DEM is
+    changed with `DEM.edit` (a new building footprint, an excavation),
+    `update` recomputes only what the edits can affect. Observers whose
+    max_dist window does not reach an edited window are skipped; for the
+    others only the cells whose sight line passes near an edit – the
+    shadow the edit casts away from the observer – are evaluated again,
+    by tracing those lines ("naive") or by walking just the R2 rays that
+    cross the edit ("r2"). Observers on or next to an edit, and every
+    observer of the "xdraw" engine, whose wavefront carries an edit across
+    the whole sector behind it, are swept again in full. The updated masks
+    are identical to a full recompute on the edited DEM.
+
+    Parameters are those of `viewshed_batch` (obs_h may be given per
+    observer); the DEM is used as stored, and `n_jobs` sets the number of
+    Numba threads.
+
+    Attributes
+    ----------
+    dem : DEM
+    windows : list of ViewshedWindow
+        Current mask window of every observer, as returned by
+        `viewshed_batch`.
+    version : int
+        DEM version the windows are up to date with.
+    """
+    def __init__(self, dem, observers, obs_h=0.0, max_dist=None,
+                 interpolation="nearest", azimuth_range=None,
+                 elev_angle_range=None, dist_range=None, curvature_k=0.0,
+                 engine="naive", tgt_h=0.0, n_jobs=None):
+        self.dem = dem
+        self.n_jobs = n_jobs
+        self._params = (obs_h, max_dist, interpolation, azimuth_range,
+                        elev_angle_range, dist_range, curvature_k, engine,
+                        tgt_h)
+        self.windows = viewshed_batch(dem, observers, *self._params,
+                                      n_jobs=n_jobs)
+        self.observers = np.ascontiguousarray(observers,
+                                              dtype=np.int64).reshape(-1, 2)
+        self.version = dem.version
+
+    def __len__(self):
+        return len(self.windows)
+
+    def __getitem__(self, i):
+        return self.windows[i]
+
+    def update(self):
+        """
+        Bring the windows up to date with the edits of the DEM since the
+        last update.
+
+        Returns
+        -------
+        CacheUpdate
+            Indices of the observers swept again in full and of those
+            updated in the shadow of the edits only; all other windows are
+            unchanged.
+        """
+        dem = self.dem
+        rects = _dirty_rects(dem, self.version)
+        self.version = dem.version
+        none = np.zeros(0, np.int64)
+        if rects.shape[0] == 0:
+            return CacheUpdate(none, none)
+        plan = _batch_plan(dem, self.observers, *self._params, "numba", None)
+        _, todo, args = plan
+        obs, maxd, res_y, res_x, engine_id = (args[0], args[3], args[4],
+                                              args[5], args[13])
+        touched, inside = _affected(obs, rects, maxd, res_y, res_x,
+                                    dem.array.shape)
+        swept = np.zeros(len(obs), dtype=bool)
+        swept[todo] = True
+        full = np.flatnonzero(touched & (inside | (engine_id == 2)))
+        partial = np.flatnonzero(touched & swept & ~inside & (engine_id != 2))
+
+        todo_full = full[swept[full]]
+        if len(todo_full):
+            with numba_schedule(len(todo_full), self.n_jobs):
+                subset, stack = _batch_chunk(dem.array, todo_full, *args)
+            for o, window in _batch_windows(plan, subset, stack):
+                self.windows[o] = window
+        for o, window in _batch_windows(plan, full[~swept[full]], None):
+            self.windows[o] = window
+
+        if len(partial):
+            shapes = [self.windows[o].data.shape for o in partial]
+            stack = np.zeros((len(partial), max(s[0] for s in shapes),
+                              max(s[1] for s in shapes)), dtype=bool)
+            for k, (o, (h, w)) in enumerate(zip(partial, shapes)):
+                stack[k, :h, :w] = self.windows[o].data
+            with numba_schedule(len(partial), self.n_jobs):
+                _update_windows_jit(dem.array, obs, partial, args[1], args[2],
+                                    stack, rects, *args[3:])
+            for o, window in _batch_windows(plan, partial, stack):
+                self.windows[o] = window
+        return CacheUpdate(full, partial)
+
+class InverseVisibilityCache:
+    """
+    Inverse visibility of a set of targets that follows edits of the DEM.
+
+    The bit-packed observer × target relation of `visibility_signatures`
+    is computed once; after the DEM is changed with `DEM.edit`, `update`
+    traces again only the pairs an edit can affect. Targets whose max_dist
+    window does not reach an edited window keep their bits; for the others
+    only the candidate observers in the shadow of an edit, seen from the
+    target, are evaluated again (with the "r2" engine by walking just the
+    rays that cross the edit). Targets on or next to an edit are traced
+    again in full, and edits that turn targets or candidates into voids
+    (or back) rebuild the whole relation. The results are identical to a
+    full recompute on the edited DEM.
+
+    Parameters are those of `inverse_visibility` with return_matrix=True.
+
+    Attributes
+    ----------
+    dem : DEM
+    signatures : VisibilitySignatures
+        Current relation, as returned by `visibility_signatures`.
+    version : int
+        DEM version the relation is up to date with.
+    """
+    def __init__(self, dem, target_mask, obs_h=0.0, interpolation="nearest",
+                 max_dist=None, azimuth_range=None, elev_angle_range=None,
+                 dist_range=None, observer_mask=None, weight_by_cell=False,
+                 curvature_k=0.0, engine="naive", tgt_h=0.0):
+        self.dem = dem
+        self._masks = (target_mask, observer_mask)
+        self._params = (obs_h, interpolation, max_dist, azimuth_range,
+                        elev_angle_range, dist_range)
+        self._options = (weight_by_cell, curvature_k, engine, tgt_h)
+        self.version = dem.version
+        self.signatures = visibility_signatures(
+            dem, target_mask, *self._params, observer_mask, *self._options)
+
+    def _plan(self):
+        return _signature_plan(self.dem, self._masks[0], *self._params,
+                               self._masks[1], *self._options,
+                               "InverseVisibilityCache")
+
+    def update(self):
+        """
+        Bring the relation up to date with the edits of the DEM since the
+        last update.
+
+        Returns
+        -------
+        CacheUpdate
+            Indices (into signatures.targets) of the targets traced again
+            against every candidate and of those traced against the
+            candidates in the shadow of the edits only.
+        """
+        dem = self.dem
+        rects = _dirty_rects(dem, self.version)
+        self.version = dem.version
+        none = np.zeros(0, np.int64)
+        if rects.shape[0] == 0:
+            return CacheUpdate(none, none)
+        sig = self.signatures
+        targets, weights, candidates, cand_id, args = self._plan()
+        if (not np.array_equal(targets, sig.targets)
+                or not np.array_equal(candidates, sig.candidates)):
+            # the edits changed the void cells among targets or candidates
+            self.signatures = visibility_signatures(
+                dem, self._masks[0], *self._params, self._masks[1],
+                *self._options)
+            return CacheUpdate(np.arange(len(targets)), none)
+
+        maxd, res_y, res_x = args[2], args[3], args[4]
+        touched, inside = _affected(targets, rects, maxd, res_y, res_x,
+                                    dem.array.shape)
+        subset = np.flatnonzero(touched)
+        if len(subset):
+            words = subset // 64
+            word_start = np.flatnonzero(np.r_[True, words[1:] != words[:-1],
+                                              True])
+            n_words = len(word_start) - 1
+            with numba_schedule(n_words):
+                _update_bits_jit(dem.array, targets, subset, word_start,
+                                 inside[subset], cand_id, sig.bits, rects,
+                                 *args, get_num_threads())
+        self.signatures = VisibilitySignatures(candidates, targets, weights,
+                                               sig.bits, dem.res_y, dem.res_x)
+        return CacheUpdate(np.flatnonzero(touched & inside),
+                           np.flatnonzero(touched & ~inside))
+
+    def result(self):
+        """
+        (VisibilityResult, VisibilityMatrix) of the current relation, as
+        returned by `inverse_visibility(..., return_matrix=True)`.
+        """
+        sig = self.signatures
+        observer_mask = np.zeros(self.dem.array.shape, dtype=bool)
+        observer_mask[sig.candidates[:, 0], sig.candidates[:, 1]] = True
+        args = self._plan()[4]
+        tgt_h, ct = args[1], args[-1]
+        return _matrix_result(self.dem.array, sig, observer_mask, tgt_h, ct,
+                              sig.weights.sum(), len(sig.candidates))
@@ -0,0 +1,273 @@
+# aetherpy/core/links.py
+
+import math
+import numpy as np
+from collections import namedtuple
+from numba import njit, prange
+from .los import _bilinear_sample, _pair_arrays
+from .utils import euclidean_distance, kernel_units, report_voids
+
+__all__ = ["LinkProfile", "LinkClearance", "link_profile", "link_clearance"]
+
+# speed of light (m/s), for the wavelength of a link frequency
+SPEED_OF_LIGHT = 299792458.0
+
+# Namedtuple returned by link_profile: one entry per sample of the path,
+# endpoints included. Heights are in the observer's frame, i.e. terrain
+# lowered by the Earth-curvature drop, so the sight line is straight.
+LinkProfile = namedtuple(
+    "LinkProfile",
+    [
+        "rows",        # float64 raster row of every sample
+        "cols",        # float64 raster column of every sample
+        "distance",    # float64 horizontal distance from the observer
+        "terrain",     # float64 curvature-corrected terrain height
+        "line",        # float64 height of the sight line
+        "fresnel",     # float64 first Fresnel zone radius (NaN without freq_hz)
+    ]
+)
+
+# Namedtuple returned by link_clearance: one entry per link
+LinkClearance = namedtuple(
+    "LinkClearance",
+    [
+        "clearance",       # min vertical clearance (map units), < 0 when blocked
+        "fresnel_ratio",   # min clearance / first Fresnel radius (≥ 0.6 is the usual criterion)
+        "obstruction",     # max % of the first Fresnel zone cross-section below terrain
+        "worst_distance",  # distance of the sample with the smallest fresnel_ratio
+    ]
+)
+
+@njit(cache=True)
+def _zone_obstruction(v):
+    """
+    Fraction of a circle below a chord at height v (in radii, -1…1) from
+    its centre: the obstructed share of the Fresnel zone cross-section.
+    """
+    if v >= 1.0:
+        return 0.0
+    if v <= -1.0:
+        return 1.0
+    return (math.acos(v) - v * math.sqrt(1.0 - v * v)) / math.pi
+
+@njit(cache=True)
+def _link_scan(arr, r0, c0, r1, c1, obs_h, tgt_h, res_y, res_x, curvature_k,
+               use_bilinear, wavelength, prof):
+    """
+    Walk the sight line (r0, c0) → (r1, c1) over the samples of
+    `_clearance` (Bresenham cells) or `_clearance_bilinear` (DDA at one
+    sample per cell of the longest axis), endpoints included.
+
+    Returns (clearance, fresnel_ratio, obstruction, worst_distance) over
+    the intermediate samples; clearance is exactly that of `_clearance` /
+    `_clearance_bilinear`. The Fresnel terms are NaN for wavelength <= 0.
+    If `prof` has a row per sample (see `_n_samples`), the profile columns
+    of LinkProfile are written to it.
+    """
+    want_prof = prof.shape[0] > 0
+    if use_bilinear:
+        h0 = _bilinear_sample(arr, r0, c0) + obs_h
+        h1 = _bilinear_sample(arr, r1, c1) + tgt_h
+    else:
+        h0 = arr[r0, c0] + obs_h
+        h1 = arr[r1, c1] + tgt_h
+    dist_t = euclidean_distance(r0, c0, r1, c1, res_y, res_x)
+    inv_2rk = 1.0 / (2.0 * 6371000.0 * curvature_k) if curvature_k > 0.0 else 0.0
+    slope_t = (h1 - dist_t * dist_t * inv_2rk - h0) / dist_t if dist_t > 0.0 else 0.0
+    use_fresnel = wavelength > 0.0
+
+    clear = math.inf
+    ratio = math.inf if use_fresnel else math.nan
+    obstruct = 0.0 if use_fresnel else math.nan
+    worst = math.nan
+
+    # Bresenham state (nearest) or DDA increments (bilinear)
+    steep = abs(r1 - r0) > abs(c1 - c0)
+    if steep:
+        a0, b0, a1, b1 = c0, r0, c1, r1
+    else:
+        a0, b0, a1, b1 = r0, c0, r1, c1
+    dx = abs(b1 - b0)
+    dy = abs(a1 - a0)
+    error = dx // 2
+    ystep = 1 if a1 > a0 else -1
+    xstep = 1 if b1 > b0 else -1
+    y = a0
+    n = max(abs(r1 - r0), abs(c1 - c0))
+
+    for t in range(n + 1):
+        if use_bilinear:
+            rf = r0 + (r1 - r0) * (t / n) if n > 0 else float(r0)
+            cf = c0 + (c1 - c0) * (t / n) if n > 0 else float(c0)
+            z = _bilinear_sample(arr, rf, cf)
+        else:
+            if t > 0:
+                error -= dy
+                if error < 0:
+                    y += ystep
+                    error += dx
+            x = b0 + xstep * t
+            ri, ci = (x, y) if steep else (y, x)
+            if t == n:
+                ri, ci = r1, c1
+            rf, cf = float(ri), float(ci)
+            z = arr[ri, ci]
+        d = euclidean_distance(r0, c0, rf, cf, res_y, res_x)
+        terrain = z - d * d * inv_2rk
+        line = h0 + slope_t * d
+        radius = math.nan
+        if use_fresnel and dist_t > 0.0:
+            rest = max(dist_t - d, 0.0)
+            radius = math.sqrt(wavelength * d * rest / dist_t)
+        if want_prof:
+            prof[t, 0] = rf
+            prof[t, 1] = cf
+            prof[t, 2] = d
+            prof[t, 3] = terrain
+            prof[t, 4] = line
+            prof[t, 5] = radius
+        if t == 0 or t == n:
+            continue
+
+        c = line - terrain
+        if c < clear:
+            clear = c
+        if use_fresnel and radius > 0.0:
+            v = c / radius
+            if v < ratio:
+                ratio = v
+                worst = d
+            o = _zone_obstruction(v)
+            if o > obstruct:
+                obstruct = o
+
+    return clear, ratio, 100.0 * obstruct, worst
+
+@njit(cache=True)
+def _n_samples(r0, c0, r1, c1):
+    return max(abs(r1 - r0), abs(c1 - c0)) + 1
+
+@njit(parallel=True, cache=True)
+def _link_clearance_many(arr, src, dst, obs_h, tgt_h, res_y, res_x,
+                         curvature_k, use_bilinear, wavelength, out):
+    """
+    `_link_scan` statistics of every (src[i], dst[i]) link, in parallel;
+    out has one row of 4 values per link.
+    """
+    no_prof = np.empty((0, 6))
+    for i in prange(src.shape[0]):
+        c, v, o, w = _link_scan(arr, src[i, 0], src[i, 1], dst[i, 0], dst[i, 1],
+                                obs_h[i], tgt_h[i], res_y, res_x, curvature_k,
+                                use_bilinear, wavelength, no_prof)
+        out[i, 0] = c
+        out[i, 1] = v
+        out[i, 2] = o
+        out[i, 3] = w
+
+def _wavelength(freq_hz, z_scale):
+    """
+    Wavelength in kernel units (map units / z_scale), or 0 without freq_hz.
+    """
+    if freq_hz is None:
+        return 0.0
+    if freq_hz <= 0.0:
+        raise ValueError("freq_hz must be > 0")
+    return SPEED_OF_LIGHT / float(freq_hz) / z_scale
+
+def link_profile(dem, p1, p2, obs_h=0.0, tgt_h=0.0, freq_hz=None,
+                 interpolation="nearest", curvature_k=0.0, precision=None):
+    """
+    Terrain profile of a point-to-point link.
+
+    The path is sampled exactly as by `is_visible`: Bresenham cells for
+    "nearest", one bilinear sample per cell of the longest axis for
+    "bilinear". Map units are taken to be metres for the Earth curvature
+    and the Fresnel radius.
+
+    Parameters
+    ----------
+    dem : DEM
+    p1, p2 : (row, col)
+        Transmitter and receiver cells.
+    obs_h, tgt_h : float
+        Antenna heights above terrain at p1 and p2.
+    freq_hz : float or None
+        Link frequency; gives the first Fresnel zone radius of every sample.
+    interpolation, curvature_k, precision :
+        As in `is_visible`.
+
+    Returns
+    -------
+    LinkProfile
+        Terrain is NaN at samples on void cells.
+    """
+    if interpolation not in ("nearest", "bilinear"):
+        raise ValueError(f"Unknown interpolation {interpolation!r}")
+    dem = dem.with_precision(precision)
+    (r0, c0), (r1, c1) = p1, p2
+    for r, c in (p1, p2):
+        if not (0 <= r < dem.nrows and 0 <= c < dem.ncols):
+            raise ValueError(f"cell {(r, c)} is outside the DEM")
+        if dem.valid is not None and not dem.valid[r, c]:
+            raise ValueError(f"cell {(r, c)} is void")
+    wavelength = _wavelength(freq_hz, dem.z_scale)
+    obs_h, tgt_h, _, _, ry, rx, k = kernel_units(
+        dem, float(obs_h), float(tgt_h), -1.0, 0.0, float(curvature_k))
+    prof = np.empty((_n_samples(r0, c0, r1, c1), 6))
+    _link_scan(dem.array, r0, c0, r1, c1, obs_h, tgt_h, ry, rx, k,
+               interpolation == "bilinear", wavelength, prof)
+    # back from quantization steps to map units
+    prof[:, 2:] *= dem.z_scale
+    prof[:, 3:5] += dem.z_offset
+    if dem.valid is not None:
+        # void samples have no terrain
+        void = ~dem.valid[np.rint(prof[:, 0]).astype(np.int64),
+                          np.rint(prof[:, 1]).astype(np.int64)]
+        prof[void, 3] = np.nan
+    return LinkProfile(*(np.ascontiguousarray(prof[:, j]) for j in range(6)))
+
+def link_clearance(dem, src_rc, dst_rc, obs_h=0.0, tgt_h=0.0, freq_hz=None,
+                   interpolation="nearest", curvature_k=0.0, precision=None):
+    """
+    Clearance and first-Fresnel-zone obstruction of many links, in one
+    parallel kernel.
+
+    Every link is walked once over the samples of `link_profile`, without
+    storing the profile. `clearance` equals `clearance_many`. With a
+    frequency, `fresnel_ratio` is the smallest clearance in units of the
+    local first Fresnel zone radius (negative when the sight line itself
+    is blocked) and `obstruction` the largest percentage of the zone's
+    circular cross-section lying below the terrain along the path.
+
+    Parameters
+    ----------
+    dem : DEM
+    src_rc, dst_rc : (N, 2) array-like of (row, col)
+    obs_h, tgt_h : float or (N,) array-like
+        Antenna heights above terrain, scalar or per link.
+    freq_hz : float or None
+        Link frequency; the Fresnel terms are NaN without it.
+    interpolation, curvature_k, precision :
+        As in `is_visible_many`.
+
+    Returns
+    -------
+    LinkClearance of (N,) float64 arrays; NaN for links with a void end.
+    """
+    if interpolation not in ("nearest", "bilinear"):
+        raise ValueError(f"Unknown interpolation {interpolation!r}")
+    dem = dem.with_precision(precision)
+    wavelength = _wavelength(freq_hz, dem.z_scale)
+    src, dst, obs, tgt, keep = _pair_arrays(dem, src_rc, dst_rc, obs_h, tgt_h)
+    report_voids("link_clearance", len(keep) - src.shape[0], "pairs")
+    obs, tgt, _, _, ry, rx, k = kernel_units(dem, obs, tgt, -1.0, 0.0,
+                                             float(curvature_k))
+    out = np.full((len(keep), 4), np.nan)
+    stats = np.empty((src.shape[0], 4))
+    _link_clearance_many(dem.array, src, dst, obs, tgt, ry, rx, k,
+                         interpolation == "bilinear", wavelength, stats)
+    # back from quantization steps to map units
+    stats[:, 0] *= dem.z_scale
+    stats[:, 3] *= dem.z_scale
+    out[keep] = stats
+    return LinkClearance(*(np.ascontiguousarray(out[:, j]) for j in range(4)))
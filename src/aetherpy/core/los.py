@@ -1,12 +1,18 @@
 import math
-from numba import njit
-from .utils import compute_slope, euclidean_distance
+import numpy as np
+from numba import njit, prange
+from .utils import (compute_slope, euclidean_distance, kernel_units,
+                    report_voids)
+from ..data.pyramid import dem_pyramid, empty_pyramid
 
-@njit
+@njit(cache=True)
 def _is_visible(arr, r0, c0, r1, c1, obs_h, tgt_h, res_y, res_x, curvature_k):
     """
     Numba‑accelerated LOS on raw elevation array with real‑world scaling.
     """
+    if r0 == r1 and c0 == c1:
+        # no cells between the endpoints, as in the pyramid/bilinear kernels
+        return True
     height0 = arr[r0, c0] + obs_h
     height1 = arr[r1, c1] + tgt_h
     # — curvature correction at the target —
@@ -63,27 +69,45 @@ def _is_visible(arr, r0, c0, r1, c1, obs_h, tgt_h, res_y, res_x, curvature_k):
 
     return True
 
-def is_visible(dem, p1, p2, obs_h=0.0, tgt_h=0.0, interpolation="nearest", curvature_k=0.0):
+def is_visible(dem, p1, p2, obs_h=0.0, tgt_h=0.0, interpolation="nearest", curvature_k=0.0,
+               pyramid=None, precision=None):
     """
     Public API:
       dem  – DEM instance
       p1,p2: (row, col) tuples in the DEM grid
       obs_h, tgt_h: height offsets above the surface
       interpolation: "nearest" or "bilinear"
-    Returns True if p2 is visible from p1.
+      pyramid: None, True or a Pyramid – hierarchical max/min elevation
+               pyramid used to skip clear spans of long rays (True builds or
+               loads the cached one via `dem_pyramid`); same result
+      precision: None or a storage precision ("float32", "int16", …) the
+               DEM is converted to (once, see `DEM.with_precision`)
+    Returns True if p2 is visible from p1; False if either cell is void.
     """
     r0, c0 = p1
     r1, c1 = p2
+    if interpolation not in ("nearest", "bilinear"):
+        raise ValueError(f"Unknown interpolation {interpolation!r}")
+    dem = dem.with_precision(precision)
+    if dem.valid is not None and not (dem.valid[r0, c0] and dem.valid[r1, c1]):
+        return False
     arr = dem.array
-    ry, rx = dem.res_y, dem.res_x
+    obs_h, tgt_h, _, _, ry, rx, curvature_k = kernel_units(
+        dem, obs_h, tgt_h, -1.0, 0.0, curvature_k)
+    if pyramid is True:
+        pyramid = dem_pyramid(dem, interpolation)
     if interpolation == "nearest":
+        if pyramid is not None:
+            return _is_visible_pyramid(arr, pyramid, r0, c0, r1, c1, obs_h, tgt_h,
+                                       ry, rx, curvature_k)
         return _is_visible(arr, r0, c0, r1, c1, obs_h, tgt_h, ry, rx, curvature_k)
-    elif interpolation == "bilinear":
-        return _is_visible_bilinear(arr, r0, c0, r1, c1, obs_h, tgt_h, ry, rx,                       curvature_k)
     else:
-        raise ValueError(f"Unknown interpolation {interpolation!r}")
+        if pyramid is not None:
+            return _is_visible_bilinear_pyramid(arr, pyramid, r0, c0, r1, c1, obs_h,
+                                                tgt_h, ry, rx, curvature_k)
+        return _is_visible_bilinear(arr, r0, c0, r1, c1, obs_h, tgt_h, ry, rx,                       curvature_k)
 
-@njit
+@njit(cache=True)
 def _bilinear_sample(arr, row_f, col_f):
     """
     Numba‑friendly bilinear interpolation on a 2D array.
@@ -108,7 +132,7 @@ def _bilinear_sample(arr, row_f, col_f):
           + h01 * (1 - dr) * dc
           + h11 * dr       * dc)
 
-@njit
+@njit(cache=True)
 def _is_visible_bilinear(arr, r0, c0, r1, c1, obs_h, tgt_h, res_y, res_x, curvature_k):
     """
     Parametric (DDA) LOS with bilinear sampling.
@@ -154,3 +178,527 @@ def _is_visible_bilinear(arr, r0, c0, r1, c1, obs_h, tgt_h, res_y, res_x, curvat
             return False
 
     return True
+
+@njit(cache=True)
+def _max_slope(arr, r0, c0, r1, c1, obs_h, res_y, res_x, curvature_k):
+    """
+    Horizon slope between (r0,c0) and (r1,c1): the largest curvature‑corrected
+    slope of the intermediate Bresenham cells seen from the raised observer,
+    i.e. the value `_is_visible` compares the target slope against
+    (-inf if there are no intermediate cells).
+    """
+    height0 = arr[r0, c0] + obs_h
+    max_slope = -math.inf
+
+    # Bresenham’s setup (steep vs shallow), as in _is_visible
+    dr = abs(r1 - r0)
+    dc = abs(c1 - c0)
+    steep = dr > dc
+    if steep:
+        r0_, c0_ = c0, r0
+        r1_, c1_ = c1, r1
+    else:
+        r0_, c0_ = r0, c0
+        r1_, c1_ = r1, c1
+
+    dx = abs(c1_ - c0_)
+    dy = abs(r1_ - r0_)
+    error = dx // 2
+    ystep = 1 if r1_ > r0_ else -1
+    xstep = 1 if c1_ > c0_ else -1
+    y = r0_
+    x = c0_ + xstep
+
+    while x != c1_:
+        error -= dy
+        if error < 0:
+            y += ystep
+            error += dx
+        rr, cc = (x, y) if steep else (y, x)
+
+        if curvature_k > 0.0:
+            d_i = euclidean_distance(r0, c0, rr, cc, res_y, res_x)
+            drop_i = (d_i * d_i) / (2.0 * 6371000.0 * curvature_k)
+        else:
+            drop_i = 0.0
+        slope_i = compute_slope((arr[rr, cc] - height0) - drop_i,
+                                r0, c0, rr, cc, res_y, res_x)
+        if slope_i > max_slope:
+            max_slope = slope_i
+
+        x += xstep
+
+    return max_slope
+
+@njit(cache=True)
+def _max_slope_bilinear(arr, r0, c0, r1, c1, obs_h, res_y, res_x, curvature_k):
+    """
+    Bilinear (DDA) counterpart of `_max_slope`, sampling the line exactly
+    like `_is_visible_bilinear`.
+    """
+    h0 = _bilinear_sample(arr, r0, c0) + obs_h
+    max_slope = -math.inf
+
+    dr = r1 - r0
+    dc = c1 - c0
+    n_steps = int(math.ceil(max(abs(dr), abs(dc))))
+    if n_steps == 0:
+        return max_slope
+    d_r = dr / n_steps
+    d_c = dc / n_steps
+
+    for step in range(1, n_steps):
+        rf = r0 + d_r * step
+        cf = c0 + d_c * step
+        hi = _bilinear_sample(arr, rf, cf)
+        dist_i = euclidean_distance(r0, c0, rf, cf, res_y, res_x)
+        if curvature_k > 0.0:
+            drop_i = (dist_i * dist_i) / (2.0 * 6371000.0 * curvature_k)
+        else:
+            drop_i = 0.0
+        slope_i = ((hi - h0) - drop_i) / dist_i if dist_i > 0.0 else -1e9
+        if slope_i > max_slope:
+            max_slope = slope_i
+
+    return max_slope
+
+# Absolute tolerance (map units) of the pyramid bounds, so that a span is only
+# skipped or declared blocked when the full-resolution test would agree.
+_PYR_TOL = 1e-6
+
+@njit(cache=True)
+def _block_dist(r0, c0, br, bc, ext, res_y, res_x):
+    """
+    Smallest and largest distance from cell (r0,c0) to the rectangle of rows
+    br..br+ext and cols bc..bc+ext.
+    """
+    dr_min = max(br - r0, 0, r0 - (br + ext)) * res_y
+    dc_min = max(bc - c0, 0, c0 - (bc + ext)) * res_x
+    dr_max = max(abs(br - r0), abs(br + ext - r0)) * res_y
+    dc_max = max(abs(bc - c0), abs(bc + ext - c0)) * res_x
+    return (math.sqrt(dr_min * dr_min + dc_min * dc_min),
+            math.sqrt(dr_max * dr_max + dc_max * dc_max))
+
+@njit(cache=True)
+def _sight_line_bounds(height0, slope, inv_2rk, dmin, dmax):
+    """
+    Lowest and highest terrain elevation that the sight line
+    height0 + slope·d + d²·inv_2rk (the target slope with the curvature drop
+    added back) reaches over distances dmin..dmax.
+    """
+    lo_d = dmin
+    if inv_2rk > 0.0:
+        # the sight line is a convex parabola in d
+        d_star = -slope / (2.0 * inv_2rk)
+        if d_star > dmax:
+            lo_d = dmax
+        elif d_star > dmin:
+            lo_d = d_star
+    elif slope < 0.0:
+        lo_d = dmax
+    lo = height0 + slope * lo_d + lo_d * lo_d * inv_2rk
+    hi = max(height0 + slope * dmin + dmin * dmin * inv_2rk,
+             height0 + slope * dmax + dmax * dmax * inv_2rk)
+    return lo, hi
+
+@njit(cache=True)
+def _is_visible_pyramid(arr, pyr, r0, c0, r1, c1, obs_h, tgt_h, res_y, res_x, curvature_k):
+    """
+    `_is_visible` accelerated by a max/min elevation Pyramid (nearest).
+
+    Before testing a cell, the coarsest pyramid block containing it whose
+    Bresenham span stays inside the block is compared to the sight line:
+    if the block maximum stays below it the whole span is skipped, if the
+    block minimum rises above it the target is hidden. Only ambiguous spans
+    descend to full resolution, so the result equals `_is_visible`.
+    """
+    height0 = arr[r0, c0] + obs_h
+    height1 = arr[r1, c1] + tgt_h
+    if curvature_k > 0.0:
+        inv_2rk = 1.0 / (2.0 * 6371000.0 * curvature_k)
+        d_t = euclidean_distance(r0, c0, r1, c1, res_y, res_x)
+        drop_t = d_t * d_t * inv_2rk
+    else:
+        inv_2rk = 0.0
+        drop_t = 0.0
+    slope_target = compute_slope((height1 - height0) - drop_t,
+                                 r0, c0, r1, c1, res_y, res_x)
+
+    # Bresenham’s setup (steep vs shallow), as in _is_visible
+    steep = abs(r1 - r0) > abs(c1 - c0)
+    if steep:
+        r0_, c0_ = c0, r0
+        r1_, c1_ = c1, r1
+    else:
+        r0_, c0_ = r0, c0
+        r1_, c1_ = r1, c1
+    dx = abs(c1_ - c0_)
+    dy = abs(r1_ - r0_)
+    if dx == 0:
+        return True
+    half = dx // 2
+    ystep = 1 if r1_ > r0_ else -1
+    xstep = 1 if c1_ > c0_ else -1
+
+    # step t visits x = c0_ + t·xstep; y follows from the Bresenham error
+    # term in closed form, so spans can be skipped without walking them
+    t = 1
+    while t < dx:
+        x = c0_ + xstep * t
+        y = r0_ + ystep * (-((half - t * dy) // dx))
+        rr, cc = (x, y) if steep else (y, x)
+
+        skipped = False
+        for lv in range(pyr.n_levels, 0, -1):
+            br = rr >> lv
+            bc = cc >> lv
+            o = pyr.offsets[lv] + br * pyr.shapes[lv, 1] + bc
+            dmin, dmax = _block_dist(r0, c0, br << lv, bc << lv, (1 << lv) - 1,
+                                     res_y, res_x)
+            lo, hi = _sight_line_bounds(height0, slope_target, inv_2rk, dmin, dmax)
+            # the current cell alone already blocks the line
+            if pyr.mins[o] > hi + _PYR_TOL:
+                return False
+            if pyr.maxs[o] >= lo - _PYR_TOL:
+                continue
+            # last step whose cell is still inside the block
+            xb = x >> lv
+            x_end = ((xb + 1) << lv) - 1 if xstep > 0 else xb << lv
+            t_end = min(t + abs(x_end - x), dx - 1)
+            y_end = r0_ + ystep * (-((half - t_end * dy) // dx))
+            if (y_end >> lv) != (y >> lv):
+                continue
+            t = t_end + 1
+            skipped = True
+            break
+        if skipped:
+            continue
+
+        if curvature_k > 0.0:
+            d_i = euclidean_distance(r0, c0, rr, cc, res_y, res_x)
+            drop_i = (d_i * d_i) / (2.0 * 6371000.0 * curvature_k)
+        else:
+            drop_i = 0.0
+        slope_i = compute_slope((arr[rr, cc] - height0) - drop_i,
+                                r0, c0, rr, cc, res_y, res_x)
+        if slope_i > slope_target:
+            return False
+        t += 1
+
+    return True
+
+@njit(cache=True)
+def _is_visible_bilinear_pyramid(arr, pyr, r0, c0, r1, c1, obs_h, tgt_h, res_y, res_x,
+                                 curvature_k):
+    """
+    `_is_visible_bilinear` accelerated by a bilinear Pyramid (built with
+    `bilinear=True`, so its blocks bound every bilinear sample whose floor
+    cell they contain). Same result as `_is_visible_bilinear`.
+    """
+    h0 = _bilinear_sample(arr, r0, c0) + obs_h
+    h1 = _bilinear_sample(arr, r1, c1) + tgt_h
+
+    dr = r1 - r0
+    dc = c1 - c0
+    n_steps = int(math.ceil(max(abs(dr), abs(dc))))
+    if n_steps == 0:
+        return True
+    d_r = dr / n_steps
+    d_c = dc / n_steps
+
+    dist_target = euclidean_distance(r0, c0, r1, c1, res_y, res_x)
+    if curvature_k > 0.0:
+        inv_2rk = 1.0 / (2.0 * 6371000.0 * curvature_k)
+        drop_t = (dist_target * dist_target) * inv_2rk
+    else:
+        inv_2rk = 0.0
+        drop_t = 0.0
+    slope_target = ((h1 - h0) - drop_t) / dist_target if dist_target > 0.0 else -1e9
+
+    # the major axis advances exactly one cell per step
+    row_major = abs(dr) >= abs(dc)
+    step = 1
+    while step < n_steps:
+        rf = r0 + d_r * step
+        cf = c0 + d_c * step
+        fr = int(math.floor(rf))
+        fc = int(math.floor(cf))
+
+        skipped = False
+        for lv in range(pyr.n_levels, 0, -1):
+            br = fr >> lv
+            bc = fc >> lv
+            o = pyr.offsets[lv] + br * pyr.shapes[lv, 1] + bc
+            dmin, dmax = _block_dist(r0, c0, br << lv, bc << lv, 1 << lv,
+                                     res_y, res_x)
+            lo, hi = _sight_line_bounds(h0, slope_target, inv_2rk, dmin, dmax)
+            if pyr.mins[o] > hi + _PYR_TOL:
+                return False
+            if pyr.maxs[o] >= lo - _PYR_TOL:
+                continue
+            m = fr if row_major else fc
+            m_step = (1 if dr > 0 else -1) if row_major else (1 if dc > 0 else -1)
+            mb = m >> lv
+            m_end = ((mb + 1) << lv) - 1 if m_step > 0 else mb << lv
+            s_end = min(step + abs(m_end - m), n_steps - 1)
+            if row_major:
+                n_end = int(math.floor(c0 + d_c * s_end)) >> lv
+                same = n_end == bc
+            else:
+                n_end = int(math.floor(r0 + d_r * s_end)) >> lv
+                same = n_end == br
+            if not same:
+                continue
+            step = s_end + 1
+            skipped = True
+            break
+        if skipped:
+            continue
+
+        hi_s = _bilinear_sample(arr, rf, cf)
+        dist_i = euclidean_distance(r0, c0, rf, cf, res_y, res_x)
+        if curvature_k > 0.0:
+            drop_i = (dist_i * dist_i) / (2.0 * 6371000.0 * curvature_k)
+        else:
+            drop_i = 0.0
+        slope_i = ((hi_s - h0) - drop_i) / dist_i if dist_i > 0.0 else -1e9
+        if slope_i > slope_target:
+            return False
+        step += 1
+
+    return True
+
+@njit(cache=True)
+def _clearance(arr, r0, c0, r1, c1, obs_h, tgt_h, res_y, res_x, curvature_k):
+    """
+    Vertical clearance of the sight line over the intermediate Bresenham
+    cells of `_is_visible`: min over cells of d_i·(slope_target − slope_i),
+    i.e. how far the curvature‑corrected terrain stays below the line.
+    Negative exactly when `_is_visible` is False; +inf without intermediate
+    cells.
+    """
+    height0 = arr[r0, c0] + obs_h
+    height1 = arr[r1, c1] + tgt_h
+    if curvature_k > 0.0:
+        d_t = euclidean_distance(r0, c0, r1, c1, res_y, res_x)
+        drop_t = (d_t * d_t) / (2.0 * 6371000.0 * curvature_k)
+    else:
+        drop_t = 0.0
+    slope_target = compute_slope((height1 - height0) - drop_t,
+                                 r0, c0, r1, c1, res_y, res_x)
+    clear = math.inf
+
+    steep = abs(r1 - r0) > abs(c1 - c0)
+    if steep:
+        r0_, c0_ = c0, r0
+        r1_, c1_ = c1, r1
+    else:
+        r0_, c0_ = r0, c0
+        r1_, c1_ = r1, c1
+    dx = abs(c1_ - c0_)
+    dy = abs(r1_ - r0_)
+    error = dx // 2
+    ystep = 1 if r1_ > r0_ else -1
+    xstep = 1 if c1_ > c0_ else -1
+    y = r0_
+    for t in range(1, dx):
+        error -= dy
+        if error < 0:
+            y += ystep
+            error += dx
+        x = c0_ + xstep * t
+        rr, cc = (x, y) if steep else (y, x)
+
+        d_i = euclidean_distance(r0, c0, rr, cc, res_y, res_x)
+        if curvature_k > 0.0:
+            drop_i = (d_i * d_i) / (2.0 * 6371000.0 * curvature_k)
+        else:
+            drop_i = 0.0
+        slope_i = compute_slope((arr[rr, cc] - height0) - drop_i,
+                                r0, c0, rr, cc, res_y, res_x)
+        c_i = d_i * (slope_target - slope_i)
+        if c_i < clear:
+            clear = c_i
+
+    return clear
+
+@njit(cache=True)
+def _clearance_bilinear(arr, r0, c0, r1, c1, obs_h, tgt_h, res_y, res_x, curvature_k):
+    """
+    Bilinear (DDA) counterpart of `_clearance`, sampling the line exactly
+    like `_is_visible_bilinear`.
+    """
+    h0 = _bilinear_sample(arr, r0, c0) + obs_h
+    h1 = _bilinear_sample(arr, r1, c1) + tgt_h
+    clear = math.inf
+
+    dr = r1 - r0
+    dc = c1 - c0
+    n_steps = int(math.ceil(max(abs(dr), abs(dc))))
+    if n_steps == 0:
+        return clear
+    d_r = dr / n_steps
+    d_c = dc / n_steps
+
+    dist_target = euclidean_distance(r0, c0, r1, c1, res_y, res_x)
+    if curvature_k > 0.0:
+        drop_t = (dist_target * dist_target) / (2.0 * 6371000.0 * curvature_k)
+    else:
+        drop_t = 0.0
+    slope_target = ((h1 - h0) - drop_t) / dist_target if dist_target > 0.0 else -1e9
+
+    for step in range(1, n_steps):
+        rf = r0 + d_r * step
+        cf = c0 + d_c * step
+        hi = _bilinear_sample(arr, rf, cf)
+        dist_i = euclidean_distance(r0, c0, rf, cf, res_y, res_x)
+        if curvature_k > 0.0:
+            drop_i = (dist_i * dist_i) / (2.0 * 6371000.0 * curvature_k)
+        else:
+            drop_i = 0.0
+        slope_i = ((hi - h0) - drop_i) / dist_i if dist_i > 0.0 else -1e9
+        c_i = dist_i * (slope_target - slope_i)
+        if c_i < clear:
+            clear = c_i
+
+    return clear
+
+@njit(parallel=True, cache=True)
+def _visible_many(arr, src, dst, obs_h, tgt_h, res_y, res_x, use_bilinear,
+                  curvature_k, pyr, use_pyr, out):
+    """
+    `_is_visible` / `_is_visible_bilinear` (optionally pyramid‑accelerated)
+    for every (src[i], dst[i]) pair, in parallel.
+    """
+    for i in prange(src.shape[0]):
+        r0, c0 = src[i, 0], src[i, 1]
+        r1, c1 = dst[i, 0], dst[i, 1]
+        if use_bilinear:
+            if use_pyr:
+                out[i] = _is_visible_bilinear_pyramid(arr, pyr, r0, c0, r1, c1,
+                                                      obs_h[i], tgt_h[i],
+                                                      res_y, res_x, curvature_k)
+            else:
+                out[i] = _is_visible_bilinear(arr, r0, c0, r1, c1, obs_h[i], tgt_h[i],
+                                              res_y, res_x, curvature_k)
+        else:
+            if use_pyr:
+                out[i] = _is_visible_pyramid(arr, pyr, r0, c0, r1, c1,
+                                             obs_h[i], tgt_h[i],
+                                             res_y, res_x, curvature_k)
+            else:
+                out[i] = _is_visible(arr, r0, c0, r1, c1, obs_h[i], tgt_h[i],
+                                     res_y, res_x, curvature_k)
+
+@njit(parallel=True, cache=True)
+def _clearance_many(arr, src, dst, obs_h, tgt_h, res_y, res_x, use_bilinear,
+                    curvature_k, out):
+    """
+    `_clearance` / `_clearance_bilinear` for every pair, in parallel.
+    """
+    for i in prange(src.shape[0]):
+        if use_bilinear:
+            out[i] = _clearance_bilinear(arr, src[i, 0], src[i, 1], dst[i, 0], dst[i, 1],
+                                         obs_h[i], tgt_h[i], res_y, res_x, curvature_k)
+        else:
+            out[i] = _clearance(arr, src[i, 0], src[i, 1], dst[i, 0], dst[i, 1],
+                                obs_h[i], tgt_h[i], res_y, res_x, curvature_k)
+
+def _pair_arrays(dem, src_rc, dst_rc, obs_h, tgt_h):
+    """
+    Validate and broadcast the inputs of the batched LOS functions; pairs
+    with a void end are dropped. Returns (src, dst, obs, tgt, keep) with
+    `keep` the boolean mask of the pairs kept.
+    """
+    src = np.ascontiguousarray(src_rc, dtype=np.int64).reshape(-1, 2)
+    dst = np.ascontiguousarray(dst_rc, dtype=np.int64).reshape(-1, 2)
+    if src.shape != dst.shape:
+        raise ValueError("src_rc and dst_rc must hold the same number of pairs")
+    for name, pts in (("src_rc", src), ("dst_rc", dst)):
+        if ((pts < 0).any() or (pts[:, 0] >= dem.nrows).any()
+                or (pts[:, 1] >= dem.ncols).any()):
+            raise ValueError(f"{name} contains cells outside the DEM")
+    n = src.shape[0]
+    obs = np.ascontiguousarray(np.broadcast_to(np.asarray(obs_h, np.float64), (n,)))
+    tgt = np.ascontiguousarray(np.broadcast_to(np.asarray(tgt_h, np.float64), (n,)))
+    if dem.valid is None:
+        return src, dst, obs, tgt, np.ones(n, dtype=bool)
+    keep = dem.valid[src[:, 0], src[:, 1]] & dem.valid[dst[:, 0], dst[:, 1]]
+    return src[keep], dst[keep], obs[keep], tgt[keep], keep
+
+def is_visible_many(dem, src_rc, dst_rc, obs_h=0.0, tgt_h=0.0, interpolation="nearest",
+                    curvature_k=0.0, pyramid=None, precision=None):
+    """
+    Batched `is_visible` for many point‑to‑point pairs in one parallel kernel.
+
+    Parameters
+    ----------
+    dem : DEM
+    src_rc, dst_rc : (N, 2) array‑like of (row, col)
+        Observer and target cell of every pair.
+    obs_h, tgt_h : float or (N,) array‑like
+        Height offsets above the surface, scalar or per pair.
+    interpolation : "nearest" or "bilinear"
+    curvature_k : float
+    pyramid : None, True or Pyramid
+        As in `is_visible`.
+    precision : None or str
+        As in `is_visible`.
+
+    Returns
+    -------
+    visible : (N,) bool ndarray
+        False for pairs with a void end, which are not traced.
+    """
+    if interpolation not in ("nearest", "bilinear"):
+        raise ValueError(f"Unknown interpolation {interpolation!r}")
+    dem = dem.with_precision(precision)
+    src, dst, obs, tgt, keep = _pair_arrays(dem, src_rc, dst_rc, obs_h, tgt_h)
+    report_voids("is_visible_many", len(keep) - src.shape[0], "pairs")
+    obs, tgt, _, _, ry, rx, k = kernel_units(dem, obs, tgt, -1.0, 0.0,
+                                             float(curvature_k))
+    if pyramid is True:
+        pyramid = dem_pyramid(dem, interpolation)
+    use_pyr = pyramid is not None
+    out = np.empty(src.shape[0], dtype=np.bool_)
+    _visible_many(dem.array, src, dst, obs, tgt, ry, rx,
+                  interpolation == "bilinear", k,
+                  pyramid if use_pyr else empty_pyramid(), use_pyr, out)
+    if src.shape[0] < len(keep):
+        full = np.zeros(len(keep), dtype=np.bool_)
+        full[keep] = out
+        out = full
+    return out
+
+def clearance_many(dem, src_rc, dst_rc, obs_h=0.0, tgt_h=0.0, interpolation="nearest",
+                   curvature_k=0.0, precision=None):
+    """
+    Clearance margin of many point‑to‑point sight lines: the smallest
+    vertical distance (map units) between the line and the curvature‑corrected
+    terrain along it. Negative where the line is blocked (exactly where
+    `is_visible_many` is False), +inf for adjacent or identical cells, NaN
+    for pairs with a void end.
+
+    Parameters are as in `is_visible_many`.
+
+    Returns
+    -------
+    clearance : (N,) float64 ndarray
+    """
+    if interpolation not in ("nearest", "bilinear"):
+        raise ValueError(f"Unknown interpolation {interpolation!r}")
+    dem = dem.with_precision(precision)
+    src, dst, obs, tgt, keep = _pair_arrays(dem, src_rc, dst_rc, obs_h, tgt_h)
+    report_voids("clearance_many", len(keep) - src.shape[0], "pairs")
+    obs, tgt, _, _, ry, rx, k = kernel_units(dem, obs, tgt, -1.0, 0.0,
+                                             float(curvature_k))
+    out = np.empty(src.shape[0], dtype=np.float64)
+    _clearance_many(dem.array, src, dst, obs, tgt, ry, rx,
+                    interpolation == "bilinear", k, out)
+    # back from quantization steps to map units
+    out *= dem.z_scale
+    if src.shape[0] < len(keep):
+        full = np.full(len(keep), np.nan)
+        full[keep] = out
+        out = full
+    return out
@@ -1,10 +1,20 @@
 # aetherpy/core/multiobserver.py
 
-import numpy as np
 import math
+import numpy as np
 from collections import namedtuple
-from .sweep import viewshed_sweep, _viewshed_naive
-from numba import njit, prange
+from .los import (_is_visible, _is_visible_bilinear, _bilinear_sample,
+                  _max_slope, _max_slope_bilinear)
+from .sweep import _r2_into
+from .templates import ray_template, empty_template, _r2_template_into
+from .constrained import constraint_template, sector_window, admits
+from .utils import (parse_constraints, window_bounds, half_extent,
+                    kernel_units, euclidean_distance, compute_slope)
+from .siting import visibility_signatures, _drop_voids
+from .visibility_matrix import VisibilityMatrix
+from .backends import (check_backend, numba_schedule, map_chunks, task_chunks,
+                       n_workers)
+from numba import njit, prange, get_num_threads, get_thread_id
 
 # Namedtuple to carry counts + all three ratio types
 VisibilityResult = namedtuple(
@@ -32,7 +42,14 @@ def inverse_visibility(
     observer_mask=None,
     weight_by_cell=False,   # if True, interpret target_mask values (0–1) as weights
     curvature_k=0.0,         # Earth curvature k-factor (1.3 ≈ 4/3), 0=no correction
-    n_jobs=None,            # ignored; parallelism via Numba
+    n_jobs=None,            # threads / worker processes (None = all cores)
+    engine="naive",         # "naive" (exact, per pair) or "r2" (per‐target sweep)
+    tgt_h=0.0,              # target height above terrain
+    symmetric=False,        # evaluate each observer/target pair once
+    return_matrix=False,    # also return the bit-packed VisibilityMatrix
+    backend="numba",        # "numba", "process" or "joblib"
+    chunk_size=None,        # targets per scheduling chunk
+    precision=None,         # DEM storage precision (None = as stored)
 ):
     """
     Inverse‐viewshed computation with optional per‐cell weighting.
@@ -52,8 +69,12 @@ def inverse_visibility(
     target_mask : 2D array
         If weight_by_cell=False: bool mask of target cells.
         If weight_by_cell=True: float mask of weights [0..1].
-    obs_h : float
-        Observer height above terrain.
+    obs_h : float or 1D array-like
+        Observer height above terrain. For an array of heights every target
+        is swept once: the horizon from a target does not depend on the
+        height of the observer it is compared with, so all heights share
+        one traversal. Every field of the result then gets a leading
+        height axis; symmetric and return_matrix are not available.
     interpolation : "nearest" or "bilinear"
     max_dist : float or None
         Maximum distance in map units.
@@ -64,8 +85,59 @@ def inverse_visibility(
         Which cells may act as observers.
     weight_by_cell : bool
         If True, use target_mask values as weights; else treat mask as boolean.
+    engine : "naive" or "r2"
+        "naive" traces one line per target/observer pair. "r2" runs an R2
+        sweep from every target, reusing the cached RayTemplate of the
+        (resolution, max_dist, interpolation, curvature_k) combination for
+        all targets.
+    tgt_h : float
+        Target height above terrain. Visibility is evaluated from the target
+        (raised by tgt_h) towards the observer (raised by obs_h), which by
+        reciprocity of the line of sight answers whether the observer sees
+        the target. Constraints are measured from the target as well.
+    symmetric : bool
+        Use LOS reciprocity when cells are both targets and observers: each
+        such unordered pair is traced once, from the target listed first
+        (row‐major order), and counted in both directions. Requires the
+        "naive" engine, obs_h == tgt_h and no azimuth or elevation‐angle
+        limits (which are not symmetric). Opt-in: the counts then differ
+        from the default one‐directional trace where the two Bresenham
+        lines of a pair differ.
+    return_matrix : bool
+        Also return the full observer × target relation as a bit‐packed
+        VisibilityMatrix (one bit per pair, rows only for observers that
+        see at least one target); the counts are then derived from the
+        matrix. Every pair is traced from its target, so symmetric=True
+        is rejected.
+    backend : "numba", "process" or "joblib"
+        Execution backend of the counting kernel, as in
+        `cumulative_viewshed`: Numba threads with dynamic scheduling of
+        the targets, or chunks of targets run by single‐threaded worker
+        processes that share the DEM and masks. The matrix of
+        return_matrix is always built on Numba threads.
+    n_jobs : int or None
+        Number of threads or worker processes (None = all cores).
+    chunk_size : int or None
+        Targets per scheduling chunk (see `cumulative_viewshed`).
+    precision : None or str
+        Storage precision the DEM is converted to, as in `viewshed_sweep`.
+
+    Void cells of the DEM are neither targets nor observers: they are
+    dropped from both masks before any sight line is traced, and the
+    ratios count only non-void cells.
+
+    Returns
+    -------
+    VisibilityResult, or (VisibilityResult, VisibilityMatrix) if
+    return_matrix is set.
     """
+    if engine not in ("naive", "r2"):
+        raise ValueError(f"Unknown engine {engine!r}")
+    check_backend(backend)
+    dem = dem.with_precision(precision)
     nrows, ncols = dem.array.shape
+    target_mask, observer_mask = _drop_voids(dem, target_mask, observer_mask,
+                                             "inverse_visibility")
 
     # Build weights array
     arr_w = (
@@ -86,47 +158,128 @@ def inverse_visibility(
         observer_mask = np.ones_like(arr_w, dtype=bool)
     total_observers = int(observer_mask.sum())
 
-    # Parse distance limits
-    maxd = -1.0 if max_dist is None else float(max_dist)
-    if dist_range is not None:
-        min_d, maxd = dist_range
-    else:
-        min_d = 0.0
+    # Parse distance, azimuth and elevation‐angle limits
+    maxd, min_d, az1, az2, elev_min, elev_max = parse_constraints(
+        max_dist, dist_range, azimuth_range, elev_angle_range
+    )
+    heights = np.asarray(obs_h, dtype=np.float64)
+    k_obs_h, k_tgt_h, k_maxd, k_min_d, res_y, res_x, k_curv = kernel_units(
+        dem, heights if heights.ndim else float(obs_h), float(tgt_h), maxd,
+        min_d, float(curvature_k))
 
-    # Parse azimuth (degrees → radians)
-    if azimuth_range is not None:
-        az1 = math.radians(azimuth_range[0])
-        az2 = math.radians(azimuth_range[1])
+    # distance and azimuth filters of every offset, shared by all targets
+    ct = constraint_template(res_y, res_x, k_maxd, k_min_d, az1, az2,
+                             elev_min, elev_max, nrows, ncols)
+
+    # Interpolation mode
+    use_bi = (interpolation.lower() == "bilinear")
+
+    if heights.ndim:
+        if heights.ndim != 1:
+            raise ValueError("obs_h must be a scalar or a 1D array of heights")
+        if symmetric or return_matrix:
+            raise ValueError("several observer heights cannot be combined "
+                             "with symmetric=True or return_matrix")
+        return _inverse_heights(dem.array, targets, weights, observer_mask,
+                                np.ascontiguousarray(k_obs_h), k_tgt_h,
+                                use_bi, k_curv, engine == "r2", ct,
+                                total_weight, total_observers,
+                                backend, n_jobs, chunk_size)
+
+    # Reciprocity: one LOS per unordered target/observer pair
+    can_sym = (engine == "naive" and obs_h == tgt_h
+               and az1 == 0.0 and az2 == 2 * np.pi
+               and elev_min == -np.pi / 2 and elev_max == np.pi / 2)
+    if symmetric and not can_sym:
+        raise ValueError("symmetric=True needs engine='naive', obs_h == tgt_h "
+                         "and no azimuth or elevation-angle limits")
+    if symmetric and return_matrix:
+        raise ValueError("return_matrix traces every pair from its target; "
+                         "it cannot be combined with symmetric=True")
+    if symmetric:
+        target_id = np.full((nrows, ncols), -1, dtype=np.int32)
+        target_id[targets[:, 0], targets[:, 1]] = np.arange(len(targets))
     else:
-        az1, az2 = 0.0, 2 * math.pi
+        target_id = np.empty((0, 0), dtype=np.int32)
+
+    # Shared ray geometry for the R2 engine
+    tpl = None
+    if engine == "r2":
+        tpl = ray_template(res_y, res_x, k_maxd, interpolation, k_curv)
+    use_tpl = tpl is not None
+    if not use_tpl:
+        tpl = empty_template()
 
-    # Parse elevation angles (degrees → radians)
-    if elev_angle_range is not None:
-        elev_min = math.radians(elev_angle_range[0])
-        elev_max = math.radians(elev_angle_range[1])
+    if return_matrix:
+        # one bit per pair; counts are popcounts of the rows and columns
+        sig = visibility_signatures(
+            dem, target_mask, obs_h=obs_h, interpolation=interpolation,
+            max_dist=max_dist, azimuth_range=azimuth_range,
+            elev_angle_range=elev_angle_range, dist_range=dist_range,
+            observer_mask=observer_mask, weight_by_cell=weight_by_cell,
+            curvature_k=curvature_k, engine=engine, tgt_h=tgt_h
+        )
+        return _matrix_result(dem.array, sig, observer_mask, k_tgt_h, ct,
+                              total_weight, total_observers)
     else:
-        elev_min, elev_max = -math.pi / 2, math.pi / 2
+        # Run the inverse‐viewshed kernel on chunks of targets
+        nt = len(targets)
+        args = (targets, weights, k_obs_h, k_tgt_h, k_maxd,
+                res_y, res_x, use_bi, az1, az2, elev_min, elev_max,
+                k_min_d, k_curv, engine == "r2", tpl, use_tpl, ct,
+                bool(symmetric))
+        shared = (dem.array, observer_mask, target_id)
+        if backend == "numba":
+            with numba_schedule(nt, n_jobs, chunk_size):
+                parts = [_inverse_chunk(*shared, np.arange(nt), *args)]
+        else:
+            chunks = task_chunks(nt, n_workers(n_jobs), chunk_size)
+            parts = map_chunks(_inverse_chunk, shared, chunks, args,
+                               backend, n_jobs)
 
-    # Interpolation mode
-    use_bi = (interpolation.lower() == "bilinear")
+        # merge the partial results
+        obs_counts = np.zeros((nrows, ncols), np.float64)
+        cnt_t = np.zeros(nt, np.int32)
+        possible_t = np.zeros(nt, np.int32)
+        for r_lo, c_lo, acc, cnt, possible in parts:
+            obs_counts[r_lo:r_lo + acc.shape[0],
+                       c_lo:c_lo + acc.shape[1]] += acc
+            cnt_t += cnt
+            possible_t += possible
+        tgt_counts = np.zeros((nrows, ncols), np.int32)
+        tgt_possible = np.zeros((nrows, ncols), np.int32)
+        tgt_counts[targets[:, 0], targets[:, 1]] = cnt_t
+        tgt_possible[targets[:, 0], targets[:, 1]] = possible_t
 
-    # Run Numba‐parallel inverse‐viewshed kernel
-    obs_counts, tgt_counts, tgt_possible = _inverse_counts_jit(
-        dem.array,
-        targets,
-        weights,
-        observer_mask,
-        obs_h,
-        maxd,
-        dem.res_y, dem.res_x,
-        use_bi,
-        az1, az2,
-        elev_min, elev_max,
-        min_d,
-        curvature_k
-    )
+    return _visibility_result(obs_counts, tgt_counts, tgt_possible,
+                              total_weight, total_observers)
+
+
+def _matrix_result(arr, sig, observer_mask, tgt_h, ct, total_weight,
+                   total_observers):
+    """
+    (VisibilityResult, VisibilityMatrix) of the VisibilitySignatures of
+    `visibility_signatures`; tgt_h and ct are in kernel units.
+    """
+    nrows, ncols = arr.shape
+    matrix = VisibilityMatrix.from_signatures(sig, shape=(nrows, ncols))
+    obs_counts = np.zeros((nrows, ncols), np.float64)
+    obs_counts[matrix.observers[:, 0], matrix.observers[:, 1]] = \
+        matrix.row_counts(weighted=True)
+    targets = sig.targets.astype(np.int32)
+    tgt_counts = np.zeros((nrows, ncols), np.int32)
+    tgt_counts[targets[:, 0], targets[:, 1]] = matrix.col_counts()
+    tgt_possible = _possible_counts_jit(arr, targets, observer_mask, tgt_h, ct)
+    result = _visibility_result(obs_counts, tgt_counts, tgt_possible,
+                                total_weight, total_observers)
+    return result, matrix
 
-    # Compute ratios
+
+def _visibility_result(obs_counts, tgt_counts, tgt_possible, total_weight,
+                       total_observers):
+    """
+    VisibilityResult of the raw counts, with the derived ratios.
+    """
     obs_ratio = obs_counts / total_weight
     tgt_ratio = (
         tgt_counts.astype(float) / total_observers
@@ -160,6 +313,44 @@ def inverse_visibility(
     )
 
 
+def _inverse_heights(arr, targets, weights, observer_mask, obs_h, tgt_h,
+                     use_bi, curvature_k, use_r2, ct, total_weight,
+                     total_observers, backend, n_jobs, chunk_size):
+    """
+    `inverse_visibility` for the observer heights obs_h (kernel units):
+    VisibilityResult whose fields are stacked along a leading height axis.
+    """
+    nrows, ncols = arr.shape
+    nt = len(targets)
+    args = (targets, weights, obs_h, tgt_h, use_bi, curvature_k, use_r2, ct)
+    if backend == "numba":
+        with numba_schedule(nt, n_jobs, chunk_size):
+            parts = [_inverse_heights_chunk(arr, observer_mask, np.arange(nt),
+                                            *args)]
+    else:
+        chunks = task_chunks(nt, n_workers(n_jobs), chunk_size)
+        parts = map_chunks(_inverse_heights_chunk, (arr, observer_mask),
+                           chunks, args, backend, n_jobs)
+
+    n_h = len(obs_h)
+    obs_counts = np.zeros((n_h, nrows, ncols), np.float64)
+    cnt_t = np.zeros((n_h, nt), np.int32)
+    possible_t = np.zeros(nt, np.int32)
+    for r_lo, c_lo, acc, cnt, possible in parts:
+        obs_counts[:, r_lo:r_lo + acc.shape[1], c_lo:c_lo + acc.shape[2]] += acc
+        cnt_t += cnt
+        possible_t += possible
+    tgt_counts = np.zeros((n_h, nrows, ncols), np.int32)
+    tgt_counts[:, targets[:, 0], targets[:, 1]] = cnt_t
+    tgt_possible = np.zeros((nrows, ncols), np.int32)
+    tgt_possible[targets[:, 0], targets[:, 1]] = possible_t
+
+    layers = [_visibility_result(obs_counts[h], tgt_counts[h], tgt_possible,
+                                 total_weight, total_observers)
+              for h in range(n_h)]
+    return VisibilityResult(*(np.stack(f) for f in zip(*layers)))
+
+
 def best_observers_from_index(results, k=1):
     """
     Return the top-k observer locations for a given VisibilityResult.
@@ -170,73 +361,307 @@ def best_observers_from_index(results, k=1):
     return list(zip(rows, cols))
 
 
-@njit(parallel=True)
+def _inverse_chunk(arr, observer_mask, target_id, subset, targets, weights,
+                   obs_h, tgt_h, maxd, res_y, res_x, use_bi,
+                   az1, az2, elev_min, elev_max, min_d, curvature_k,
+                   use_r2, tpl, use_tpl, ct, symmetric):
+    """
+    Inverse‐viewshed counts of the targets `subset`, as (r_lo, c_lo, acc,
+    cnt, possible): acc is the weighted observer raster over the union of
+    their max_dist windows, cnt and possible are per target (all targets).
+    """
+    nrows, ncols = arr.shape
+    r_lo, r_hi, c_lo, c_hi = nrows - 1, 0, ncols - 1, 0
+    for ti, tj in targets[subset]:
+        a, b, c, d = window_bounds(ti, tj, maxd, res_y, res_x, nrows, ncols)
+        r_lo, r_hi = min(r_lo, a), max(r_hi, b)
+        c_lo, c_hi = min(c_lo, c), max(c_hi, d)
+    n_threads = get_num_threads()
+    obs_partial = np.zeros((n_threads, r_hi - r_lo + 1, c_hi - c_lo + 1))
+    cnt_partial = np.zeros((n_threads, len(targets)), np.int32)
+    possible = np.zeros(len(targets), np.int32)
+
+    _inverse_counts_jit(
+        arr, targets, subset, weights, observer_mask,
+        obs_h, tgt_h, maxd, res_y, res_x, use_bi,
+        az1, az2, elev_min, elev_max, min_d, curvature_k,
+        use_r2, tpl, use_tpl, ct, symmetric, target_id,
+        obs_partial, cnt_partial, possible, r_lo, c_lo
+    )
+    return (r_lo, c_lo, obs_partial.sum(axis=0),
+            cnt_partial.sum(axis=0, dtype=np.int32),
+            possible)
+
+
+@njit(parallel=True, cache=True)
 def _inverse_counts_jit(
-    arr, targets, weights, observer_mask,
-    obs_h, maxd, res_y, res_x,
+    arr, targets, subset, weights, observer_mask,
+    obs_h, tgt_h, maxd, res_y, res_x,
     use_bilinear,
     az1, az2, elev_min, elev_max,
     min_d,
-    curvature_k
+    curvature_k,
+    use_r2, tpl, use_tpl, ct,
+    symmetric, target_id,
+    obs_partial, cnt_partial, possible_t, r_lo, c_lo
 ):
     """
     Numba‐parallel inverse‐viewshed helper.
+
+    The targets `subset` (indices into targets) are scheduled dynamically
+    over the threads. Each target visits only its max_dist window, applies
+    the constraints and the LOS test in a single pass and accumulates into
+    the observer raster of its thread, obs_partial[k] (origin r_lo, c_lo,
+    covering the union of the target windows); the thread rasters are
+    summed by the caller, so no thread writes to another one’s cells.
+
+    With use_r2 the LOS test reads a per‐thread scratch window filled by an
+    R2 sweep from the target (template driven if use_tpl) instead of
+    tracing a line per pair.
+
+    The constraints are tested through the ConstraintTemplate `ct`, over
+    the bounding box of its azimuth sector only.
+
+    With symmetric, a pair whose observer cell is also a target (target_id
+    ≥ 0) is traced only while processing the lower‐numbered of the two
+    targets and credited in both directions; per‐target counts are
+    therefore kept per thread as well (cnt_partial).
     """
     nrows, ncols = arr.shape
-    nt = targets.shape[0]
 
-    obs_counts = np.zeros((nrows, ncols), np.float64)
-    tgt_counts = np.zeros((nrows, ncols), np.int32)
-    tgt_possible = np.zeros((nrows, ncols), np.int32)
+    # scratch viewshed window of the R2 engine (one per thread)
+    if not use_r2:
+        sh_r, sh_c = 0, 0
+    elif maxd >= 0.0:
+        half_r, half_c = half_extent(maxd, res_y, res_x)
+        sh_r, sh_c = min(2 * half_r + 1, nrows), min(2 * half_c + 1, ncols)
+    else:
+        sh_r, sh_c = nrows, ncols
+    no_hz = np.empty((0, 0))
+    scratch = np.zeros((obs_partial.shape[0], sh_r, sh_c), np.bool_)
 
-    for t in prange(nt):
+    for k in prange(subset.shape[0]):
+        t = subset[k]
+        tid = get_thread_id()
+        acc = obs_partial[tid]
+        cnt = cnt_partial[tid]
         ti = targets[t, 0]
         tj = targets[t, 1]
         w = weights[t]
-
-        # compute the viewshed from this target
-        vs = _viewshed_naive(
-            arr,
-            ti, tj, obs_h, maxd,
-            res_y, res_x, use_bilinear,
-            az1, az2, elev_min, elev_max,
-            min_d,
-            curvature_k
-        )
-
-        # accumulate counts
-        cnt = 0
+        height0 = arr[ti, tj] + tgt_h
+        t_is_obs = observer_mask[ti, tj]
+        wr_lo, wr_hi, wc_lo, wc_hi = window_bounds(ti, tj, maxd, res_y,
+                                                   res_x, nrows, ncols)
+        vs = scratch[tid, :wr_hi - wr_lo + 1, :wc_hi - wc_lo + 1]
+        if use_r2:
+            vs[:] = False
+            if use_tpl:
+                _r2_template_into(arr, vs, no_hz, wr_lo, wc_lo,
+                                  ti, tj, tgt_h, obs_h, tpl, use_bilinear,
+                                  maxd, min_d, az1, az2,
+                                  elev_min, elev_max)
+            else:
+                _r2_into(arr, vs, no_hz, wr_lo, wc_lo, ti, tj, tgt_h,
+                         obs_h, maxd, res_y, res_x, use_bilinear,
+                         az1, az2, elev_min, elev_max, min_d,
+                         curvature_k)
         possible_ct = 0
-        for i in range(nrows):
-            for j in range(ncols):
+        sr_lo, sr_hi, sc_lo, sc_hi = sector_window(ct, ti, tj, nrows, ncols)
+        for i in range(sr_lo, sr_hi + 1):
+            for j in range(sc_lo, sc_hi + 1):
+                if not observer_mask[i, j]:
+                    continue
                 # geometric constraints (same as in sweep)
-                dy = (i - ti) * res_y
-                dx = (j - tj) * res_x
-                dist2 = dy*dy + dx*dx
-                if (maxd >= 0.0 and dist2 > maxd*maxd) or dist2 < min_d*min_d:
+                if not admits(ct, i - ti, j - tj, arr[i, j] - height0):
+                    continue
+                # possible observer
+                possible_ct += 1
+                # pair already traced and credited from the other target
+                u = target_id[i, j] if symmetric else -1
+                if u >= 0 and u < t and t_is_obs:
                     continue
-                ang = math.atan2(dy, dx)
-                if ang < 0:
-                    ang += 2 * math.pi
-                if az2 >= az1:
-                    if not (az1 <= ang <= az2):
-                        continue
+                # actual visibility (a target always sees itself)
+                if i == ti and j == tj:
+                    visible = True
+                elif use_r2:
+                    visible = vs[i - wr_lo, j - wc_lo]
+                elif use_bilinear:
+                    visible = _is_visible_bilinear(
+                        arr, ti, tj, i, j, tgt_h, obs_h,
+                        res_y, res_x, curvature_k
+                    )
                 else:
-                    if not (ang >= az1 or ang <= az2):
-                        continue
-                hi = arr[i, j]
-                ang_v = math.atan2(hi - (arr[ti, tj] + obs_h), math.sqrt(dist2))
-                if ang_v < elev_min or ang_v > elev_max:
+                    visible = _is_visible(
+                        arr, ti, tj, i, j, tgt_h, obs_h,
+                        res_y, res_x, curvature_k
+                    )
+                if visible:
+                    acc[i - r_lo, j - c_lo] += w
+                    cnt[t] += 1
+                    # reciprocal pair: the target cell sees target u
+                    if u > t and t_is_obs:
+                        acc[ti - r_lo, tj - c_lo] += weights[u]
+                        cnt[u] += 1
+        possible_t[t] = possible_ct
+
+
+def _inverse_heights_chunk(arr, observer_mask, subset, targets, weights,
+                           obs_h, tgt_h, use_bi, curvature_k, use_r2, ct):
+    """
+    `_inverse_chunk` for a vector of observer heights: acc and cnt get a
+    leading height axis.
+    """
+    nrows, ncols = arr.shape
+    r_lo, r_hi, c_lo, c_hi = nrows - 1, 0, ncols - 1, 0
+    for ti, tj in targets[subset]:
+        a, b, c, d = window_bounds(ti, tj, ct.maxd, ct.res_y, ct.res_x,
+                                   nrows, ncols)
+        r_lo, r_hi = min(r_lo, a), max(r_hi, b)
+        c_lo, c_hi = min(c_lo, c), max(c_hi, d)
+    n_threads = get_num_threads()
+    n_h = len(obs_h)
+    obs_partial = np.zeros((n_threads, n_h, r_hi - r_lo + 1, c_hi - c_lo + 1))
+    cnt_partial = np.zeros((n_threads, n_h, len(targets)), np.int32)
+    possible = np.zeros(len(targets), np.int32)
+
+    _inverse_heights_jit(
+        arr, targets, subset, weights, observer_mask, obs_h, tgt_h, use_bi,
+        curvature_k, use_r2, ct, obs_partial, cnt_partial, possible,
+        r_lo, c_lo
+    )
+    return (r_lo, c_lo, obs_partial.sum(axis=0),
+            cnt_partial.sum(axis=0, dtype=np.int32), possible)
+
+
+@njit(parallel=True, cache=True)
+def _inverse_heights_jit(
+    arr, targets, subset, weights, observer_mask, obs_h, tgt_h,
+    use_bilinear, curvature_k, use_r2, ct,
+    obs_partial, cnt_partial, possible_t, r_lo, c_lo
+):
+    """
+    `_inverse_counts_jit` for the observer heights obs_h at once.
+
+    The horizon slope between a target and an observer cell does not
+    depend on the observer height, so it is found once per pair – by
+    `_max_slope` / `_max_slope_bilinear`, or for use_r2 from the horizon
+    raster of one R2 sweep per target – and compared with the slope to
+    every raised observer exactly as `_is_visible*` / `_r2_ray` do.
+    """
+    nrows, ncols = arr.shape
+    n_h = obs_h.shape[0]
+    maxd = ct.maxd
+    res_y = ct.res_y
+    res_x = ct.res_x
+
+    if not use_r2:
+        sh_r, sh_c = 0, 0
+    elif maxd >= 0.0:
+        half_r, half_c = half_extent(maxd, res_y, res_x)
+        sh_r, sh_c = min(2 * half_r + 1, nrows), min(2 * half_c + 1, ncols)
+    else:
+        sh_r, sh_c = nrows, ncols
+    scratch = np.zeros((obs_partial.shape[0], sh_r, sh_c), np.bool_)
+    scratch_hz = np.empty((obs_partial.shape[0], sh_r, sh_c))
+
+    for k in prange(subset.shape[0]):
+        t = subset[k]
+        tid = get_thread_id()
+        acc = obs_partial[tid]
+        cnt = cnt_partial[tid]
+        ti = targets[t, 0]
+        tj = targets[t, 1]
+        w = weights[t]
+        height0 = arr[ti, tj] + tgt_h
+        wr_lo, wr_hi, wc_lo, wc_hi = window_bounds(ti, tj, maxd, res_y,
+                                                   res_x, nrows, ncols)
+        if use_r2:
+            vs = scratch[tid, :wr_hi - wr_lo + 1, :wc_hi - wc_lo + 1]
+            hz = scratch_hz[tid, :wr_hi - wr_lo + 1, :wc_hi - wc_lo + 1]
+            hz[:] = np.inf
+            _r2_into(arr, vs, hz, wr_lo, wc_lo, ti, tj, tgt_h, 0.0, maxd,
+                     res_y, res_x, use_bilinear, ct.az1, ct.az2,
+                     ct.elev_min, ct.elev_max, ct.min_d, curvature_k)
+        h0 = _bilinear_sample(arr, ti, tj) + tgt_h
+        possible_ct = 0
+        sr_lo, sr_hi, sc_lo, sc_hi = sector_window(ct, ti, tj, nrows, ncols)
+        for i in range(sr_lo, sr_hi + 1):
+            for j in range(sc_lo, sc_hi + 1):
+                if not observer_mask[i, j]:
                     continue
-                # possible observer
-                if observer_mask[i, j]:
-                    possible_ct += 1
-                # actual visibility
-                if vs[i, j] and observer_mask[i, j]:
-                    obs_counts[i, j] += w
-                    cnt += 1
+                if not admits(ct, i - ti, j - tj, arr[i, j] - height0):
+                    continue
+                possible_ct += 1
+                # a target always sees itself
+                if i == ti and j == tj:
+                    for h in range(n_h):
+                        acc[h, i - r_lo, j - c_lo] += w
+                        cnt[h, t] += 1
+                    continue
+                if use_r2:
+                    # slope test of `_r2_ray` against the lowest horizon
+                    s = hz[i - wr_lo, j - wc_lo]
+                    dy = (i - ti) * res_y
+                    dx = (j - tj) * res_x
+                    dist2 = dy*dy + dx*dx
+                    dist = math.sqrt(dist2)
+                    if curvature_k > 0.0:
+                        drop = dist2 / (2.0 * 6371000.0 * curvature_k)
+                    else:
+                        drop = 0.0
+                    slope_cell = (arr[i, j] - height0 - drop) / dist
+                else:
+                    # target slope of `_is_visible` / `_is_visible_bilinear`
+                    if use_bilinear:
+                        s = _max_slope_bilinear(arr, ti, tj, i, j, tgt_h,
+                                                res_y, res_x, curvature_k)
+                    else:
+                        s = _max_slope(arr, ti, tj, i, j, tgt_h,
+                                       res_y, res_x, curvature_k)
+                    dist = euclidean_distance(ti, tj, i, j, res_y, res_x)
+                    if curvature_k > 0.0:
+                        drop = (dist * dist) / (2.0 * 6371000.0 * curvature_k)
+                    else:
+                        drop = 0.0
+                for h in range(n_h):
+                    if use_r2:
+                        visible = slope_cell + obs_h[h] / dist >= s
+                    elif use_bilinear:
+                        h1 = _bilinear_sample(arr, i, j) + obs_h[h]
+                        visible = ((h1 - h0) - drop) / dist >= s
+                    else:
+                        visible = compute_slope(
+                            ((arr[i, j] + obs_h[h]) - height0) - drop,
+                            ti, tj, i, j, res_y, res_x) >= s
+                    if visible:
+                        acc[h, i - r_lo, j - c_lo] += w
+                        cnt[h, t] += 1
+        possible_t[t] = possible_ct
 
-        tgt_counts[ti, tj] = cnt
-        tgt_possible[ti, tj] = possible_ct
 
-    return obs_counts, tgt_counts, tgt_possible
+@njit(parallel=True, cache=True)
+def _possible_counts_jit(arr, targets, observer_mask, tgt_h, ct):
+    """
+    Number of observer cells within the constraints of every target (the
+    tgt_possible_counts of `_inverse_counts_jit`, without any LOS test).
+    """
+    nrows, ncols = arr.shape
+    nt = targets.shape[0]
+    possible = np.zeros(nt, np.int32)
+    for t in prange(nt):
+        ti = targets[t, 0]
+        tj = targets[t, 1]
+        height0 = arr[ti, tj] + tgt_h
+        sr_lo, sr_hi, sc_lo, sc_hi = sector_window(ct, ti, tj, nrows, ncols)
+        n = 0
+        for i in range(sr_lo, sr_hi + 1):
+            for j in range(sc_lo, sc_hi + 1):
+                if (observer_mask[i, j]
+                        and admits(ct, i - ti, j - tj, arr[i, j] - height0)):
+                    n += 1
+        possible[t] = n
+
+    tgt_possible = np.zeros((nrows, ncols), np.int32)
+    for t in range(nt):
+        tgt_possible[targets[t, 0], targets[t, 1]] = possible[t]
+    return tgt_possible
@@ -0,0 +1,231 @@
+# aetherpy/core/raycast.py
+
+import math
+import numpy as np
+from numba import njit, prange
+from .los import _bilinear_sample, _block_dist, _sight_line_bounds, _PYR_TOL
+from .utils import kernel_units, check_void_headroom
+from ..data.pyramid import dem_pyramid, empty_pyramid
+from ..data.loader import map_to_grid
+
+__all__ = ["raycast", "surface_points"]
+
+@njit(cache=True)
+def _last_step_in(p0, d, lo, hi):
+    """
+    Largest step s >= 0 with lo <= p0 + d·s < hi (p0 inside), or a huge
+    number if the position does not move.
+    """
+    if d > 0.0:
+        return math.ceil((hi - p0) / d) - 1
+    if d < 0.0:
+        return math.floor((p0 - lo) / -d)
+    return 1 << 62
+
+@njit(cache=True)
+def _ray_visible(arr, pyr, use_pyr, r0, c0, z0, r1, c1, z1,
+                 res_y, res_x, inv_2rk, use_bilinear):
+    """
+    March the 3D segment (r0, c0, z0) → (r1, c1, z1) – fractional grid
+    positions, absolute heights – over the DEM at one sample per cell of
+    its longest axis, endpoints excluded. A sample blocks the segment if
+    the terrain there (bilinear or nearest cell), raised by the Earth bulge
+    d·(D − d)/(2kR) under the chord, rises above it.
+
+    With a max/min Pyramid (nearest or bilinear, matching `use_bilinear`)
+    the samples are skipped block by block wherever the block maximum
+    stays below the segment, as in `_is_visible_pyramid`; the result is
+    the same as without it.
+    """
+    dr = r1 - r0
+    dc = c1 - c0
+    n_steps = int(math.ceil(max(abs(dr), abs(dc))))
+    if n_steps <= 1:
+        return True
+    d_r = dr / n_steps
+    d_c = dc / n_steps
+    dist = math.sqrt((dr * res_y) ** 2 + (dc * res_x) ** 2)
+    # in the frame of the source the segment is z0 + slope·d and the
+    # terrain is lowered by d²·inv_2rk
+    slope = (z1 - dist * dist * inv_2rk - z0) / dist
+    # nearest samples take the cell of round(p) = floor(p + 0.5)
+    shift = 0.0 if use_bilinear else 0.5
+
+    step = 1
+    while step < n_steps:
+        rf = r0 + d_r * step
+        cf = c0 + d_c * step
+        fr = int(math.floor(rf + shift))
+        fc = int(math.floor(cf + shift))
+
+        skipped = False
+        if use_pyr:
+            for lv in range(pyr.n_levels, 0, -1):
+                br = fr >> lv
+                bc = fc >> lv
+                o = pyr.offsets[lv] + br * pyr.shapes[lv, 1] + bc
+                # samples of the block lie in [B·2^l − shift, (B+1)·2^l − shift)
+                lo_r = (br << lv) - shift
+                lo_c = (bc << lv) - shift
+                size = 1 << lv
+                dmin, dmax = _block_dist(r0, c0, lo_r, lo_c, size, res_y, res_x)
+                lo, hi = _sight_line_bounds(z0, slope, inv_2rk, dmin, dmax)
+                if pyr.mins[o] > hi + _PYR_TOL:
+                    return False
+                if pyr.maxs[o] >= lo - _PYR_TOL:
+                    continue
+                s_end = min(_last_step_in(r0 + shift, d_r, lo_r + shift,
+                                          lo_r + shift + size),
+                            _last_step_in(c0 + shift, d_c, lo_c + shift,
+                                          lo_c + shift + size),
+                            n_steps - 1)
+                # guard against rounding at the block edges
+                if (int(math.floor(r0 + d_r * s_end + shift)) >> lv != br
+                        or int(math.floor(c0 + d_c * s_end + shift)) >> lv != bc):
+                    continue
+                step = max(s_end, step) + 1
+                skipped = True
+                break
+        if skipped:
+            continue
+
+        if use_bilinear:
+            h = _bilinear_sample(arr, rf, cf)
+        else:
+            h = arr[fr, fc]
+        d = math.sqrt(((rf - r0) * res_y) ** 2 + ((cf - c0) * res_x) ** 2)
+        if h - d * d * inv_2rk > z0 + slope * d:
+            return False
+        step += 1
+
+    return True
+
+@njit(parallel=True, cache=True)
+def _raycast_many(arr, pyr, use_pyr, src, dst, res_y, res_x, inv_2rk,
+                  use_bilinear, out):
+    """
+    `_ray_visible` of every (src[i], dst[i]) segment of (row, col, z)
+    points, in parallel.
+    """
+    for i in prange(src.shape[0]):
+        out[i] = _ray_visible(arr, pyr, use_pyr,
+                              src[i, 0], src[i, 1], src[i, 2],
+                              dst[i, 0], dst[i, 1], dst[i, 2],
+                              res_y, res_x, inv_2rk, use_bilinear)
+
+def _grid_points(dem, points, coords):
+    """
+    (N, 3) float64 array of (row, col, z) from (x, y, z) map coordinates
+    or (row, col, z) grid positions; cell centres sit at integer positions.
+    """
+    pts = np.array(points, dtype=np.float64).reshape(-1, 3)
+    if coords == "map":
+        if dem.transform is None:
+            raise ValueError("No georeference: use coords='grid'")
+        row, col = map_to_grid(dem.transform, pts[:, 0], pts[:, 1])
+        pts[:, 0] = row - 0.5
+        pts[:, 1] = col - 0.5
+    elif coords != "grid":
+        raise ValueError(f"Unknown coords {coords!r}")
+    if ((pts[:, 0] < 0.0).any() or (pts[:, 0] > dem.nrows - 1).any()
+            or (pts[:, 1] < 0.0).any() or (pts[:, 1] > dem.ncols - 1).any()):
+        raise ValueError("points outside the DEM")
+    return pts
+
+def raycast(dem, src, dst, coords="map", interpolation="bilinear",
+            curvature_k=0.0, pyramid=True, precision=None):
+    """
+    Visibility between arbitrary 3D points, e.g. aircraft and ground
+    targets or tower tops at absolute altitudes.
+
+    Every segment is marched over the DEM at one sample per cell of its
+    longest axis, starting from its sub-cell position. A max/min elevation
+    pyramid lets clear spans – most of a ray from an aircraft high above
+    the terrain – be skipped a whole block at a time, so the cost depends
+    on how close the ray comes to the terrain rather than on its length.
+
+    Parameters
+    ----------
+    dem : DEM
+    src, dst : (N, 3) array-like
+        Segment endpoints: (x, y, z) map coordinates with coords="map"
+        (needs a georeferenced DEM), or (row, col, z) fractional grid
+        positions with coords="grid" (cell centres at integer positions).
+        z is the absolute height in the DEM's elevation units.
+    coords : "map" or "grid"
+    interpolation : "bilinear" or "nearest"
+        Terrain surface the rays are tested against.
+    curvature_k : float
+        Earth curvature k-factor (1.3 ≈ 4/3), 0 = no correction: the
+        terrain under a segment is raised by the Earth bulge.
+    pyramid : True, False/None or Pyramid
+        Pyramid used for skipping (True builds or loads the cached one via
+        `dem_pyramid`); the result does not depend on it.
+    precision : None or str
+        Storage precision the DEM is converted to, as in `is_visible`.
+
+    Returns
+    -------
+    visible : (N,) bool ndarray
+    """
+    if interpolation not in ("nearest", "bilinear"):
+        raise ValueError(f"Unknown interpolation {interpolation!r}")
+    dem = dem.with_precision(precision)
+    p0 = _grid_points(dem, src, coords)
+    p1 = _grid_points(dem, dst, coords)
+    if p0.shape != p1.shape:
+        raise ValueError("src and dst must hold the same number of points")
+    if dem.void_headroom != math.inf:
+        # absolute altitudes: opaque voids must stand above the highest one
+        top = np.nanmax(dem.heights())
+        check_void_headroom(dem, max(p0[:, 2].max(), p1[:, 2].max()) - top,
+                            -1.0, float(curvature_k))
+    # heights and lengths in the units of the (possibly quantized) DEM
+    _, _, _, _, ry, rx, k = kernel_units(dem, 0.0, 0.0, -1.0, 0.0,
+                                         float(curvature_k))
+    for p in (p0, p1):
+        p[:, 2] = (p[:, 2] - dem.z_offset) / dem.z_scale
+    inv_2rk = 1.0 / (2.0 * 6371000.0 * k) if k > 0.0 else 0.0
+
+    if pyramid is True:
+        pyramid = dem_pyramid(dem, interpolation)
+    use_pyr = pyramid is not None and pyramid is not False
+    out = np.empty(p0.shape[0], dtype=np.bool_)
+    _raycast_many(dem.array, pyramid if use_pyr else empty_pyramid(), use_pyr,
+                  p0, p1, ry, rx, inv_2rk, interpolation == "bilinear", out)
+    return out
+
+def surface_points(dem, points, height=0.0, coords="map",
+                   interpolation="bilinear"):
+    """
+    3D points `height` above the terrain at the given 2D positions, as
+    endpoints for `raycast`.
+
+    Parameters
+    ----------
+    dem : DEM
+    points : (N, 2) array-like
+        (x, y) map coordinates, or (row, col) grid positions with
+        coords="grid".
+    height : float or (N,) array-like
+        Offset above the terrain surface.
+    coords, interpolation :
+        As in `raycast`.
+
+    Returns
+    -------
+    (N, 3) float64 ndarray of (x, y, z) or (row, col, z)
+    """
+    pts = np.array(points, dtype=np.float64).reshape(-1, 2)
+    n = pts.shape[0]
+    grid = _grid_points(dem, np.column_stack([pts, np.zeros(n)]), coords)
+    if interpolation == "bilinear":
+        z = np.array([_bilinear_sample(dem.array, r, c)
+                      for r, c in grid[:, :2]], dtype=np.float64)
+    elif interpolation == "nearest":
+        z = dem.array[np.floor(grid[:, 0] + 0.5).astype(np.int64),
+                      np.floor(grid[:, 1] + 0.5).astype(np.int64)]
+    else:
+        raise ValueError(f"Unknown interpolation {interpolation!r}")
+    z = dem.z_offset + dem.z_scale * np.asarray(z, dtype=np.float64)
+    return np.column_stack([pts, z + np.broadcast_to(height, (n,))])
@@ -0,0 +1,258 @@
+# aetherpy/core/templates.py
+
+import functools
+import math
+import numpy as np
+from collections import namedtuple
+from numba import njit
+from .utils import half_extent, in_constraints
+
+__all__ = ["RayTemplate", "ray_template", "TEMPLATE_MAX_BYTES"]
+
+# Upper bound on the memory of a single cached template; larger windows fall
+# back to computing the ray geometry on the fly.
+TEMPLATE_MAX_BYTES = 256 * 1024 ** 2
+
+# Namedtuple holding the translation-invariant geometry of all R2 rays of a
+# max_dist window. Sample k of ray i lives at ray_start[i] <= k < ray_start[i+1].
+RayTemplate = namedtuple(
+    "RayTemplate",
+    [
+        "res_y", "res_x",      # pixel size the template was built for
+        "half_r", "half_c",    # half size of the max_dist square in cells
+        "ray_start",           # int64 (n_rays + 1,) sample offsets per ray
+        "cell_r", "cell_c",    # int32 row/col offset of the nearest cell
+        "cell_inv_d",          # 1 / distance of that cell
+        "cell_drop",           # curvature drop at that cell
+        "smp_r", "smp_c",      # int32 floor offsets of the bilinear sample
+        "w00", "w10", "w01", "w11",  # bilinear weights of the sample
+        "smp_inv_d",           # 1 / distance of the bilinear sample
+        "smp_drop",            # curvature drop at the bilinear sample
+    ]
+)
+
+@njit(cache=True)
+def _count_ray_samples(half_r, half_c, res_y, res_x, maxd):
+    """
+    Number of samples of every R2 ray of the square, in perimeter order.
+    """
+    n_rays = 4 * (half_r + half_c)
+    counts = np.zeros(n_rays, np.int64)
+    ray = 0
+    for c in range(-half_c, half_c + 1):
+        for r in (-half_r, half_r):
+            counts[ray] = _ray_length(r, c, res_y, res_x, maxd)
+            ray += 1
+    for r in range(-half_r + 1, half_r):
+        for c in (-half_c, half_c):
+            counts[ray] = _ray_length(r, c, res_y, res_x, maxd)
+            ray += 1
+    return counts
+
+@njit(cache=True)
+def _ray_length(tr, tc, res_y, res_x, maxd):
+    """
+    Samples of the ray towards offset (tr, tc) that lie within maxd.
+    """
+    n = max(abs(tr), abs(tc))
+    if n == 0:
+        return 0
+    step_r = tr / n
+    step_c = tc / n
+    for k in range(1, n + 1):
+        rr = int(math.floor(step_r * k + 0.5))
+        cc = int(math.floor(step_c * k + 0.5))
+        dy = rr * res_y
+        dx = cc * res_x
+        if dy*dy + dx*dx > maxd * maxd:
+            return k - 1
+    return n
+
+@njit(cache=True)
+def _fill_ray_template(half_r, half_c, res_y, res_x, maxd, curvature_k,
+                       use_bilinear, ray_start,
+                       cell_r, cell_c, cell_inv_d, cell_drop,
+                       smp_r, smp_c, w00, w10, w01, w11, smp_inv_d, smp_drop):
+    """
+    Fill the template arrays, walking the rays exactly like `_r2_ray`.
+    """
+    ray = 0
+    k_out = 0
+    for side in range(2):
+        if side == 0:
+            n_outer = 2 * half_c + 1
+        else:
+            n_outer = 2 * half_r - 1
+        for a in range(n_outer):
+            for b in range(2):
+                if side == 0:
+                    tc = -half_c + a
+                    tr = -half_r if b == 0 else half_r
+                else:
+                    tr = -half_r + 1 + a
+                    tc = -half_c if b == 0 else half_c
+                n = max(abs(tr), abs(tc))
+                if n == 0:
+                    ray += 1
+                    continue
+                step_r = tr / n
+                step_c = tc / n
+                for k in range(1, ray_start[ray + 1] - ray_start[ray] + 1):
+                    rf = step_r * k
+                    cf = step_c * k
+                    rr = int(math.floor(rf + 0.5))
+                    cc = int(math.floor(cf + 0.5))
+                    dy = rr * res_y
+                    dx = cc * res_x
+                    dist2 = dy*dy + dx*dx
+                    cell_r[k_out] = rr
+                    cell_c[k_out] = cc
+                    cell_inv_d[k_out] = 1.0 / math.sqrt(dist2)
+                    if curvature_k > 0.0:
+                        cell_drop[k_out] = dist2 / (2.0 * 6371000.0 * curvature_k)
+                    if use_bilinear:
+                        br = int(math.floor(rf))
+                        bc = int(math.floor(cf))
+                        fr = rf - br
+                        fc = cf - bc
+                        smp_r[k_out] = br
+                        smp_c[k_out] = bc
+                        w00[k_out] = (1 - fr) * (1 - fc)
+                        w10[k_out] = fr * (1 - fc)
+                        w01[k_out] = (1 - fr) * fc
+                        w11[k_out] = fr * fc
+                        dist_s = math.hypot(rf * res_y, cf * res_x)
+                        smp_inv_d[k_out] = 1.0 / dist_s
+                        if curvature_k > 0.0:
+                            smp_drop[k_out] = (dist_s * dist_s
+                                               / (2.0 * 6371000.0 * curvature_k))
+                    k_out += 1
+                ray += 1
+
+@functools.lru_cache(maxsize=8)
+def ray_template(res_y, res_x, max_dist, interpolation="nearest",
+                 curvature_k=0.0):
+    """
+    Build (or fetch from the LRU cache) the R2 ray template for a grid
+    resolution and max_dist.
+
+    The cells an R2 ray visits, their distances, curvature drops and
+    bilinear weights only depend on the offset from the observer, so one
+    template serves every observer of every DEM with the same resolution.
+    Returns a read-only RayTemplate, or None if max_dist is unlimited or the
+    template would exceed TEMPLATE_MAX_BYTES.
+    """
+    if max_dist is None or max_dist < 0.0:
+        return None
+    use_bi = (interpolation.lower() == "bilinear")
+    half_r, half_c = half_extent(max_dist, res_y, res_x)
+    if half_r == 0 and half_c == 0:
+        return None
+
+    # cheap size estimate before walking any ray
+    n_est = 4 * (half_r + half_c) * max(half_r, half_c)
+    bytes_per_sample = 24 + (56 if use_bi else 0)
+    if n_est * bytes_per_sample > TEMPLATE_MAX_BYTES:
+        return None
+
+    counts = _count_ray_samples(half_r, half_c, res_y, res_x, float(max_dist))
+    ray_start = np.zeros(counts.size + 1, np.int64)
+    np.cumsum(counts, out=ray_start[1:])
+    n = int(ray_start[-1])
+    n_bi = n if use_bi else 0
+
+    tpl = RayTemplate(
+        float(res_y), float(res_x), half_r, half_c, ray_start,
+        np.empty(n, np.int32), np.empty(n, np.int32),
+        np.empty(n, np.float64), np.zeros(n, np.float64),
+        np.empty(n_bi, np.int32), np.empty(n_bi, np.int32),
+        np.empty(n_bi, np.float64), np.empty(n_bi, np.float64),
+        np.empty(n_bi, np.float64), np.empty(n_bi, np.float64),
+        np.empty(n_bi, np.float64), np.zeros(n_bi, np.float64),
+    )
+    _fill_ray_template(half_r, half_c, float(res_y), float(res_x),
+                       float(max_dist), float(curvature_k), use_bi,
+                       *tpl[4:])
+    for field in tpl[4:]:
+        field.flags.writeable = False
+    return tpl
+
+def empty_template():
+    """
+    Placeholder RayTemplate (no rays) for kernels that take an optional
+    template; it has the same Numba type as a real nearest template.
+    """
+    tpl = RayTemplate(1.0, 1.0, 0, 0, np.zeros(1, np.int64),
+                      *[np.empty(0, dt) for dt in
+                        (np.int32, np.int32, np.float64, np.float64,
+                         np.int32, np.int32, np.float64, np.float64,
+                         np.float64, np.float64, np.float64, np.float64)])
+    for field in tpl[4:]:
+        field.flags.writeable = False
+    return tpl
+
+@njit(cache=True)
+def _r2_template_into(arr, vs, hz, r_off, c_off, obs_r, obs_c, obs_h, tgt_h, tpl,
+                      use_bilinear, maxd, min_d,
+                      az1, az2, elev_min, elev_max):
+    """
+    `_r2_into` driven by a RayTemplate: the ray walk only gathers
+    elevations and multiplies by the cached inverse distances.
+    """
+    # observer always sees itself
+    vs[obs_r - r_off, obs_c - c_off] = True
+    height0 = arr[obs_r, obs_c] + obs_h
+    for ray in range(tpl.ray_start.size - 1):
+        _r2_template_ray(arr, vs, hz, r_off, c_off, obs_r, obs_c, height0,
+                         tgt_h, tpl, ray, use_bilinear, maxd, min_d,
+                         az1, az2, elev_min, elev_max)
+
+@njit(cache=True)
+def _r2_template_ray(arr, vs, hz, r_off, c_off, obs_r, obs_c, height0, tgt_h,
+                     tpl, ray, use_bilinear, maxd, min_d,
+                     az1, az2, elev_min, elev_max):
+    """
+    Walk ray number `ray` of the template from the observer, as `_r2_ray`.
+    """
+    nrows, ncols = arr.shape
+    want_horizon = hz.shape[0] > 0
+    res_y = tpl.res_y
+    res_x = tpl.res_x
+    max_slope = -np.inf
+    for k in range(tpl.ray_start[ray], tpl.ray_start[ray + 1]):
+        rr = obs_r + tpl.cell_r[k]
+        cc = obs_c + tpl.cell_c[k]
+        if rr < 0 or rr >= nrows or cc < 0 or cc >= ncols:
+            break
+        if use_bilinear:
+            br = obs_r + tpl.smp_r[k]
+            bc = obs_c + tpl.smp_c[k]
+            if br < 0 or bc < 0:
+                break
+
+        inv_d = tpl.cell_inv_d[k]
+        slope_cell = (arr[rr, cc] - height0 - tpl.cell_drop[k]) * inv_d
+
+        # visible if the cell is not below the horizon so far
+        slope_tgt = slope_cell + tgt_h * inv_d
+        if slope_tgt >= max_slope or want_horizon:
+            dy = tpl.cell_r[k] * res_y
+            dx = tpl.cell_c[k] * res_x
+            if in_constraints(dy, dx, dy*dy + dx*dx, arr[rr, cc] - height0,
+                              maxd, min_d, az1, az2, elev_min, elev_max):
+                if want_horizon and max_slope < hz[rr - r_off, cc - c_off]:
+                    hz[rr - r_off, cc - c_off] = max_slope
+                if slope_tgt >= max_slope:
+                    vs[rr - r_off, cc - c_off] = True
+
+        # raise the horizon with the terrain sampled on this step
+        if use_bilinear:
+            r1 = br + 1 if br + 1 < nrows else br
+            c1 = bc + 1 if bc + 1 < ncols else bc
+            hs = (arr[br, bc] * tpl.w00[k] + arr[r1, bc] * tpl.w10[k]
+                  + arr[br, c1] * tpl.w01[k] + arr[r1, c1] * tpl.w11[k])
+            slope_s = (hs - height0 - tpl.smp_drop[k]) * tpl.smp_inv_d[k]
+        else:
+            slope_s = slope_cell
+        if slope_s > max_slope:
+            max_slope = slope_s
@@ -1,9 +1,13 @@
 import math
+import numpy as np
 from numba import njit
 import time
 import functools
+import logging
 
-@njit
+logger = logging.getLogger("aetherpy")
+
+@njit(cache=True)
 def euclidean_distance(r0, c0, r1, c1, res_y, res_x):
     """
     Real‑world horizontal distance between two grid cells,
@@ -13,7 +17,7 @@ def euclidean_distance(r0, c0, r1, c1, res_y, res_x):
     dx = (c1 - c0) * res_x
     return math.hypot(dx, dy)
 
-@njit
+@njit(cache=True)
 def compute_slope(delta_h, r0, c0, r1, c1, res_y, res_x):
     """
     Elevation rise / horizontal run between (r0,c0) and (r1,c1),
@@ -24,15 +28,153 @@ def compute_slope(delta_h, r0, c0, r1, c1, res_y, res_x):
         return -1e9
     return delta_h / dist
 
+@njit(cache=True)
+def half_extent(maxd, res_y, res_x):
+    """
+    Number of rows and columns spanned by `maxd` map units (maxd >= 0).
+    """
+    return int(math.ceil(maxd / res_y)), int(math.ceil(maxd / res_x))
+
+@njit(cache=True)
+def window_bounds(r0, c0, maxd, res_y, res_x, nrows, ncols):
+    """
+    Inclusive (r_lo, r_hi, c_lo, c_hi) bounds of the cells within `maxd`
+    map units of (r0, c0), clipped to the raster. maxd < 0 → whole raster.
+    """
+    if maxd < 0.0:
+        return 0, nrows - 1, 0, ncols - 1
+    half_r, half_c = half_extent(maxd, res_y, res_x)
+    r_lo = max(r0 - half_r, 0)
+    r_hi = min(r0 + half_r, nrows - 1)
+    c_lo = max(c0 - half_c, 0)
+    c_hi = min(c0 + half_c, ncols - 1)
+    return r_lo, r_hi, c_lo, c_hi
+
+@njit(cache=True)
+def in_constraints(dy, dx, dist2, dh, maxd, min_d,
+                   az1, az2, elev_min, elev_max):
+    """
+    Distance, azimuth and elevation-angle filter for one cell, given its
+    offset (dy, dx) and squared distance from the viewpoint and its height
+    difference dh relative to the viewpoint.
+    """
+    # 1) distance filter
+    if (maxd >= 0.0 and dist2 > maxd * maxd) or dist2 < min_d * min_d:
+        return False
+
+    # 2) azimuth filter (skipped for the full circle)
+    if az1 > 0.0 or az2 < 2 * math.pi:
+        ang = math.atan2(dy, dx)
+        if ang < 0:
+            ang += 2 * math.pi
+        # handle wrap‑around
+        if az2 >= az1:
+            if not (az1 <= ang <= az2):
+                return False
+        else:
+            if not (ang >= az1 or ang <= az2):
+                return False
+
+    # 3) elevation‑angle filter (skipped for the full half‑circle)
+    if elev_min > -math.pi / 2 or elev_max < math.pi / 2:
+        ang_v = math.atan2(dh, math.sqrt(dist2))
+        if ang_v < elev_min or ang_v > elev_max:
+            return False
+    return True
+
+def parse_constraints(max_dist=None, dist_range=None,
+                      azimuth_range=None, elev_angle_range=None):
+    """
+    Translate the public constraint options into kernel arguments.
+
+    Returns (maxd, min_d, az1, az2, elev_min, elev_max) with distances in
+    map units (maxd = -1.0 meaning unlimited) and angles in radians.
+    """
+    # 1) parse distance limits
+    maxd = -1.0 if max_dist is None else float(max_dist)
+    if dist_range is not None:
+        min_d, maxd = dist_range
+    else:
+        min_d = 0.0
+
+    # 2) parse azimuth (degrees → radians)
+    if azimuth_range is not None:
+        az1 = math.radians(azimuth_range[0])
+        az2 = math.radians(azimuth_range[1])
+    else:
+        az1, az2 = 0.0, 2 * math.pi
+
+    # 3) parse elevation angles (degrees → radians)
+    if elev_angle_range is not None:
+        elev_min = math.radians(elev_angle_range[0])
+        elev_max = math.radians(elev_angle_range[1])
+    else:
+        elev_min, elev_max = -math.pi / 2, math.pi / 2
+
+    return float(maxd), float(min_d), az1, az2, elev_min, elev_max
+
+def kernel_units(dem, obs_h, tgt_h, maxd, min_d, curvature_k):
+    """
+    Heights, distances and curvature factor in the units of `dem.array`.
+
+    Quantized DEMs store elevations in steps of dem.z_scale (relative to
+    dem.z_offset, which cancels in every sight-line test). These tests are
+    invariant under a uniform scaling of all lengths, so the kernels run on
+    the stored integers once every length is divided by z_scale – and the
+    curvature k-factor too, as the Earth radius is not scaled.
+
+    Returns (obs_h, tgt_h, maxd, min_d, res_y, res_x, curvature_k); maxd < 0
+    (unlimited) is kept as is.
+
+    Raises ValueError if sight lines between cells raised by obs_h / tgt_h
+    could pass over the opaque voids of the DEM (see `check_void_headroom`).
+    """
+    check_void_headroom(dem, max(np.max(obs_h), np.max(tgt_h), 0.0), maxd,
+                        curvature_k)
+    s = getattr(dem, "z_scale", 1.0)
+    if s == 1.0:
+        return obs_h, tgt_h, maxd, min_d, dem.res_y, dem.res_x, curvature_k
+    return (obs_h / s, tgt_h / s, maxd / s if maxd >= 0.0 else maxd,
+            min_d / s, dem.res_y / s, dem.res_x / s, curvature_k / s)
+
+def check_void_headroom(dem, height, maxd, curvature_k):
+    """
+    Raise ValueError if sight lines up to `height` (map units) above the
+    highest cell of `dem`, over `maxd` (< 0: the whole DEM) with curvature
+    factor `curvature_k`, could pass over its opaque void wall – the
+    `void_headroom` of integer DEMs is limited to OPAQUE_HEADROOM.
+    """
+    headroom = getattr(dem, "void_headroom", math.inf)
+    if headroom == math.inf:
+        return
+    if maxd < 0.0:
+        maxd = math.hypot(dem.nrows * dem.res_y, dem.ncols * dem.res_x)
+    drop = (maxd * maxd / (2.0 * 6371000.0 * curvature_k)
+            if curvature_k > 0.0 else 0.0)
+    if height + drop >= headroom:
+        raise ValueError(
+            f"sight lines up to {height + drop:.1f} above the terrain (with "
+            f"curvature drop) pass over the opaque voids, which stand "
+            f"{headroom:.1f} above it; use a float precision or a larger "
+            f"integer type")
+
+def report_voids(func, n, what):
+    """
+    Log (at INFO level) how many void cells `func` skipped as `what`.
+    """
+    if n:
+        logger.info("%s: skipped %d void %s", func, n, what)
+
 def timeit(func):
     """
-    Simple decorator to print the elapsed time of a function call.
+    Simple decorator logging the elapsed time of a function call on the
+    "aetherpy" logger (DEBUG level, so silent unless enabled).
     """
     @functools.wraps(func)
     def wrapper(*args, **kwargs):
         t0 = time.perf_counter()
         result = func(*args, **kwargs)
         t1 = time.perf_counter()
-        print(f"{func.__name__} took {t1 - t0:.3f} s")
+        logger.debug("%s took %.3f s", func.__name__, t1 - t0)
         return result
     return wrapper
\ No newline at end of file
@@ -0,0 +1,171 @@
+# aetherpy/core/validation.py
+
+import time
+import numpy as np
+from collections import namedtuple
+from .sweep import _ENGINE_KERNELS
+from .utils import parse_constraints
+from ..data.loader import DEM
+
+__all__ = ["EngineAgreement", "synthetic_dem", "compare_engines",
+           "harness_agreement", "AGREEMENT_BOUNDS"]
+
+# Agreement with "naive" documented for the approximate engines, per
+# (engine, interpolation): the minimum of `harness_agreement`, rounded down
+# to a whole percent.
+AGREEMENT_BOUNDS = {
+    ("r2", "nearest"): 0.97,
+    ("r2", "bilinear"): 0.96,
+    ("xdraw", "nearest"): 0.92,
+    ("xdraw", "bilinear"): 0.97,
+}
+
+# observers and max_dist values of the validation harness (256 × 256 grids)
+HARNESS_OBSERVERS = ((128, 128), (40, 60), (200, 180))
+HARNESS_MAX_DIST = (None, 60.0)
+
+# Namedtuple summarising one engine against the reference engine
+EngineAgreement = namedtuple(
+    "EngineAgreement",
+    [
+        "engine",          # engine name
+        "agreement",       # fraction of compared cells with identical visibility
+        "false_visible",   # fraction marked visible but hidden in the reference
+        "false_hidden",    # fraction marked hidden but visible in the reference
+        "seconds",         # total kernel time over all observers
+    ]
+)
+
+def synthetic_dem(n=256, kind="rolling", seed=0):
+    """
+    Generate a square synthetic elevation grid for engine validation.
+
+    Parameters
+    ----------
+    n : int
+        Number of rows and columns.
+    kind : str
+        "rolling" – smooth sinusoidal hills with a regional tilt,
+        "rough"   – the same hills plus white noise (many small occluders),
+        "ridges"  – parallel ridges crossing the grid diagonally.
+    seed : int
+        Seed for the noise of the "rough" terrain.
+    """
+    yy, xx = np.mgrid[:n, :n].astype(np.float64)
+    if kind == "rolling":
+        return 20.0 * np.sin(xx / 13.0) * np.cos(yy / 17.0) + 0.05 * xx
+    elif kind == "rough":
+        rng = np.random.default_rng(seed)
+        base = 20.0 * np.sin(xx / 13.0) * np.cos(yy / 17.0) + 0.05 * xx
+        return base + rng.normal(scale=1.0, size=(n, n))
+    elif kind == "ridges":
+        return 15.0 * np.abs(np.sin((xx + yy) / 9.0))
+    else:
+        raise ValueError(f"Unknown kind {kind!r}")
+
+def compare_engines(
+    dem,
+    observers,
+    engines=("r2", "xdraw"),
+    reference="naive",
+    obs_h=0.0,
+    max_dist=None,
+    interpolation="nearest",
+    azimuth_range=None,
+    elev_angle_range=None,
+    dist_range=None,
+    curvature_k=0.0,
+):
+    """
+    Measure how closely each viewshed engine reproduces the reference engine.
+
+    Agreement is computed over the cells inside the max_dist window of each
+    observer (the whole raster if max_dist is None) and pooled across all
+    observers.
+
+    Parameters
+    ----------
+    dem : DEM
+    observers : sequence of (row, col)
+    engines : sequence of str
+        Engines to evaluate (see `viewshed_sweep`).
+    reference : str
+        Engine treated as ground truth, "naive" by default.
+    Remaining parameters are passed on as in `viewshed_sweep`.
+
+    Returns
+    -------
+    list of EngineAgreement, one per entry of `engines`.
+    """
+    for name in tuple(engines) + (reference,):
+        if name not in _ENGINE_KERNELS:
+            raise ValueError(f"Unknown engine {name!r}")
+
+    maxd, min_d, az1, az2, elev_min, elev_max = parse_constraints(
+        max_dist, dist_range, azimuth_range, elev_angle_range
+    )
+    use_bi = (interpolation.lower() == "bilinear")
+
+    def run(name, r0, c0):
+        t0 = time.perf_counter()
+        vs = _ENGINE_KERNELS[name](
+            dem.array, r0, c0, float(obs_h), maxd,
+            dem.res_y, dem.res_x, use_bi,
+            az1, az2, elev_min, elev_max, min_d, float(curvature_k)
+        )
+        return vs, time.perf_counter() - t0
+
+    # compile every kernel once so timings exclude the JIT
+    if len(observers) > 0:
+        for name in tuple(engines) + (reference,):
+            run(name, *observers[0])
+
+    n_cells = 0
+    stats = {name: [0, 0, 0, 0.0] for name in engines}  # agree, f_vis, f_hid, s
+    for r0, c0 in observers:
+        ref, _ = run(reference, r0, c0)
+        if maxd >= 0.0:
+            yy, xx = np.ogrid[:dem.nrows, :dem.ncols]
+            window = (((yy - r0) * dem.res_y) ** 2
+                      + ((xx - c0) * dem.res_x) ** 2) <= maxd * maxd
+        else:
+            window = np.ones_like(ref)
+        n_cells += int(window.sum())
+        for name in engines:
+            vs, secs = run(name, r0, c0)
+            acc = stats[name]
+            acc[0] += int(((vs == ref) & window).sum())
+            acc[1] += int((vs & ~ref & window).sum())
+            acc[2] += int((~vs & ref & window).sum())
+            acc[3] += secs
+
+    return [
+        EngineAgreement(name,
+                        stats[name][0] / n_cells,
+                        stats[name][1] / n_cells,
+                        stats[name][2] / n_cells,
+                        stats[name][3])
+        for name in engines
+    ]
+
+def harness_agreement(engines=("r2", "xdraw"), interpolation="nearest"):
+    """
+    Lowest agreement of each engine with "naive" over the validation
+    harness: every `synthetic_dem` kind at 256 × 256, the observers of
+    HARNESS_OBSERVERS at obs_h = 2, without max_dist and with a max_dist
+    of 60 cells. These minima are the bounds quoted in AGREEMENT_BOUNDS
+    and in the `viewshed_sweep` documentation.
+
+    Returns
+    -------
+    dict of engine → agreement
+    """
+    worst = {name: 1.0 for name in engines}
+    for kind in ("rolling", "rough", "ridges"):
+        dem = DEM(synthetic_dem(256, kind))
+        for max_dist in HARNESS_MAX_DIST:
+            for res in compare_engines(dem, HARNESS_OBSERVERS, engines,
+                                       obs_h=2.0, max_dist=max_dist,
+                                       interpolation=interpolation):
+                worst[res.engine] = min(worst[res.engine], res.agreement)
+    return worst
@@ -0,0 +1,252 @@
+# aetherpy/core/visibility_matrix.py
+
+import os
+import numpy as np
+from numba import njit, prange
+from .siting import (VisibilitySignatures, _popcount, _byte_weight_table,
+                     _gain)
+
+__all__ = ["VisibilityMatrix"]
+
+class VisibilityMatrix:
+    """
+    Bit-packed observer × target visibility relation.
+
+    Row r belongs to observer cell `observers[r]` and holds one bit per
+    target (bit t of word t // 64 set if that observer sees `targets[t]`),
+    so the relation takes n_targets / 8 bytes per observer instead of
+    n_targets for a bool array. Rows are sparse: observers that see no
+    target are not stored.
+
+    Attributes:
+      - observers: int64 (n_rows, 2) observer cells
+      - targets:   int64 (n_targets, 2) target cells
+      - weights:   float64 (n_targets,) target weights
+      - bits:      uint64 (n_rows, ceil(n_targets / 64)) packed rows
+      - shape:     (nrows, ncols) of the raster the cells refer to
+      - res_y, res_x: pixel size
+    """
+    def __init__(self, observers, targets, bits, weights=None,
+                 shape=None, res_y=1.0, res_x=1.0):
+        self.observers = np.asarray(observers, dtype=np.int64).reshape(-1, 2)
+        self.targets = np.asarray(targets, dtype=np.int64).reshape(-1, 2)
+        self.bits = bits
+        n_t = self.targets.shape[0]
+        self.weights = (np.ones(n_t) if weights is None
+                        else np.asarray(weights, dtype=np.float64))
+        if shape is None:
+            cells = np.vstack([self.observers, self.targets])
+            shape = tuple(int(v) + 1 for v in cells.max(axis=0)) if len(cells) else (0, 0)
+        self.shape = tuple(shape)
+        self.res_y = float(res_y)
+        self.res_x = float(res_x)
+        if bits.shape != (self.observers.shape[0], (n_t + 63) // 64):
+            raise ValueError("bits must have one row per observer and "
+                             "ceil(n_targets / 64) words per row")
+
+    @classmethod
+    def from_signatures(cls, signatures, shape=None, drop_empty=True):
+        """
+        Matrix of VisibilitySignatures, dropping candidates that see nothing.
+        """
+        bits = signatures.bits
+        observers = signatures.candidates
+        if drop_empty and bits.shape[0]:
+            keep = bits.any(axis=1)
+            bits = np.ascontiguousarray(bits[keep])
+            observers = observers[keep]
+        return cls(observers, signatures.targets, bits, signatures.weights,
+                   shape, signatures.res_y, signatures.res_x)
+
+    @classmethod
+    def from_dense(cls, observers, targets, visible, weights=None,
+                   shape=None, drop_empty=True):
+        """
+        Pack a bool (n_observers, n_targets) array.
+        """
+        visible = np.asarray(visible, dtype=bool)
+        n_words = (visible.shape[1] + 63) // 64
+        padded = np.zeros((visible.shape[0], n_words * 64), dtype=bool)
+        padded[:, :visible.shape[1]] = visible
+        bits = np.packbits(padded, axis=1, bitorder="little").view(np.uint64)
+        observers = np.asarray(observers, dtype=np.int64).reshape(-1, 2)
+        if drop_empty:
+            keep = visible.any(axis=1)
+            bits, observers = np.ascontiguousarray(bits[keep]), observers[keep]
+        return cls(observers, targets, bits, weights, shape)
+
+    @property
+    def n_observers(self):
+        return self.observers.shape[0]
+
+    @property
+    def n_targets(self):
+        return self.targets.shape[0]
+
+    @property
+    def nbytes(self):
+        return self.bits.nbytes
+
+    def __repr__(self):
+        return (f"VisibilityMatrix({self.n_observers} observers × "
+                f"{self.n_targets} targets, {self.nbytes} bytes)")
+
+    def to_dense(self):
+        """
+        Unpacked bool (n_observers, n_targets) array.
+        """
+        return np.unpackbits(self.bits.view(np.uint8), axis=1,
+                             bitorder="little")[:, :self.n_targets].astype(bool)
+
+    def to_signatures(self):
+        """
+        VisibilitySignatures of the stored rows, e.g. for `greedy_sites`.
+        """
+        return VisibilitySignatures(self.observers, self.targets, self.weights,
+                                    self.bits, self.res_y, self.res_x)
+
+    def rows_of(self, cells):
+        """
+        Row indices of observer cells (row, col); -1 for cells without a row.
+        """
+        cells = np.asarray(cells, dtype=np.int64).reshape(-1, 2)
+        ncols = self.shape[1]
+        q = cells[:, 0] * ncols + cells[:, 1]
+        if self.n_observers == 0:
+            return np.full(len(q), -1, np.int64)
+        flat = self.observers[:, 0] * ncols + self.observers[:, 1]
+        order = np.argsort(flat, kind="stable")
+        pos = np.minimum(np.searchsorted(flat[order], q), len(flat) - 1)
+        return np.where(flat[order[pos]] == q, order[pos], -1)
+
+    def row_counts(self, weighted=False):
+        """
+        Number (or total weight) of targets seen by every observer row.
+        """
+        if weighted:
+            table = _byte_weight_table(self.weights, self.bits.shape[1])
+            return _row_weights(self.bits, table)
+        return _row_popcounts(self.bits)
+
+    def col_counts(self):
+        """
+        Number of observers that see every target (its redundancy).
+        """
+        return _col_popcounts(self.bits, self.n_targets)
+
+    def union(self, rows):
+        """
+        Packed targets seen by at least one of the given rows.
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        if rows.size == 0:
+            return np.zeros(self.bits.shape[1], np.uint64)
+        return np.bitwise_or.reduce(self.bits[rows], axis=0)
+
+    def intersection(self, rows):
+        """
+        Packed targets seen by every one of the given rows.
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        if rows.size == 0:
+            return self._valid_words()
+        return np.bitwise_and.reduce(self.bits[rows], axis=0)
+
+    def unpack(self, words):
+        """
+        Bool (n_targets,) array of a packed target set.
+        """
+        return np.unpackbits(np.ascontiguousarray(words).view(np.uint8),
+                             bitorder="little")[:self.n_targets].astype(bool)
+
+    def coverage(self, rows, weighted=True):
+        """
+        Weighted (or plain) number of targets seen by a subset of rows.
+        """
+        words = self.union(rows)
+        if weighted:
+            table = _byte_weight_table(self.weights, self.bits.shape[1])
+            return _gain(words, np.zeros_like(words), False, 0.0, table)
+        return int(_row_popcounts(words[None, :])[0])
+
+    def save(self, path):
+        """
+        Store the matrix. A path ending in ".npz" writes a single archive;
+        any other path is used as a directory of .npy files that `load`
+        can memory-map.
+        """
+        fields = dict(observers=self.observers, targets=self.targets,
+                      weights=self.weights, bits=self.bits,
+                      shape=np.array(self.shape, np.int64),
+                      res=np.array([self.res_y, self.res_x]))
+        if path.endswith(".npz"):
+            np.savez(path, **fields)
+        else:
+            os.makedirs(path, exist_ok=True)
+            for name, value in fields.items():
+                np.save(os.path.join(path, name + ".npy"), value)
+
+    @classmethod
+    def load(cls, path, mmap_mode=None):
+        """
+        Load a matrix written by `save`. For a directory, `mmap_mode`
+        (e.g. "r") maps the packed bits instead of reading them.
+        """
+        if path.endswith(".npz"):
+            with np.load(path) as npz:
+                fields = {k: npz[k] for k in npz.files}
+        else:
+            fields = {
+                name: np.load(os.path.join(path, name + ".npy"),
+                              mmap_mode=mmap_mode if name == "bits" else None)
+                for name in ("observers", "targets", "weights", "bits",
+                             "shape", "res")
+            }
+        res_y, res_x = fields["res"]
+        return cls(fields["observers"], fields["targets"], fields["bits"],
+                   fields["weights"], tuple(fields["shape"]), res_y, res_x)
+
+    def _valid_words(self):
+        words = np.full(self.bits.shape[1], np.uint64(0xFFFFFFFFFFFFFFFF))
+        tail = self.n_targets % 64
+        if tail:
+            words[-1] = np.uint64((1 << tail) - 1)
+        return words
+
+
+@njit(parallel=True, cache=True)
+def _row_popcounts(bits):
+    n = bits.shape[0]
+    out = np.zeros(n, np.int64)
+    for r in prange(n):
+        s = 0
+        for w in range(bits.shape[1]):
+            s += _popcount(bits[r, w])
+        out[r] = s
+    return out
+
+@njit(parallel=True, cache=True)
+def _row_weights(bits, table):
+    n = bits.shape[0]
+    out = np.zeros(n)
+    zero = np.zeros(bits.shape[1], np.uint64)
+    for r in prange(n):
+        out[r] = _gain(bits[r], zero, False, 0.0, table)
+    return out
+
+@njit(parallel=True, cache=True)
+def _col_popcounts(bits, n_targets):
+    """
+    Per-target popcount: every word column is handled by one thread, which
+    walks the set bits of that column in all rows.
+    """
+    n_words = bits.shape[1]
+    out = np.zeros(n_words * 64, np.int64)
+    for w in prange(n_words):
+        for r in range(bits.shape[0]):
+            x = bits[r, w]
+            while x != 0:
+                low = x & (~x + np.uint64(1))
+                out[64 * w + _popcount(low - np.uint64(1))] += 1
+                x ^= low
+    return out[:n_targets]
@@ -1,39 +1,360 @@
+import math
+import os
 import numpy as np
-import rasterio
+
+# rasterio (and GDAL) are imported only where files are read, so DEMs built
+# from arrays work without loading them
+
+# storage precisions of DEM elevations
+PRECISIONS = ("float64", "float32", "int32", "int16")
+
+# default quantization step of integer precisions (map units)
+DEFAULT_Z_SCALE = 0.01
+
+# treatment of nodata cells by the sight-line kernels
+VOID_MODES = ("transparent", "opaque")
+
+# height (map units) below / above which float DEMs store void cells; far
+# beyond any terrain and any curvature drop over ~1000 km
+VOID_HEIGHT = 1.0e6
+
+# range (map units) integer DEMs with opaque voids keep free above their
+# highest cell, so that the void wall stands above masts and aircraft up to
+# ~1 km and the curvature drop over ~110 km
+OPAQUE_HEADROOM = 1000.0
+
+def void_value(dtype, voids="transparent"):
+    """
+    Stored value of void cells in an elevation array of `dtype`: a deep
+    floor ("transparent", never blocks a sight line) or a high wall
+    ("opaque", blocks every sight line through it). Integer arrays use the
+    extreme values of the type, which `quantize` keeps free; the wall only
+    reaches `headroom` above the terrain (see `DEM.void_headroom`).
+    """
+    if voids not in VOID_MODES:
+        raise ValueError(f"Unknown voids {voids!r}; expected one of {VOID_MODES}")
+    dtype = np.dtype(dtype)
+    if dtype.kind == "i":
+        info = np.iinfo(dtype)
+        return info.min if voids == "transparent" else info.max
+    return -VOID_HEIGHT if voids == "transparent" else VOID_HEIGHT
+
+def quantize(arr, precision, z_scale=None, headroom=0.0):
+    """
+    Convert elevations to a storage precision.
+
+    Float precisions are a plain cast. Integer precisions store
+    round((h - z_offset) / z_scale) with z_offset at the middle of the
+    elevation range, extended by `headroom` map units above its top;
+    z_scale defaults to DEFAULT_Z_SCALE (centimetres) and is coarsened
+    only if that range does not fit the integer type. NaN cells are stored
+    as the smallest integer of the type; valid cells never take either
+    extreme value, and the largest one lies at least `headroom` above the
+    highest elevation.
+
+    Returns
+    -------
+    (array, z_scale, z_offset)
+    """
+    if precision not in PRECISIONS:
+        raise ValueError(f"Unknown precision {precision!r}; expected one of {PRECISIONS}")
+    arr = np.asarray(arr)
+    if precision.startswith("float"):
+        return arr.astype(precision), 1.0, 0.0
+
+    info = np.iinfo(precision)
+    finite = np.isfinite(arr)
+    lo, hi = ((float(arr[finite].min()), float(arr[finite].max()))
+              if finite.any() else (0.0, 0.0))
+    hi += headroom
+    z_offset = 0.5 * (lo + hi)
+    half = 0.5 * (hi - lo)
+    fit = half / (info.max - 1)
+    if z_scale is None:
+        z_scale = max(DEFAULT_Z_SCALE, fit)
+    elif z_scale < fit:
+        raise ValueError(f"z_scale={z_scale} cannot represent an elevation "
+                         f"range of {hi - lo - headroom} (and headroom of "
+                         f"{headroom}) in {precision}")
+    q = np.full(arr.shape, info.min, dtype=precision)
+    q[finite] = np.round((arr[finite] - z_offset) / z_scale)
+    return q, float(z_scale), z_offset
+
+def window_transform(transform, row_off, col_off):
+    """
+    Affine transform of the window of `transform` whose first cell is
+    (row_off, col_off).
+    """
+    from affine import Affine
+
+    t = transform
+    return Affine(t.a, t.b, t.c + t.a * col_off + t.b * row_off,
+                  t.d, t.e, t.f + t.d * col_off + t.e * row_off)
+
+def map_to_grid(transform, x, y):
+    """
+    Fractional (row, col) of map coordinates (x, y) under `transform`, with
+    cell corners at integer positions; x and y may be arrays. The affine is
+    inverted from its coefficients, as `~transform` is not available with
+    every affine release.
+    """
+    t = transform
+    det = t.a * t.e - t.b * t.d
+    if det == 0.0:
+        raise ValueError("Degenerate transform")
+    x, y = x - t.c, y - t.f
+    return (t.a * y - t.d * x) / det, (t.e * x - t.b * y) / det
+
+def grid_to_map(transform, row, col):
+    """
+    Map coordinates (x, y) of the fractional grid position (row, col) under
+    `transform`; the inverse of `map_to_grid`.
+    """
+    t = transform
+    return (t.a * col + t.b * row + t.c,
+            t.d * col + t.e * row + t.f)
 
 class DEM:
     """
     DEM wrapper supporting either:
       - A file path to a GeoTIFF (reads first band via rasterio)
-      - A plain 2D numpy array (unit resolution, no georeference)
+      - A plain 2D numpy array (unit resolution and no georeference, unless
+        an affine `transform` and `crs` are given)
     Exposes:
-      - array: 2D float64 elevation grid
+      - array: 2D elevation grid (float64, or `dtype`; None keeps the
+        array or the GeoTIFF band in its own type)
       - transform, crs (or None)
+      - path: source GeoTIFF path (or None)
       - res_x, res_y: pixel size in map units
       - nrows, ncols: dimensions
+      - z_scale, z_offset: elevation = z_offset + z_scale * array (1 and 0
+        unless the DEM is quantized to an integer precision)
+      - nodata, voids, valid, n_void: void cells (see below)
+      - version: number of `edit` calls so far
       - index(x,y) / coord(row,col) for georeferenced DEMs
+
+    `precision` ("float64", "float32", "int32" or "int16", see `quantize`)
+    overrides `dtype`. Smaller types halve or quarter the memory traffic of
+    the LOS kernels, which run on the stored values directly.
+
+    Cells equal to `nodata` (by default the nodata value of a GeoTIFF) and
+    NaN cells are voids. They are stored as `void_value(dtype, voids)`, so
+    that sight lines pass over them ("transparent") or are blocked by them
+    ("opaque"), and are skipped as observers and targets by the viewshed,
+    LOS and inverse-visibility functions. `valid` is the mask of non-void
+    cells (None if there are none). Integer precisions with opaque voids
+    keep OPAQUE_HEADROOM free above the terrain for the void wall; the
+    analysis functions refuse sight lines that could pass over it (see
+    `void_headroom`).
+
+    `edit` overwrites a window of elevations in place and records it as a
+    dirty window, so that caches of derived results (see `ViewshedCache`)
+    can update only what the edit affects.
     """
-    def __init__(self, source):
+    z_scale = 1.0
+    z_offset = 0.0
+    nodata = None
+    voids = "transparent"
+    version = 0
+
+    def __init__(self, source, transform=None, crs=None, dtype=np.float64,
+                 precision=None, z_scale=None, nodata=None,
+                 voids="transparent"):
         if isinstance(source, str):
+            import rasterio
+
+            self.path = source
             ds = rasterio.open(source)
-            self.array = ds.read(1).astype(np.float64)
+            band = ds.read(1)
+            # dtype=None keeps the native band type
+            self.array = band if dtype is None else band.astype(dtype)
             self.transform = ds.transform
             self.crs = ds.crs
+            if nodata is None:
+                nodata = ds.nodata
             ds.close()
             # pixel size: transform.a = width of a pixel; transform.e = negative of height
             self.res_x = self.transform.a
             self.res_y = abs(self.transform.e)
         elif isinstance(source, np.ndarray):
-            self.array = source.astype(np.float64)
-            self.transform = None
-            self.crs = None
-            # assume unit grid
-            self.res_x = 1.0
-            self.res_y = 1.0
+            self.path = None
+            # dtype=None keeps the array as is (no copy)
+            self.array = (np.asarray(source) if dtype is None
+                          else source.astype(dtype))
+            self.transform = transform
+            self.crs = crs
+            if transform is None:
+                # assume unit grid
+                self.res_x = 1.0
+                self.res_y = 1.0
+            else:
+                self.res_x = transform.a
+                self.res_y = abs(transform.e)
         else:
             raise ValueError("DEM source must be a file path or a numpy array")
+        # voids: NaN and nodata cells, stored as the void value (the input
+        # array is never modified)
+        if voids not in VOID_MODES:
+            raise ValueError(f"Unknown voids {voids!r}; expected one of {VOID_MODES}")
+        self.nodata = nodata
+        self.voids = voids
+        void = (~np.isfinite(self.array) if self.array.dtype.kind == "f"
+                else np.zeros(self.array.shape, dtype=bool))
+        if nodata is not None and not np.isnan(nodata):
+            void |= self.array == nodata
+        has_void = bool(void.any())
+        if precision is not None:
+            heights = self.array
+            if has_void:
+                heights = np.where(void, np.nan, heights.astype(np.float64))
+            headroom = OPAQUE_HEADROOM if has_void and voids == "opaque" else 0.0
+            self.array, self.z_scale, self.z_offset = quantize(
+                heights, precision, z_scale, headroom)
+        elif has_void and self.array.dtype.kind != "f":
+            self.array = self.array.astype(np.float64)
+        if has_void:
+            fill = void_value(self.array.dtype, voids)
+            self.array = np.where(void, self.array.dtype.type(fill),
+                                  self.array)
+        self._valid = ~void if has_void else None
         self.nrows, self.ncols = self.array.shape
 
+    @property
+    def valid(self):
+        """
+        Boolean mask of the non-void cells, or None if the DEM has no voids.
+        """
+        if "_valid" not in self.__dict__:
+            void = self.array == void_value(self.array.dtype, self.voids)
+            self._valid = ~void if void.any() else None
+        return self._valid
+
+    @property
+    def n_void(self):
+        """
+        Number of void (nodata) cells.
+        """
+        valid = self.valid
+        return 0 if valid is None else int(valid.size - valid.sum())
+
+    @property
+    def void_headroom(self):
+        """
+        Height (map units) of the opaque void wall above the highest valid
+        cell; sight lines rising further above the terrain (counting the
+        curvature drop) could pass over it. inf without opaque voids.
+        """
+        if "_void_headroom" not in self.__dict__:
+            valid = self.valid
+            if self.voids != "opaque" or valid is None or not valid.any():
+                headroom = math.inf
+            else:
+                top = float(self.array[valid].max())
+                wall = float(void_value(self.array.dtype, "opaque"))
+                headroom = (wall - top) * self.z_scale
+            self._void_headroom = headroom
+        return self._void_headroom
+
+    def heights(self):
+        """
+        Elevations in map units (float64, dequantized for integer DEMs),
+        NaN at void cells.
+        """
+        if self.array.dtype.kind != "i":
+            h = np.asarray(self.array, dtype=np.float64)
+        else:
+            h = self.z_offset + self.z_scale * self.array.astype(np.float64)
+        if self.valid is not None:
+            h = np.where(self.valid, h, np.nan)
+        return h
+
+    def with_precision(self, precision, z_scale=None):
+        """
+        This DEM in another storage precision (see `quantize`). Conversions
+        are cached on the instance, so repeated calls are free.
+        """
+        if precision is None:
+            return self
+        cache = self.__dict__.setdefault("_precisions", {})
+        key = (precision, z_scale)
+        if key not in cache:
+            dem = DEM(self.heights(), transform=self.transform, crs=self.crs,
+                      precision=precision, z_scale=z_scale,
+                      voids=self.voids)
+            dem.nodata = self.nodata
+            dem.res_x, dem.res_y = self.res_x, self.res_y
+            dem.path = self.path
+            cache[key] = dem
+        return cache[key]
+
+    def edit(self, row_off, col_off, heights):
+        """
+        Overwrite the elevations of a window in place, e.g. to add a
+        building footprint or an excavation to a design surface.
+
+        Parameters
+        ----------
+        row_off, col_off : int
+            Raster cell of heights[0, 0].
+        heights : 2D array-like
+            New elevations in map units; NaN (or `nodata`) cells become
+            voids. Integer DEMs quantize them with their z_scale and
+            z_offset, which must be able to represent them.
+
+        Returns
+        -------
+        version : int
+            The new `version` of the DEM; `dirty_windows(since)` lists the
+            windows edited after a given version.
+        """
+        h = np.array(heights, dtype=np.float64, ndmin=2)
+        if h.ndim != 2:
+            raise ValueError("heights must be a 2D array")
+        row_off, col_off = int(row_off), int(col_off)
+        r_hi, c_hi = row_off + h.shape[0], col_off + h.shape[1]
+        if row_off < 0 or col_off < 0 or r_hi > self.nrows or c_hi > self.ncols:
+            raise ValueError("edit window outside the DEM")
+        void = ~np.isfinite(h)
+        if self.nodata is not None and not np.isnan(self.nodata):
+            void |= h == self.nodata
+
+        arr = self.array
+        if arr.dtype.kind == "i":
+            info = np.iinfo(arr.dtype)
+            q = np.round((np.where(void, self.z_offset, h) - self.z_offset)
+                         / self.z_scale)
+            if (q <= info.min).any() or (q >= info.max).any():
+                raise ValueError(f"heights exceed the range of the "
+                                 f"{arr.dtype.name} DEM (z_scale={self.z_scale})")
+            h = q
+        if not arr.flags.writeable:
+            # memory-mapped or shared arrays are edited on a private copy
+            arr = self.array = arr.copy()
+        fill = void_value(arr.dtype, self.voids)
+        arr[row_off:r_hi, col_off:c_hi] = np.where(void, fill, h)
+
+        valid = self.valid
+        if void.any() and valid is None:
+            valid = np.ones(arr.shape, dtype=bool)
+        if valid is not None:
+            valid[row_off:r_hi, col_off:c_hi] = ~void
+            self._valid = valid if not valid.all() else None
+        # conversions to other precisions are stale; pyramids are rebuilt
+        # by `dem_pyramid` once it sees the new version
+        self.__dict__.pop("_precisions", None)
+        self.__dict__.pop("_void_headroom", None)
+        self.version += 1
+        self.__dict__.setdefault("_edits", []).append(
+            (self.version, row_off, r_hi - 1, col_off, c_hi - 1))
+        return self.version
+
+    def dirty_windows(self, since=0):
+        """
+        Inclusive (r_lo, r_hi, c_lo, c_hi) raster windows changed by the
+        `edit` calls after version `since`, oldest first.
+        """
+        return [w[1:] for w in self.__dict__.get("_edits", ()) if w[0] > since]
+
     def index(self, x, y):
         """
         Convert map coords (x,y) → raster indices (row, col).
@@ -41,7 +362,7 @@ class DEM:
         """
         if self.transform is None:
             raise ValueError("No georeference: DEM built from numpy array")
-        col, row = ~self.transform * (x, y)
+        row, col = map_to_grid(self.transform, x, y)
         return int(row), int(col)
 
     def coord(self, row, col):
@@ -51,8 +372,16 @@ class DEM:
         """
         if self.transform is None:
             raise ValueError("No georeference: DEM built from numpy array")
-        x, y = self.transform * (col, row)
-        return x, y
+        return grid_to_map(self.transform, row, col)
+
+    def window_transform(self, row_off, col_off):
+        """
+        Affine transform of a window whose first cell is (row_off, col_off),
+        or None if the DEM has no georeference.
+        """
+        if self.transform is None:
+            return None
+        return window_transform(self.transform, row_off, col_off)
 
     def sample(self, row_f, col_f, method="nearest"):
         """
@@ -62,7 +391,7 @@ class DEM:
         if method == "nearest":
             r = int(round(row_f))
             c = int(round(col_f))
-            return self.array[r, c]
+            return self.z_offset + self.z_scale * self.array[r, c]
         elif method == "bilinear":
             # a tiny pure‑Python fallback for non‑Numba contexts
             # weights
@@ -72,10 +401,10 @@ class DEM:
             h10 = self.array[r0+1, c0  ] if r0+1 < self.nrows else h00
             h01 = self.array[r0,   c0+1] if c0+1 < self.ncols else h00
             h11 = self.array[r0+1, c0+1] if (r0+1<self.nrows and c0+1<self.ncols) else h00
-            return (h00 * (1-dr)*(1-dc) +
-                    h10 * dr*(1-dc) +
-                    h01 * (1-dr)*dc +
-                    h11 * dr*dc)
+            return self.z_offset + self.z_scale * (h00 * (1-dr)*(1-dc) +
+                                                   h10 * dr*(1-dc) +
+                                                   h01 * (1-dr)*dc +
+                                                   h11 * dr*dc)
         else:
             raise ValueError(f"Unknown method {method!r}")
 
@@ -143,3 +472,137 @@ class DEM:
             mask = ~mask
 
         return mask
+
+
+class LazyDEM(DEM):
+    """
+    GeoTIFF DEM that keeps the dataset open and loads elevations on demand.
+
+    Only the header is read on construction. `read_window` decodes just the
+    requested block, while `array` loads the whole band on first access in
+    its native floating dtype (integer bands are promoted to float64). With
+    `cache=True` the decoded band is stored as a `.npy` file next to the
+    source and reopened as a read-only memory map, so later processes map
+    it instantly instead of decoding the GeoTIFF again. The cache is
+    rebuilt when the source is newer.
+
+    Nodata cells (the band's nodata value unless `nodata` is given) are
+    stored as void values on load, as in DEM; the cache holds the filled
+    band, under a separate default name for opaque voids.
+
+    All DEM methods (`index`, `coord`, `sample`, `rasterize_mask`) work
+    unchanged, and a LazyDEM can be passed wherever a DEM is expected.
+    """
+    def __init__(self, path, band=1, cache=False, cache_path=None,
+                 nodata=None, voids="transparent"):
+        import rasterio
+
+        if voids not in VOID_MODES:
+            raise ValueError(f"Unknown voids {voids!r}; expected one of {VOID_MODES}")
+        self.path = path
+        self.band = band
+        self.voids = voids
+        suffix = ".npy" if voids == "transparent" else f".{voids}.npy"
+        self.cache_path = (cache_path or path + suffix) if cache else None
+        self._ds = rasterio.open(path)
+        self._array = None
+        self.transform = self._ds.transform
+        self.crs = self._ds.crs
+        self.res_x = self.transform.a
+        self.res_y = abs(self.transform.e)
+        self.nrows, self.ncols = self._ds.height, self._ds.width
+        native = np.dtype(self._ds.dtypes[band - 1])
+        self.dtype = (native if np.issubdtype(native, np.floating)
+                      else np.dtype(np.float64))
+        self.nodata = (self._ds.nodatavals[band - 1] if nodata is None
+                       else nodata)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        """
+        Close the underlying dataset; a loaded or mapped `array` stays valid.
+        """
+        self._ds.close()
+
+    @property
+    def array(self):
+        if self._array is None:
+            if self.cache_path is None:
+                self._array = self._read()
+            else:
+                self._array = self._load_cache()
+        return self._array
+
+    @array.setter
+    def array(self, value):
+        self._array = value
+
+    @property
+    def loaded(self):
+        """
+        True once the full band is held in memory or memory-mapped.
+        """
+        return self._array is not None
+
+    def read_window(self, window):
+        """
+        Elevations of a rasterio Window as a georeferenced DEM in the native
+        dtype. Slices the loaded band if available, otherwise reads only the
+        window from the dataset.
+        """
+        if self._array is not None:
+            r0, c0 = int(window.row_off), int(window.col_off)
+            arr = self._array[r0:r0 + int(window.height),
+                              c0:c0 + int(window.width)]
+        else:
+            arr = self._read(window)
+        dem = DEM(arr,
+                  transform=window_transform(self.transform,
+                                             window.row_off, window.col_off),
+                  crs=self.crs, dtype=None,
+                  nodata=void_value(self.dtype, self.voids), voids=self.voids)
+        dem.nodata = self.nodata
+        return dem
+
+    def _read(self, window=None):
+        """
+        Band (or window) in `dtype`, with voids stored as void values.
+        """
+        if self._ds.closed:
+            import rasterio
+
+            self._ds = rasterio.open(self.path)
+        arr = self._ds.read(self.band, window=window)
+        void = np.zeros(arr.shape, dtype=bool)
+        if self.nodata is not None and not np.isnan(self.nodata):
+            void |= arr == self.nodata
+        arr = arr.astype(self.dtype, copy=False)
+        void |= ~np.isfinite(arr)
+        if void.any():
+            arr = np.where(void, self.dtype.type(void_value(self.dtype,
+                                                           self.voids)), arr)
+        return arr
+
+    def _load_cache(self):
+        """
+        Memory-map the .npy cache, (re)building it if missing or stale.
+        """
+        path = self.cache_path
+        fresh = (os.path.exists(path)
+                 and os.path.getmtime(path) >= os.path.getmtime(self.path))
+        if fresh:
+            arr = np.load(path, mmap_mode="r")
+            if arr.shape == (self.nrows, self.ncols) and arr.dtype == self.dtype:
+                return arr
+        # write under a temporary name so concurrent readers never see a
+        # partial file
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as fh:
+            np.save(fh, self._read())
+        os.replace(tmp, path)
+        return np.load(path, mmap_mode="r")
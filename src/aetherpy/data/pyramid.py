@@ -0,0 +1,170 @@
+# aetherpy/data/pyramid.py
+
+import os
+import weakref
+import numpy as np
+from collections import namedtuple
+from numba import njit
+
+__all__ = ["Pyramid", "build_pyramid", "dem_pyramid", "empty_pyramid"]
+
+# Max/min elevation pyramid. Level l (1..n_levels) aggregates blocks of
+# 2**l × 2**l base cells; level l is stored row-major in maxs/mins starting at
+# offsets[l] with shape shapes[l]. Level 0 is the DEM itself and not stored.
+Pyramid = namedtuple(
+    "Pyramid",
+    [
+        "n_levels",   # number of stored levels
+        "shapes",     # int64 (n_levels + 1, 2) rows/cols of every level
+        "offsets",    # int64 (n_levels + 2,) start of every level in maxs/mins
+        "maxs",       # float64 flat block maxima
+        "mins",       # float64 flat block minima
+    ]
+)
+
+# in-memory cache of the pyramids built for DEM instances, as
+# {interpolation: (DEM version, Pyramid)}
+_PYRAMIDS = weakref.WeakKeyDictionary()
+
+@njit(cache=True)
+def _dilate(arr, use_max):
+    """
+    Max (or min) over the 2×2 neighbourhood (r..r+1, c..c+1), clamped at the
+    edges: a bound for any bilinear sample whose floor cell is (r, c).
+    """
+    nrows, ncols = arr.shape
+    out = np.empty((nrows, ncols), np.float64)
+    for r in range(nrows):
+        r1 = r + 1 if r + 1 < nrows else r
+        for c in range(ncols):
+            c1 = c + 1 if c + 1 < ncols else c
+            if use_max:
+                out[r, c] = max(max(arr[r, c], arr[r1, c]),
+                                max(arr[r, c1], arr[r1, c1]))
+            else:
+                out[r, c] = min(min(arr[r, c], arr[r1, c]),
+                                min(arr[r, c1], arr[r1, c1]))
+    return out
+
+@njit(cache=True)
+def _fill_levels(base_max, base_min, shapes, offsets, maxs, mins):
+    """
+    Fill every level by 2×2 reduction of the level below it.
+    """
+    n_levels = shapes.shape[0] - 1
+    for lv in range(1, n_levels + 1):
+        nr, nc = shapes[lv, 0], shapes[lv, 1]
+        pr, pc = shapes[lv - 1, 0], shapes[lv - 1, 1]
+        o = offsets[lv]
+        po = offsets[lv - 1]
+        for r in range(nr):
+            for c in range(nc):
+                hi = -np.inf
+                lo = np.inf
+                for rr in range(2 * r, min(2 * r + 2, pr)):
+                    for cc in range(2 * c, min(2 * c + 2, pc)):
+                        if lv == 1:
+                            vh = base_max[rr, cc]
+                            vl = base_min[rr, cc]
+                        else:
+                            vh = maxs[po + rr * pc + cc]
+                            vl = mins[po + rr * pc + cc]
+                        if vh > hi:
+                            hi = vh
+                        if vl < lo:
+                            lo = vl
+                maxs[o + r * nc + c] = hi
+                mins[o + r * nc + c] = lo
+
+def build_pyramid(arr, bilinear=False, n_levels=None):
+    """
+    Build the max/min elevation pyramid of a 2D elevation array.
+
+    Parameters
+    ----------
+    arr : 2D ndarray
+    bilinear : bool
+        Build the pyramid on the 2×2-dilated (max) / eroded (min) grid so it
+        bounds bilinear samples instead of cell values.
+    n_levels : int, optional
+        Number of levels; by default until a level is a single block.
+
+    Returns
+    -------
+    Pyramid
+    """
+    arr = np.asarray(arr)
+    nrows, ncols = arr.shape
+    if n_levels is None:
+        n_levels = max(1, int(np.ceil(np.log2(max(nrows, ncols, 2)))))
+    shapes = np.empty((n_levels + 1, 2), np.int64)
+    shapes[0] = nrows, ncols
+    for lv in range(1, n_levels + 1):
+        shapes[lv] = (shapes[lv - 1] + 1) // 2
+    sizes = shapes[:, 0] * shapes[:, 1]
+    sizes[0] = 0
+    offsets = np.zeros(n_levels + 2, np.int64)
+    np.cumsum(sizes, out=offsets[1:])
+    maxs = np.empty(offsets[-1], np.float64)
+    mins = np.empty(offsets[-1], np.float64)
+
+    if bilinear:
+        base_max = _dilate(arr, True)
+        base_min = _dilate(arr, False)
+    else:
+        base_max = base_min = arr
+    _fill_levels(base_max, base_min, shapes, offsets, maxs, mins)
+    return Pyramid(n_levels, shapes, offsets, maxs, mins)
+
+def dem_pyramid(dem, interpolation="nearest", cache=True):
+    """
+    Pyramid of a DEM for hierarchical LOS, built once per DEM instance.
+
+    With `cache=True` and a file-backed DEM the pyramid is also stored as
+    `<source>.pyramid[_bilinear][_<dtype>][_opaque].npz` next to the GeoTIFF
+    (the dtype suffix for arrays other than float64, the last one for
+    opaque voids) and reloaded by later sessions unless the source is
+    newer. Quantized DEMs are not cached on
+    disk, as their values depend on the quantization, and neither are
+    DEMs changed by `DEM.edit`, whose pyramid is rebuilt after every edit.
+    """
+    bilinear = (interpolation.lower() == "bilinear")
+    key = "bilinear" if bilinear else "nearest"
+    version = getattr(dem, "version", 0)
+    per_dem = _PYRAMIDS.setdefault(dem, {})
+    if key in per_dem and per_dem[key][0] == version:
+        return per_dem[key][1]
+
+    src = getattr(dem, "path", None)
+    path = None
+    if cache and src is not None and dem.z_scale == 1.0 and version == 0:
+        dtype = dem.array.dtype
+        path = (src + (".pyramid_bilinear" if bilinear else ".pyramid")
+                + ("" if dtype == np.float64 else f"_{dtype.name}")
+                + ("" if dem.voids == "transparent" else f"_{dem.voids}")
+                + ".npz")
+
+    pyr = None
+    if path is not None and os.path.exists(path) \
+            and os.path.getmtime(path) >= os.path.getmtime(src):
+        with np.load(path) as npz:
+            if tuple(npz["shapes"][0]) == (dem.nrows, dem.ncols):
+                pyr = Pyramid(int(npz["n_levels"]), npz["shapes"],
+                              npz["offsets"], npz["maxs"], npz["mins"])
+    if pyr is None:
+        pyr = build_pyramid(dem.array, bilinear)
+        if path is not None:
+            tmp = f"{path}.{os.getpid()}.tmp.npz"
+            np.savez(tmp, **pyr._asdict())
+            os.replace(tmp, path)
+
+    per_dem[key] = (version, pyr)
+    return pyr
+
+def empty_pyramid():
+    """
+    Placeholder Pyramid (no levels) for kernels that take an optional
+    pyramid; it has the same Numba type as a real one.
+    """
+    return Pyramid(0, np.zeros((1, 2), np.int64), np.zeros(2, np.int64),
+                   np.empty(0, np.float64), np.empty(0, np.float64))
@@ -0,0 +1,235 @@
+# aetherpy/data/tiling.py
+
+import math
+import numpy as np
+import rasterio
+from collections import namedtuple
+from rasterio.windows import Window
+from .loader import LazyDEM
+from ..core.sweep import ENGINES, _viewshed
+from ..core.utils import parse_constraints, half_extent
+
+__all__ = ["Tile", "TiledDEM", "tile_size_for_budget", "tiled_viewshed"]
+
+# One processing tile: the core window written to the output and the
+# halo window (core grown by the max_dist reach, clipped) read from the DEM.
+Tile = namedtuple(
+    "Tile",
+    [
+        "core",   # rasterio Window of output cells owned by this tile
+        "halo",   # rasterio Window of DEM cells needed to compute them
+    ]
+)
+
+class TiledDEM(LazyDEM):
+    """
+    LazyDEM that also splits the raster into processing tiles.
+
+    The dataset stays open; `read_window` decodes only the requested block
+    and wraps it in a georeferenced DEM, with nodata, voids and dtype
+    handled as in LazyDEM, so every analysis function can run on it
+    unchanged. Use as a context manager or call `close()`.
+    """
+    def tiles(self, tile_size, halo_rows=0, halo_cols=0):
+        """
+        Yield Tile(core, halo) windows covering the raster in row-major
+        order, each core at most tile_size × tile_size cells and its halo
+        grown by (halo_rows, halo_cols) cells, clipped to the raster.
+        """
+        return _tiles(self, tile_size, halo_rows, halo_cols)
+
+def _tiles(dem, tile_size, halo_rows, halo_cols):
+    """
+    Tile(core, halo) windows of `dem` (anything with nrows and ncols), as
+    in `TiledDEM.tiles`.
+    """
+    for r0 in range(0, dem.nrows, tile_size):
+        for c0 in range(0, dem.ncols, tile_size):
+            h = min(tile_size, dem.nrows - r0)
+            w = min(tile_size, dem.ncols - c0)
+            hr0 = max(r0 - halo_rows, 0)
+            hc0 = max(c0 - halo_cols, 0)
+            hr1 = min(r0 + h + halo_rows, dem.nrows)
+            hc1 = min(c0 + w + halo_cols, dem.ncols)
+            yield Tile(Window(c0, r0, w, h),
+                       Window(hc0, hr0, hc1 - hc0, hr1 - hr0))
+
+def tile_size_for_budget(memory_budget, halo_rows, halo_cols,
+                         max_tile=None, multiple=16):
+    """
+    Largest square core size (a multiple of `multiple`) whose working set
+    fits in `memory_budget` bytes: the float64 halo DEM, the int32 output
+    tile and one observer's cropped viewshed and scratch arrays.
+
+    Raises ValueError if not even the smallest tile fits.
+    """
+    obs_bytes = (2 * halo_rows + 1) * (2 * halo_cols + 1) * 9
+
+    def need(t):
+        return ((t + 2 * halo_rows) * (t + 2 * halo_cols) * 8
+                + t * t * 4 + obs_bytes)
+
+    if need(multiple) > memory_budget:
+        raise ValueError(
+            f"memory_budget of {memory_budget} bytes cannot hold a single "
+            f"tile with a halo of {halo_rows}×{halo_cols} cells"
+        )
+    # solve the quadratic need(t) = budget, then round down
+    a = 12.0
+    b = 8.0 * 2 * (halo_rows + halo_cols)
+    c = 8.0 * 4 * halo_rows * halo_cols + obs_bytes - memory_budget
+    t = int((-b + math.sqrt(b * b - 4 * a * c)) / (2 * a))
+    t = max(multiple, t - t % multiple)
+    if max_tile is not None:
+        t = min(t, max_tile)
+    return t
+
+def tiled_viewshed(
+    source,
+    observers,
+    out_path,
+    max_dist,
+    obs_h=0.0,
+    interpolation="nearest",
+    azimuth_range=None,
+    elev_angle_range=None,
+    dist_range=None,
+    curvature_k=0.0,
+    engine="naive",
+    mode="count",
+    voids="transparent",
+    memory_budget=512 * 1024 ** 2,
+    tile_size=None,
+    block_size=256,
+):
+    """
+    Out-of-core multi-observer viewshed written to a tiled GeoTIFF.
+
+    The output raster is processed tile by tile. For each tile only the DEM
+    window grown by a halo of max_dist is read, the observers within reach
+    of the tile are swept on that window and their cropped viewsheds are
+    accumulated into the tile, which is then written and released. Peak
+    memory therefore depends on the tile and halo size, chosen from
+    `memory_budget`, and not on the raster size. Observers near tile
+    borders are swept once per tile they reach.
+
+    Parameters
+    ----------
+    source : str or LazyDEM
+        GeoTIFF path or an open LazyDEM (e.g. a TiledDEM); only the halo
+        windows are read from it.
+    observers : (N, 2) array-like of (row, col)
+        Observer cells in the full raster.
+    out_path : str
+        Output GeoTIFF path.
+    max_dist : float
+        Maximum distance (map units); required, it sizes the halo.
+    obs_h, interpolation, azimuth_range, elev_angle_range, dist_range,
+    curvature_k, engine :
+        As in `viewshed_sweep`.
+    mode : "count" or "any"
+        "count" writes the number of observers seeing each cell (uint32),
+        "any" a 0/1 union mask (uint8).
+    voids : "transparent" or "opaque"
+        Whether sight lines pass over nodata cells or are blocked by them
+        (see `DEM`), for a path source; a LazyDEM keeps its own setting.
+        Void cells are never counted and void observers are skipped.
+    memory_budget : int
+        Approximate peak working memory in bytes.
+    tile_size : int, optional
+        Force the processing tile size instead of deriving it from the
+        budget.
+    block_size : int
+        Internal GeoTIFF block size (multiple of 16).
+
+    Returns
+    -------
+    out_path : str
+    """
+    if max_dist is None:
+        raise ValueError("tiled_viewshed needs a finite max_dist")
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown engine {engine!r}; expected one of {ENGINES}")
+    if mode not in ("count", "any"):
+        raise ValueError(f"Unknown mode {mode!r}")
+
+    dem = (TiledDEM(source, voids=voids) if isinstance(source, str)
+           else source)
+    try:
+        constraints = parse_constraints(
+            max_dist, dist_range, azimuth_range, elev_angle_range
+        )
+        maxd = constraints[0]
+        halo_r, halo_c = half_extent(maxd, dem.res_y, dem.res_x)
+        if tile_size is None:
+            tile_size = tile_size_for_budget(
+                memory_budget, halo_r, halo_c,
+                max_tile=max(dem.nrows, dem.ncols)
+            )
+
+        obs = np.asarray(observers, dtype=np.int64).reshape(-1, 2)
+        out_dtype = "uint32" if mode == "count" else "uint8"
+        profile = {
+            "driver": "GTiff",
+            "height": dem.nrows,
+            "width": dem.ncols,
+            "count": 1,
+            "dtype": out_dtype,
+            "crs": dem.crs,
+            "transform": dem.transform,
+            "compress": "lzw",
+            "tiled": True,
+            "blockxsize": block_size,
+            "blockysize": block_size,
+            "BIGTIFF": "IF_SAFER",
+        }
+
+        with rasterio.open(out_path, "w", **profile) as dst:
+            for tile in _tiles(dem, tile_size, halo_r, halo_c):
+                core, halo = tile.core, tile.halo
+                acc = np.zeros((core.height, core.width), dtype=out_dtype)
+
+                # observers whose max_dist window can reach the core
+                inside = ((obs[:, 0] >= halo.row_off)
+                          & (obs[:, 0] < halo.row_off + halo.height)
+                          & (obs[:, 1] >= halo.col_off)
+                          & (obs[:, 1] < halo.col_off + halo.width))
+                if inside.any():
+                    sub = dem.read_window(halo)
+                    for r, c in obs[inside]:
+                        vw = _viewshed(
+                            sub, (r - halo.row_off, c - halo.col_off), obs_h,
+                            constraints, interpolation, curvature_k,
+                            engine, "mask", True
+                        )
+                        _accumulate(acc, vw, core, halo, mode)
+
+                dst.write(acc, 1, window=core)
+    finally:
+        if isinstance(source, str):
+            dem.close()
+
+    return out_path
+
+def _accumulate(acc, vw, core, halo, mode):
+    """
+    Add the part of a cropped viewshed (ViewshedWindow on the halo DEM)
+    that overlaps the core window into the tile accumulator.
+    """
+    # viewshed extent in full-raster coordinates
+    r0 = halo.row_off + vw.row_off
+    c0 = halo.col_off + vw.col_off
+    r1 = r0 + vw.data.shape[0]
+    c1 = c0 + vw.data.shape[1]
+    # intersection with the core
+    ir0, ir1 = max(r0, core.row_off), min(r1, core.row_off + core.height)
+    ic0, ic1 = max(c0, core.col_off), min(c1, core.col_off + core.width)
+    if ir0 >= ir1 or ic0 >= ic1:
+        return
+    part = vw.data[ir0 - r0:ir1 - r0, ic0 - c0:ic1 - c0]
+    dst = acc[ir0 - core.row_off:ir1 - core.row_off,
+              ic0 - core.col_off:ic1 - core.col_off]
+    if mode == "count":
+        dst += part
+    else:
+        dst |= part
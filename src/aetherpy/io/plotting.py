@@ -1,7 +1,8 @@
 # aetherpy/io/plotting.py
-import matplotlib.pyplot as plt
 import numpy as np
-from matplotlib.colors import LightSource, ListedColormap
+
+# matplotlib is imported inside the plotting functions, so importing this
+# module does not start a plotting backend
 
 def plot_viewshed(
      dem,
@@ -36,6 +37,9 @@ def plot_viewshed(
      figsize : tuple, optional
          Figure size.
      """
+     import matplotlib.pyplot as plt
+     from matplotlib.colors import LightSource, ListedColormap
+
      fig, ax = plt.subplots(figsize=figsize)
 
      # Determine plotting extent
@@ -142,6 +146,8 @@ def plot_visibility_results(
     obs_label, obs_data = obs_map[obs_metric]
     tgt_label, tgt_data = tgt_map[tgt_metric]
 
+    import matplotlib.pyplot as plt
+
     fig, (ax1, ax2) = plt.subplots(1, 2, figsize=figsize)
 
     # Compute extent if georeferenced
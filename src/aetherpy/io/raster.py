@@ -1,4 +1,3 @@
-import rasterio
 import numpy as np
 
 __all__ = ["save_raster"]
@@ -60,6 +59,8 @@ def save_raster(
     if nodata is not None:
         profile["nodata"] = nodata
 
+    import rasterio
+
     with rasterio.open(out_path, "w", **profile) as dst:
         if arr.ndim == 2:
             dst.write(arr.astype(out_dtype), band)
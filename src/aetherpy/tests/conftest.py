@@ -0,0 +1,31 @@
+# tests/conftest.py
+import numpy as np
+import pytest
+import rasterio
+from affine import Affine
+
+
+def _terrain(n=31):
+    yy, xx = np.mgrid[:n, :n]
+    return 6 * np.sin(xx / 4.0) * np.cos(yy / 5.0)
+
+
+def _write_dem(path, arr, res=2.0, dtype="float32", nodata=None):
+    transform = Affine(res, 0.0, 1000.0, 0.0, -res, 2000.0)
+    with rasterio.open(path, "w", driver="GTiff", height=arr.shape[0],
+                       width=arr.shape[1], count=1, dtype=dtype,
+                       nodata=nodata, transform=transform) as dst:
+        dst.write(arr.astype(dtype), 1)
+
+
+@pytest.fixture
+def write_dem():
+    # write_dem(path, arr, res=2.0, dtype="float32", nodata=None):
+    # north-up GeoTIFF of `arr`
+    return _write_dem
+
+
+@pytest.fixture
+def terrain():
+    # terrain(n=31): smooth n×n sine/cosine relief, ±6 map units
+    return _terrain
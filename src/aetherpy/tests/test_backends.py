@@ -0,0 +1,78 @@
+# tests/test_backends.py
+import numpy as np
+import pytest
+from aetherpy.core import (viewshed_sweep, viewshed_batch, iter_viewsheds,
+                           cumulative_viewshed)
+from aetherpy.core.backends import n_workers, task_chunks
+from aetherpy.core.multiobserver import inverse_visibility
+from aetherpy.core.validation import synthetic_dem
+from aetherpy.data.loader import DEM
+
+
+def test_task_chunks_and_workers():
+    chunks = task_chunks(10, 2)
+    assert [len(c) for c in chunks] == [2, 2, 2, 2, 2]
+    assert np.array_equal(np.concatenate(task_chunks(7, 1, chunk_size=3)),
+                          np.arange(7))
+    assert n_workers(3) == 3
+    assert n_workers(-1) == n_workers(None)
+    with pytest.raises(ValueError):
+        n_workers(0)
+    with pytest.raises(ValueError):
+        cumulative_viewshed(DEM(np.zeros((5, 5))), [(2, 2)], backend="dask")
+
+
+def test_viewshed_batch_matches_viewshed_sweep():
+    dem = DEM(synthetic_dem(50, "rolling"))
+    observers = [(3, 4), (25, 25), (49, 10), (12, 40)]
+    for backend in ("numba", "joblib"):
+        batch = viewshed_batch(dem, observers, obs_h=[2.0, 1.0, 5.0, 0.0],
+                               max_dist=15.0, engine="r2", backend=backend,
+                               n_jobs=2, chunk_size=1)
+        for (r, c), h, win in zip(observers, (2.0, 1.0, 5.0, 0.0), batch):
+            ref = viewshed_sweep(dem, (r, c), obs_h=h, max_dist=15.0,
+                                 engine="r2", crop=True)
+            assert (win.row_off, win.col_off) == (ref.row_off, ref.col_off)
+            assert np.array_equal(win.data, ref.data)
+
+
+def test_process_backend_matches_numba():
+    dem = DEM(synthetic_dem(40, "ridges"))
+    rng = np.random.default_rng(1)
+    observers = rng.integers(0, 40, (12, 2))
+    ref = cumulative_viewshed(dem, observers, obs_h=2.0, max_dist=12.0)
+    res = cumulative_viewshed(dem, observers, obs_h=2.0, max_dist=12.0,
+                              backend="process", n_jobs=2)
+    assert np.array_equal(res, ref)
+
+    # symmetric pairs are split across chunks of targets
+    target_mask = np.zeros(dem.array.shape, dtype=bool)
+    target_mask[15:22, 12:20] = True
+    ref = inverse_visibility(dem, target_mask, obs_h=1.0, tgt_h=1.0,
+                             max_dist=10.0, symmetric=True)
+    res = inverse_visibility(dem, target_mask, obs_h=1.0, tgt_h=1.0,
+                             max_dist=10.0, symmetric=True, backend="process",
+                             n_jobs=2, chunk_size=5)
+    for a, b in zip(res, ref):
+        assert np.allclose(a, b)
+
+
+def test_iter_viewsheds_streams_batch_results():
+    h = synthetic_dem(50, "rolling")
+    h[20:24] = np.nan
+    dem = DEM(h)
+    observers = np.random.default_rng(2).integers(0, 50, (11, 2))
+    ref = viewshed_batch(dem, observers, obs_h=2.0, max_dist=12.0)
+    for backend in ("numba", "joblib"):
+        out = list(iter_viewsheds(dem, observers, obs_h=2.0, max_dist=12.0,
+                                  backend=backend, n_jobs=2, chunk_size=3,
+                                  prefetch=1))
+        assert [o for o, _ in out] == [tuple(o) for o in observers]
+        for (_, win), r in zip(out, ref):
+            assert (win.row_off, win.col_off) == (r.row_off, r.col_off)
+            assert np.array_equal(win.data, r.data)
+
+    # stopping early shuts the background producer down
+    stream = iter_viewsheds(dem, observers, max_dist=12.0, chunk_size=2)
+    next(stream)
+    stream.close()
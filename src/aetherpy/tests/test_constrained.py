@@ -0,0 +1,48 @@
+# tests/test_constrained.py
+import numpy as np
+from aetherpy.core.constrained import constraint_template, admits
+from aetherpy.core.utils import parse_constraints, in_constraints
+
+
+CASES = [
+    dict(max_dist=20.0),
+    dict(max_dist=20.0, azimuth_range=(10.0, 40.0)),
+    dict(max_dist=20.0, azimuth_range=(300.0, 20.0),
+         elev_angle_range=(-5.0, 3.0)),
+    dict(dist_range=(4.0, 15.0), elev_angle_range=(-2.0, 10.0)),
+    dict(azimuth_range=(100.0, 130.0)),
+]
+
+
+def test_template_matches_in_constraints():
+    rng = np.random.default_rng(6)
+    res_y, res_x, nrows, ncols = 0.5, 0.75, 60, 60
+    dr = rng.integers(-59, 60, 5000)
+    dc = rng.integers(-59, 60, 5000)
+    dh = rng.normal(0.0, 2.0, 5000)
+    dh[:50] = 0.0
+    dr[:50] = dc[:50] = 0
+    for kw in CASES:
+        cons = parse_constraints(**kw)
+        maxd, min_d, az1, az2, elev_min, elev_max = cons
+        ct = constraint_template(res_y, res_x, *cons, nrows, ncols)
+        assert ct.inside.size > 0 or maxd < 0.0
+        for r, c, h in zip(dr, dc, dh):
+            dy, dx = r * res_y, c * res_x
+            ref = in_constraints(dy, dx, dy*dy + dx*dx, h, maxd, min_d,
+                                 az1, az2, elev_min, elev_max)
+            # every admitted cell lies in the sector's bounding box
+            in_box = ct.r_lo <= r <= ct.r_hi and ct.c_lo <= c <= ct.c_hi
+            assert not ref or in_box
+            if in_box:
+                assert admits(ct, r, c, h) == ref
+        if "azimuth_range" in kw and maxd >= 0.0:
+            # a narrow sector visits a fraction of the max_dist square
+            assert ct.inside.size < 0.5 * (2 * 40 + 1) * (2 * 27 + 1)
+
+
+def test_template_is_cached_and_read_only():
+    ct = constraint_template(1.0, 1.0, 30.0, 0.0, 0.0, 0.5)
+    assert constraint_template(1.0, 1.0, 30.0, 0.0, 0.0, 0.5) is ct
+    assert not ct.inside.flags.writeable and not ct.dist.flags.writeable
+    assert (ct.r_lo, ct.c_lo) == (0, 0)
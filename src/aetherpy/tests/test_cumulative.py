@@ -0,0 +1,61 @@
+# tests/test_cumulative.py
+import numpy as np
+import pytest
+from aetherpy.core import viewshed_sweep, viewshed_batch, cumulative_viewshed
+from aetherpy.core.validation import synthetic_dem
+from aetherpy.data.loader import DEM
+
+
+def test_cumulative_matches_summed_viewsheds():
+    dem = DEM(synthetic_dem(70, "rolling"))
+    rng = np.random.default_rng(0)
+    observers = rng.integers(0, 70, (25, 2))
+    heights = rng.uniform(1.0, 10.0, 25)
+    weights = rng.uniform(0.0, 2.0, 25)
+    for engine in ("naive", "r2", "xdraw"):
+        for max_dist in (None, 20.0):
+            counts = cumulative_viewshed(dem, observers, obs_h=heights,
+                                         max_dist=max_dist, engine=engine)
+            total = cumulative_viewshed(dem, observers, weights=weights,
+                                        obs_h=heights, max_dist=max_dist,
+                                        engine=engine)
+            ref_c = np.zeros(dem.array.shape, np.int32)
+            ref_w = np.zeros(dem.array.shape, np.float64)
+            for (r, c), h, w in zip(observers, heights, weights):
+                vs = viewshed_sweep(dem, (r, c), obs_h=h, max_dist=max_dist,
+                                    engine=engine)
+                ref_c += vs
+                ref_w += w * vs
+            assert counts.dtype == np.int32
+            assert np.array_equal(counts, ref_c)
+            assert total.dtype == np.float32
+            assert np.allclose(total, ref_w, rtol=1e-5)
+
+
+def test_cumulative_streams_into_out():
+    dem = DEM(synthetic_dem(40, "ridges"))
+    out = np.zeros(dem.array.shape, np.int32)
+    cumulative_viewshed(dem, [(5, 5), (30, 10)], obs_h=3.0, out=out)
+    cumulative_viewshed(dem, [(20, 35)], obs_h=3.0, out=out)
+    assert np.array_equal(
+        out, cumulative_viewshed(dem, [(5, 5), (30, 10), (20, 35)], obs_h=3.0))
+    with pytest.raises(ValueError):
+        cumulative_viewshed(dem, [(5, 5)], out=np.zeros((3, 3), np.int32))
+
+
+def test_void_observers_and_targets_are_skipped():
+    h = synthetic_dem(50, "rolling")
+    h[20:30, :] = np.nan
+    dem = DEM(h)
+    observers = [(5, 5), (25, 10), (40, 40), (22, 30)]
+    total = cumulative_viewshed(dem, observers, obs_h=2.0, max_dist=20.0)
+    ref = sum(viewshed_sweep(dem, o, obs_h=2.0, max_dist=20.0).astype(int)
+              for o in observers)
+    assert np.array_equal(total, ref)
+    assert not total[20:30].any()
+
+    batch = viewshed_batch(dem, observers, obs_h=2.0, max_dist=20.0)
+    assert not batch[1].data.any() and not batch[3].data.any()
+    single = viewshed_sweep(dem, (40, 40), obs_h=2.0, max_dist=20.0,
+                            crop=True)
+    assert np.array_equal(batch[2].data, single.data)
@@ -0,0 +1,41 @@
+# tests/test_imports.py
+import os
+import subprocess
+import sys
+
+import aetherpy
+
+# wall time allowed for `import aetherpy.core` on top of numpy
+IMPORT_BUDGET_S = 0.25
+
+_SCRIPT = """
+import sys, time
+import numpy as np
+t0 = time.perf_counter()
+import aetherpy.core
+elapsed = time.perf_counter() - t0
+heavy = ("numba", "rasterio", "matplotlib", "fiona", "joblib")
+print(elapsed, *[m for m in heavy if m in sys.modules])
+
+from aetherpy.core import is_visible
+from aetherpy.data.loader import DEM
+import aetherpy.io.plotting, aetherpy.io.raster
+assert is_visible(DEM(np.zeros((5, 5))), (0, 0), (4, 4))
+print(*[m for m in heavy if m in sys.modules])
+"""
+
+
+def _run(script):
+    src = os.path.dirname(os.path.dirname(aetherpy.__file__))
+    env = dict(os.environ, PYTHONPATH=src)
+    out = subprocess.run([sys.executable, "-c", script], env=env, check=True,
+                         capture_output=True, text=True).stdout
+    return [line.split() for line in out.splitlines()]
+
+
+def test_import_core_is_lazy_and_fast():
+    (elapsed, *loaded), used = _run(_SCRIPT)
+    assert loaded == []
+    assert float(elapsed) < IMPORT_BUDGET_S
+    # LOS on an array DEM needs Numba, but neither GDAL nor matplotlib
+    assert used == ["numba"]
@@ -0,0 +1,59 @@
+# tests/test_incremental.py
+import numpy as np
+import pytest
+from aetherpy.core import (is_visible, viewshed_batch, ViewshedCache,
+                           InverseVisibilityCache)
+from aetherpy.core.multiobserver import inverse_visibility
+from aetherpy.core.validation import synthetic_dem
+from aetherpy.data.loader import DEM
+
+
+def test_dem_edit_records_dirty_windows():
+    dem = DEM(np.zeros((20, 30)))
+    assert dem.version == 0 and dem.dirty_windows() == []
+    assert is_visible(dem, (10, 0), (10, 29), pyramid=True)
+    # a wall across the line of sight, seen by the cached pyramid too
+    assert dem.edit(0, 14, np.full((20, 2), 50.0)) == 1
+    assert not is_visible(dem, (10, 0), (10, 29), pyramid=True)
+    assert dem.edit(3, 4, [[np.nan, 2.0]]) == 2
+    assert dem.dirty_windows() == [(0, 19, 14, 15), (3, 3, 4, 5)]
+    assert dem.dirty_windows(since=1) == [(3, 3, 4, 5)]
+    assert dem.n_void == 1 and dem.heights()[3, 5] == 2.0
+    # quantized DEMs keep their scale; heights they cannot hold are refused
+    q = DEM(synthetic_dem(20, "rough"), precision="int16")
+    q.edit(5, 5, [[1.25]])
+    assert q.heights()[5, 5] == pytest.approx(1.25, abs=q.z_scale)
+    with pytest.raises(ValueError):
+        q.edit(5, 5, [[1.0e6]])
+    with pytest.raises(ValueError):
+        dem.edit(19, 29, np.zeros((2, 2)))
+
+
+def test_caches_match_full_recompute_after_edits():
+    rng = np.random.default_rng(3)
+    dem = DEM(synthetic_dem(80, "rough") * 5.0)
+    observers = rng.integers(0, 80, (30, 2))
+    targets = rng.random((80, 80)) < 0.05
+    kw = dict(obs_h=2.0, max_dist=15.0, interpolation="bilinear")
+    caches = [ViewshedCache(dem, observers, engine=engine, **kw)
+              for engine in ("naive", "r2", "xdraw")]
+    inverse = [InverseVisibilityCache(dem, targets, engine=engine, **kw)
+               for engine in ("naive", "r2")]
+    for r, c in rng.integers(0, 75, (3, 2)):
+        dem.edit(r, c, dem.heights()[r:r + 4, c:c + 5] + 30.0)
+        for cache, engine in zip(caches, ("naive", "r2", "xdraw")):
+            update = cache.update()
+            # observers far from the building are not swept again
+            assert len(update.full) + len(update.partial) < len(observers)
+            ref = viewshed_batch(dem, observers, engine=engine, **kw)
+            for got, want in zip(cache.windows, ref):
+                assert np.array_equal(got.data, want.data)
+        for cache, engine in zip(inverse, ("naive", "r2")):
+            assert len(cache.update().partial) < targets.sum()
+            result, matrix = cache.result()
+            ref, ref_matrix = inverse_visibility(
+                dem, targets, engine=engine, return_matrix=True, **kw)
+            assert np.array_equal(matrix.bits, ref_matrix.bits)
+            for field in ref._fields:
+                assert np.array_equal(getattr(result, field),
+                                      getattr(ref, field))
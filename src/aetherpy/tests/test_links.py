@@ -0,0 +1,58 @@
+# tests/test_links.py
+import numpy as np
+import pytest
+from aetherpy.core import clearance_many, link_profile, link_clearance
+from aetherpy.core.validation import synthetic_dem
+from aetherpy.data.loader import DEM
+
+
+def test_link_clearance_matches_clearance_many():
+    dem = DEM(synthetic_dem(80, "rough") * 3.0)
+    rng = np.random.default_rng(4)
+    src = rng.integers(0, 80, (500, 2))
+    dst = rng.integers(0, 80, (500, 2))
+    for interpolation in ("nearest", "bilinear"):
+        for k in (0.0, 1.3):
+            ref = clearance_many(dem, src, dst, 10.0, 5.0, interpolation, k)
+            res = link_clearance(dem, src, dst, 10.0, 5.0, 5.8e9,
+                                 interpolation, k)
+            assert np.allclose(res.clearance, ref)
+            # a blocked sight line obstructs the zone by more than half
+            blocked = ref < 0.0
+            assert (res.fresnel_ratio[blocked] < 0.0).all()
+            assert (res.obstruction[blocked] > 50.0).all()
+            assert ((res.obstruction >= 0.0) & (res.obstruction <= 100.0)
+                    | np.isnan(res.obstruction)).all()
+    assert np.isnan(link_clearance(dem, src, dst).fresnel_ratio).all()
+    with pytest.raises(ValueError):
+        link_clearance(dem, src, dst, freq_hz=-1.0)
+
+
+def test_fresnel_zone_over_flat_ground():
+    # 1 km link over flat ground with 1 m cells and 10 m masts
+    dem = DEM(np.zeros((3, 1001)))
+    freq = 2.4e9
+    prof = link_profile(dem, (1, 0), (1, 1000), 10.0, 10.0, freq)
+    assert len(prof.distance) == 1001
+    assert np.allclose(prof.line, 10.0) and np.allclose(prof.terrain, 0.0)
+    wavelength = 299792458.0 / freq
+    radius = np.sqrt(wavelength * 500.0 * 500.0 / 1000.0)
+    assert prof.fresnel[500] == pytest.approx(radius)
+    assert prof.fresnel[0] == 0.0 and prof.fresnel[-1] == 0.0
+
+    res = link_clearance(dem, [(1, 0)], [(1, 1000)], 10.0, 10.0, freq)
+    assert res.clearance[0] == pytest.approx(10.0)
+    assert res.obstruction[0] == 0.0
+    # masts lowered to half the mid-path radius: the centre of the zone is
+    # clear, the lower part is cut by the ground
+    h = radius / 2.0
+    res = link_clearance(dem, [(1, 0)], [(1, 1000)], h, h, freq)
+    assert res.fresnel_ratio[0] == pytest.approx(0.5, rel=1e-3)
+    assert res.worst_distance[0] == pytest.approx(500.0)
+    assert 0.0 < res.obstruction[0] < 50.0
+
+    # Earth curvature lowers the terrain mid-path in the profile frame
+    curved = link_profile(dem, (1, 0), (1, 1000), 10.0, 10.0, freq,
+                          curvature_k=1.3)
+    assert curved.terrain[500] < 0.0
+    assert curved.line[-1] - curved.terrain[-1] == pytest.approx(10.0)
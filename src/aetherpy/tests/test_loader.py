@@ -0,0 +1,84 @@
+# tests/test_loader.py
+import numpy as np
+import pytest
+import rasterio
+from affine import Affine
+from rasterio.windows import Window
+from aetherpy.core import viewshed_sweep
+from aetherpy.data.loader import DEM, LazyDEM, VOID_HEIGHT
+
+
+def test_lazy_dem_window_and_cache(tmp_path, write_dem):
+    yy, xx = np.mgrid[:60, :70]
+    arr = (20 * np.sin(xx / 13.0) * np.cos(yy / 17.0)).astype(np.float32)
+    src = str(tmp_path / "dem.tif")
+    write_dem(src, arr)
+
+    with LazyDEM(src, cache=True) as lazy:
+        assert not lazy.loaded
+        win = lazy.read_window(Window(10, 5, 20, 15))
+        assert win.array.dtype == np.float32
+        assert np.array_equal(win.array, arr[5:20, 10:30])
+        assert not lazy.loaded
+        assert lazy.array.dtype == np.float32
+        assert isinstance(lazy.array, np.memmap)
+        assert lazy.sample(3.4, 7.6, "bilinear") == pytest.approx(
+            DEM(src).sample(3.4, 7.6, "bilinear"), rel=1e-6)
+
+    # a second open maps the cache instead of decoding the GeoTIFF
+    with LazyDEM(src, cache=True) as lazy:
+        assert np.array_equal(lazy.array, arr)
+        vs = viewshed_sweep(lazy, (30, 35), obs_h=2.0, max_dist=40.0)
+        ref = viewshed_sweep(DEM(src), (30, 35), obs_h=2.0, max_dist=40.0)
+        assert np.array_equal(vs, ref)
+
+
+def test_nodata_cells_become_voids(tmp_path):
+    arr = np.full((30, 40), 50.0, dtype=np.float32)
+    arr[:, 25:] = -9999.0
+    src = str(tmp_path / "coast.tif")
+    transform = Affine(2.0, 0.0, 1000.0, 0.0, -2.0, 2000.0)
+    with rasterio.open(src, "w", driver="GTiff", height=30, width=40, count=1,
+                       dtype="float32", transform=transform,
+                       nodata=-9999.0) as dst:
+        dst.write(arr, 1)
+
+    dem = DEM(src)
+    assert dem.nodata == -9999.0 and dem.n_void == 30 * 15
+    assert not dem.valid[:, 25:].any() and dem.valid[:, :25].all()
+    assert dem.array[0, 30] == -VOID_HEIGHT
+    assert np.isnan(dem.heights()[:, 25:]).all()
+    assert DEM(src, voids="opaque").array[0, 30] == VOID_HEIGHT
+    assert DEM(src, precision="int16").n_void == dem.n_void
+
+    with LazyDEM(src, cache=True) as lazy:
+        assert lazy.read_window(Window(20, 0, 10, 5)).n_void == 5 * 5
+        assert np.array_equal(lazy.valid, dem.valid)
+    with LazyDEM(src, cache=True) as lazy:
+        assert np.array_equal(lazy.valid, dem.valid)
+
+    # arrays: NaN is always void, nodata on request; the input is not changed
+    raw = arr.astype(np.float64)
+    assert DEM(raw).valid is None
+    assert DEM(raw, nodata=-9999.0).n_void == dem.n_void
+    assert raw[0, 30] == -9999.0
+    with pytest.raises(ValueError):
+        DEM(raw, voids="hidden")
+
+
+def test_georeferenced_dem_dtype_index_and_coord(tmp_path, write_dem):
+    src = str(tmp_path / "dem.tif")
+    write_dem(src, np.zeros((30, 40)))
+    dem = DEM(src)
+    assert dem.array.dtype == np.float64
+    assert DEM(src, dtype=np.float32).array.dtype == np.float32
+    src16 = str(tmp_path / "dem16.tif")
+    write_dem(src16, np.zeros((30, 40)), dtype="int16")
+    assert DEM(src16, dtype=None).array.dtype == np.int16
+    assert dem.coord(3, 5) == (1010.0, 1994.0)
+    assert dem.index(1011.0, 1993.0) == (3, 5)
+    # a sheared transform is inverted from its coefficients too
+    sheared = DEM(np.zeros((30, 40)),
+                  transform=Affine(2.0, 0.5, 100.0, 0.25, -2.0, 900.0))
+    x, y = sheared.coord(12.5, 7.5)
+    assert sheared.index(x, y) == (12, 7)
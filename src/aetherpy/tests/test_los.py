@@ -1,7 +1,7 @@
 # tests/test_los.py
 import numpy as np
-from arguspy.core import is_visible
-from arguspy.data.loader import DEM
+from aetherpy.core import is_visible
+from aetherpy.data.loader import DEM
 
 def test_simple_hill():
     dem = DEM(np.array([
@@ -12,4 +12,43 @@ def test_simple_hill():
     # (0,0) should not see (2,2) because of the hill at (1,1)
     assert not is_visible(dem, (0,0), (2,2))
     # the same hill also blocks the other diagonal
-    assert not is_visible(dem, (0,2), (2,0))
\ No newline at end of file
+    assert not is_visible(dem, (0,2), (2,0))
+
+def test_is_visible_many_matches_is_visible():
+    from aetherpy.core.los import is_visible_many, clearance_many
+    from aetherpy.core.validation import synthetic_dem
+    dem = DEM(synthetic_dem(80, "rough"))
+    rng = np.random.default_rng(3)
+    src = rng.integers(0, 80, (400, 2))
+    dst = rng.integers(0, 80, (400, 2))
+    obs_h = rng.uniform(0, 20, 400)
+    for interpolation in ("nearest", "bilinear"):
+        vis = is_visible_many(dem, src, dst, obs_h=obs_h, tgt_h=1.5,
+                              interpolation=interpolation, curvature_k=1e-3)
+        ref = [is_visible(dem, tuple(p), tuple(q), obs_h=h, tgt_h=1.5,
+                          interpolation=interpolation, curvature_k=1e-3)
+               for p, q, h in zip(src, dst, obs_h)]
+        assert vis.tolist() == ref
+        assert (is_visible_many(dem, src, dst, obs_h=obs_h, tgt_h=1.5,
+                                interpolation=interpolation, curvature_k=1e-3,
+                                pyramid=True) == vis).all()
+        clear = clearance_many(dem, src, dst, obs_h=obs_h, tgt_h=1.5,
+                               interpolation=interpolation, curvature_k=1e-3)
+        assert ((clear >= 0) == vis).all()
+
+def test_identical_endpoints_are_visible():
+    from aetherpy.core.los import is_visible_many, clearance_many
+    from aetherpy.core.validation import synthetic_dem
+    dem = DEM(synthetic_dem(40, "rough"))
+    pairs = np.array([[0, 0], [17, 23], [39, 39]])
+    for interpolation in ("nearest", "bilinear"):
+        for p in pairs:
+            for pyramid in (None, True):
+                assert is_visible(dem, tuple(p), tuple(p), obs_h=0.0,
+                                  interpolation=interpolation, pyramid=pyramid)
+        for pyramid in (None, True):
+            assert is_visible_many(dem, pairs, pairs, obs_h=0.0,
+                                   interpolation=interpolation,
+                                   pyramid=pyramid).all()
+        assert np.isposinf(clearance_many(dem, pairs, pairs,
+                                          interpolation=interpolation)).all()
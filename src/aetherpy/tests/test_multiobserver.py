@@ -0,0 +1,145 @@
+# tests/test_multiobserver.py
+import numpy as np
+import pytest
+from aetherpy.core.multiobserver import inverse_visibility
+from aetherpy.core import (is_visible, is_visible_many, clearance_many,
+                           viewshed_sweep)
+from aetherpy.data.loader import DEM
+
+
+def _reference_counts(dem, target_mask, obs_h, tgt_h, maxd, interpolation):
+    # one full naive viewshed per target, raised by tgt_h, onto observers
+    # raised by obs_h
+    obs_counts = np.zeros(dem.array.shape)
+    tgt_counts = np.zeros(dem.array.shape, dtype=np.int32)
+    for ti, tj in np.argwhere(target_mask):
+        vs = viewshed_sweep(dem, (ti, tj), obs_h=tgt_h, tgt_h=obs_h,
+                            max_dist=maxd, interpolation=interpolation,
+                            engine="naive")
+        obs_counts += vs
+        tgt_counts[ti, tj] = vs.sum()
+    return obs_counts, tgt_counts
+
+
+def test_inverse_matches_per_target_viewsheds(terrain):
+    dem = DEM(terrain())
+    target_mask = np.zeros(dem.array.shape, dtype=bool)
+    target_mask[12:16, 10:13] = True
+    for interpolation in ("nearest", "bilinear"):
+        for obs_h, tgt_h in ((1.5, 0.0), (0.0, 1.5), (2.0, 0.5)):
+            res = inverse_visibility(dem, target_mask, obs_h=obs_h,
+                                     tgt_h=tgt_h, max_dist=10.0,
+                                     interpolation=interpolation)
+            obs_ref, tgt_ref = _reference_counts(
+                dem, target_mask, obs_h, tgt_h, 10.0, interpolation)
+            assert np.array_equal(res.obs_counts, obs_ref)
+            assert np.array_equal(res.tgt_counts, tgt_ref)
+
+
+def test_inverse_observer_heights_in_one_pass(terrain):
+    dem = DEM(terrain(41))
+    target_mask = np.zeros(dem.array.shape, dtype=bool)
+    target_mask[15:25:3, 12:30:4] = True
+    heights = [0.5, 4.0, 2.0]
+    for engine in ("naive", "r2"):
+        for interpolation in ("nearest", "bilinear"):
+            res = inverse_visibility(dem, target_mask, obs_h=heights,
+                                     tgt_h=1.0, max_dist=12.0, engine=engine,
+                                     interpolation=interpolation)
+            assert res.obs_counts.shape == (3,) + dem.array.shape
+            for k, h in enumerate(heights):
+                ref = inverse_visibility(dem, target_mask, obs_h=h,
+                                         tgt_h=1.0, max_dist=12.0,
+                                         engine=engine, symmetric=False,
+                                         interpolation=interpolation)
+                for a, b in zip(res, ref):
+                    assert np.allclose(a[k], b)
+    with pytest.raises(ValueError):
+        inverse_visibility(dem, target_mask, obs_h=heights, return_matrix=True)
+
+
+def test_inverse_weights_and_observer_mask():
+    dem = DEM(np.zeros((9, 9)))
+    weights = np.zeros((9, 9))
+    weights[4, 4] = 0.5
+    weights[4, 5] = 1.0
+    observer_mask = np.zeros((9, 9), dtype=bool)
+    observer_mask[:, :3] = True
+    res = inverse_visibility(dem, weights, weight_by_cell=True,
+                             observer_mask=observer_mask)
+    # flat terrain: every allowed observer sees both targets
+    assert np.allclose(res.obs_counts[observer_mask], 1.5)
+    assert (res.obs_counts[~observer_mask] == 0).all()
+    assert res.tgt_counts[4, 4] == observer_mask.sum()
+
+
+def test_inverse_r2_engine_matches_r2_viewsheds(terrain):
+    dem = DEM(terrain(41))
+    target_mask = np.zeros(dem.array.shape, dtype=bool)
+    target_mask[18:22, 15:19] = True
+    for interpolation in ("nearest", "bilinear"):
+        res = inverse_visibility(dem, target_mask, obs_h=1.5, tgt_h=0.5,
+                                 max_dist=15.0, interpolation=interpolation,
+                                 engine="r2")
+        obs_ref = np.zeros(dem.array.shape)
+        for ti, tj in np.argwhere(target_mask):
+            vs = viewshed_sweep(dem, (ti, tj), obs_h=0.5, tgt_h=1.5,
+                                max_dist=15.0, interpolation=interpolation,
+                                engine="r2")
+            obs_ref += vs
+            assert res.tgt_counts[ti, tj] == vs.sum()
+        assert np.array_equal(res.obs_counts, obs_ref)
+
+
+def test_inverse_symmetric_traces_each_pair_once(terrain):
+    dem = DEM(terrain(21))
+    target_mask = np.zeros(dem.array.shape, dtype=bool)
+    target_mask[6:13, 5:12] = True
+    observer_mask = np.zeros(dem.array.shape, dtype=bool)
+    observer_mask[3:15, 3:15] = True
+    targets = [tuple(t) for t in np.argwhere(target_mask)]
+    rank = {t: k for k, t in enumerate(targets)}
+
+    sym = inverse_visibility(dem, target_mask, obs_h=1.0, tgt_h=1.0,
+                             max_dist=8.0, observer_mask=observer_mask,
+                             symmetric=True)
+    one_way = inverse_visibility(dem, target_mask, obs_h=1.0, tgt_h=1.0,
+                                 max_dist=8.0, observer_mask=observer_mask)
+
+    # reference: pairs of two targets are traced from the lower-ranked one
+    obs_ref = np.zeros(dem.array.shape)
+    for t in targets:
+        for o in map(tuple, np.argwhere(observer_mask)):
+            if (t[0] - o[0]) ** 2 + (t[1] - o[1]) ** 2 > 64.0:
+                continue
+            a, b = (o, t) if rank.get(o, len(targets)) < rank[t] else (t, o)
+            if t == o or is_visible(dem, a, b, obs_h=1.0, tgt_h=1.0):
+                obs_ref[o] += 1
+    assert np.array_equal(sym.obs_counts, obs_ref)
+    assert np.array_equal(sym.tgt_possible_counts, one_way.tgt_possible_counts)
+    assert (sym.obs_counts == one_way.obs_counts).mean() > 0.9
+
+    with pytest.raises(ValueError):
+        inverse_visibility(dem, target_mask, obs_h=1.0, tgt_h=0.0,
+                           symmetric=True)
+
+
+def test_void_cells_are_neither_targets_nor_observers(terrain):
+    h = terrain()
+    h[:, 20:] = np.nan
+    dem = DEM(h)
+    target_mask = np.zeros(h.shape, dtype=bool)
+    target_mask[10:14, 15:25] = True
+    res = inverse_visibility(dem, target_mask, obs_h=1.0, max_dist=10.0)
+    ref = inverse_visibility(dem, target_mask & dem.valid, obs_h=1.0,
+                             max_dist=10.0, observer_mask=dem.valid)
+    for a, b in zip(res, ref):
+        assert np.allclose(a, b)
+    assert not res.obs_counts[:, 20:].any()
+    assert not res.tgt_counts[:, 20:].any()
+
+    src = [(12, 5), (12, 5), (12, 25)]
+    dst = [(12, 15), (12, 22), (12, 10)]
+    assert list(is_visible_many(dem, src, dst, 1.0)) == [
+        is_visible(dem, (12, 5), (12, 15), 1.0), False, False]
+    assert np.isnan(clearance_many(dem, src, dst, 1.0)[1:]).all()
@@ -0,0 +1,22 @@
+# tests/test_numba_kernels.py
+import aetherpy
+from aetherpy.accel.numba_kernels import kernels
+
+
+def test_every_kernel_is_cached_on_disk():
+    found = kernels()
+    assert "aetherpy.core.los._is_visible" in found
+    assert "aetherpy.core.multiobserver._inverse_counts_jit" in found
+    uncached = [name for name, k in found.items()
+                if type(k._cache).__name__ == "NullCache"]
+    assert uncached == []
+
+
+def test_warmup_compiles_public_kernels():
+    assert aetherpy.warmup() >= 0.0
+    found = kernels()
+    for name in ("aetherpy.core.sweep._naive_into",
+                 "aetherpy.core.sweep._batch_jit",
+                 "aetherpy.core.cumulative._cumulative_jit",
+                 "aetherpy.core.siting._signature_bits_jit"):
+        assert found[name].signatures
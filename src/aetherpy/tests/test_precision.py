@@ -0,0 +1,109 @@
+# tests/test_precision.py
+import numpy as np
+import pytest
+from aetherpy.core import (viewshed_sweep, viewshed_batch, cumulative_viewshed,
+                           is_visible, is_visible_many, clearance_many)
+from aetherpy.core.multiobserver import inverse_visibility
+from aetherpy.core.validation import synthetic_dem
+from aetherpy.data.loader import DEM, quantize
+
+
+def test_quantize_round_trip():
+    h = synthetic_dem(40, "rough") + 350.0
+    h[3, 4] = np.nan
+    for precision in ("int16", "int32"):
+        dem = DEM(h, precision=precision)
+        assert dem.array.dtype == np.dtype(precision)
+        back = dem.heights()
+        assert np.isnan(back[3, 4])
+        ok = np.isfinite(h)
+        assert np.abs(back[ok] - h[ok]).max() <= dem.z_scale / 2 + 1e-9
+        assert dem.sample(10.0, 12.0) == pytest.approx(h[10, 12],
+                                                       abs=dem.z_scale)
+    assert DEM(h, precision="float32").array.dtype == np.float32
+
+    # the default centimetre step widens only when the range needs it
+    _, scale, _ = quantize(np.array([[0.0, 100.0]]), "int16")
+    assert scale == 0.01
+    _, scale, _ = quantize(np.array([[0.0, 3000.0]]), "int16")
+    assert 3000.0 / scale < 2 ** 16
+    with pytest.raises(ValueError):
+        quantize(np.array([[0.0, 3000.0]]), "int16", z_scale=0.01)
+    with pytest.raises(ValueError):
+        DEM(h, precision="float16")
+
+
+def test_reduced_precision_agrees_with_float64():
+    dem = DEM(synthetic_dem(80, "rough") * 3.0 + 1200.0, transform=None)
+    observers = [(10, 12), (40, 40), (70, 25)]
+    bounds = {"float32": 0.995, "int32": 0.995, "int16": 0.98}
+    for engine in ("naive", "r2"):
+        ref = [viewshed_sweep(dem, o, obs_h=2.0, max_dist=30.0,
+                              engine=engine) for o in observers]
+        for precision, bound in bounds.items():
+            for o, r in zip(observers, ref):
+                vs = viewshed_sweep(dem, o, obs_h=2.0, max_dist=30.0,
+                                    engine=engine, precision=precision)
+                assert (vs == r).mean() >= bound
+            batch = viewshed_batch(dem, observers, obs_h=2.0, max_dist=30.0,
+                                   engine=engine, precision=precision)
+            for win, o in zip(batch, observers):
+                single = viewshed_sweep(dem, o, obs_h=2.0, max_dist=30.0,
+                                        engine=engine, precision=precision,
+                                        crop=True)
+                assert np.array_equal(win.data, single.data)
+
+    cum = cumulative_viewshed(dem, observers, obs_h=2.0, max_dist=30.0)
+    cum16 = cumulative_viewshed(dem, observers, obs_h=2.0, max_dist=30.0,
+                                precision="int16")
+    assert (cum16 == cum).mean() >= 0.98
+
+    mask = np.zeros(dem.array.shape, dtype=bool)
+    mask[35:45, 35:45] = True
+    ref = inverse_visibility(dem, mask, obs_h=2.0, max_dist=20.0)
+    res = inverse_visibility(dem, mask, obs_h=2.0, max_dist=20.0,
+                             precision="int16")
+    assert np.abs(res.obs_ratio - ref.obs_ratio).mean() < 0.02
+
+
+def test_quantized_heights_keep_map_units():
+    dem = DEM(synthetic_dem(60, "rolling") + 500.0)
+    rng = np.random.default_rng(3)
+    src = rng.integers(0, 60, (200, 2))
+    dst = rng.integers(0, 60, (200, 2))
+    ref_c = clearance_many(dem, src, dst, 1.5, 0.5, curvature_k=1.3)
+    ref_v = is_visible_many(dem, src, dst, 1.5, 0.5, curvature_k=1.3)
+    for precision in ("float32", "int16"):
+        c = clearance_many(dem, src, dst, 1.5, 0.5, curvature_k=1.3,
+                           precision=precision)
+        assert np.nanmax(np.abs(c - ref_c)) < 0.05
+        v = is_visible_many(dem, src, dst, 1.5, 0.5, curvature_k=1.3,
+                            precision=precision)
+        assert (v == ref_v).mean() >= 0.98
+
+    ref = viewshed_sweep(dem, (30, 30), obs_h=2.0, max_dist=25.0,
+                         output="horizon")
+    res = viewshed_sweep(dem, (30, 30), obs_h=2.0, max_dist=25.0,
+                         output="horizon", precision="int16")
+    both = np.isfinite(ref.min_target_h) & np.isfinite(res.min_target_h)
+    assert both.any()
+    assert np.abs(res.min_target_h[both]
+                  - ref.min_target_h[both]).max() < 0.1
+
+
+def test_integer_opaque_voids_block_over_high_terrain():
+    # a 2000 m plateau with one low cell forces a coarse int16 step
+    h = np.full((41, 41), 2000.0)
+    h[0, 0] = 0.0
+    h[:, 28] = np.nan
+    for precision in (None, "int32", "int16"):
+        dem = DEM(h, voids="opaque", precision=precision)
+        assert dem.void_headroom >= 1000.0
+        vs = viewshed_sweep(dem, (20, 20), obs_h=10.0, engine="naive")
+        assert not vs[:, 29:].any()
+        assert not is_visible(dem, (20, 20), (20, 35), obs_h=10.0)
+    # sight lines that could pass over the void wall are refused
+    with pytest.raises(ValueError):
+        is_visible(dem, (20, 20), (20, 35), obs_h=1500.0)
+    assert is_visible(DEM(h, precision="int16"), (20, 20), (20, 35),
+                      obs_h=1500.0)
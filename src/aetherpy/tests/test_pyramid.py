@@ -0,0 +1,54 @@
+# tests/test_pyramid.py
+import os
+import numpy as np
+import rasterio
+from affine import Affine
+from aetherpy.core import is_visible
+from aetherpy.core.validation import synthetic_dem
+from aetherpy.data.loader import DEM
+from aetherpy.data.pyramid import build_pyramid, dem_pyramid
+
+
+def test_pyramid_levels_bound_the_dem():
+    arr = synthetic_dem(37, "rough")
+    pyr = build_pyramid(arr)
+    lv = 2
+    nr, nc = pyr.shapes[lv]
+    maxs = pyr.maxs[pyr.offsets[lv]:pyr.offsets[lv + 1]].reshape(nr, nc)
+    mins = pyr.mins[pyr.offsets[lv]:pyr.offsets[lv + 1]].reshape(nr, nc)
+    assert maxs[3, 5] == arr[12:16, 20:24].max()
+    assert mins[9, 9] == arr[36:, 36:].min()
+    assert pyr.shapes[-1].tolist() == [1, 1]
+
+
+def test_pyramid_los_matches_flat_los():
+    rng = np.random.default_rng(1)
+    for kind in ("rough", "ridges"):
+        dem = DEM(synthetic_dem(160, kind))
+        for interpolation in ("nearest", "bilinear"):
+            pyr = dem_pyramid(dem, interpolation, cache=False)
+            for _ in range(300):
+                p1 = tuple(rng.integers(0, 160, 2))
+                p2 = tuple(rng.integers(0, 160, 2))
+                for obs_h, k in ((2.0, 0.0), (30.0, 0.0), (30.0, 1e-4)):
+                    ref = is_visible(dem, p1, p2, obs_h=obs_h,
+                                     interpolation=interpolation, curvature_k=k)
+                    got = is_visible(dem, p1, p2, obs_h=obs_h,
+                                     interpolation=interpolation, curvature_k=k,
+                                     pyramid=pyr)
+                    assert ref == got
+
+
+def test_pyramid_disk_cache(tmp_path):
+    arr = synthetic_dem(40, "rolling")
+    src = str(tmp_path / "dem.tif")
+    with rasterio.open(src, "w", driver="GTiff", height=40, width=40, count=1,
+                       dtype="float64",
+                       transform=Affine(1.0, 0, 0, 0, -1.0, 40.0)) as dst:
+        dst.write(arr, 1)
+    pyr = dem_pyramid(DEM(src))
+    assert os.path.exists(src + ".pyramid.npz")
+    again = dem_pyramid(DEM(src))
+    assert np.array_equal(again.maxs, pyr.maxs)
+    assert is_visible(DEM(src), (3, 3), (30, 35), obs_h=5.0, pyramid=True) \
+        == is_visible(DEM(src), (3, 3), (30, 35), obs_h=5.0)
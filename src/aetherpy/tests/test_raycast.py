@@ -0,0 +1,68 @@
+# tests/test_raycast.py
+import math
+import numpy as np
+import pytest
+from affine import Affine
+from aetherpy.core import raycast, surface_points
+from aetherpy.core.los import _bilinear_sample
+from aetherpy.core.validation import synthetic_dem
+from aetherpy.data.loader import DEM
+
+
+def _reference(h, src, dst, bilinear, k):
+    # straight march of the 3D segments, Earth bulge added to the terrain
+    inv_2rk = 1.0 / (2.0 * 6371000.0 * k) if k > 0.0 else 0.0
+    out = np.ones(len(src), dtype=bool)
+    for i, ((r0, c0, z0), (r1, c1, z1)) in enumerate(zip(src, dst)):
+        n = math.ceil(max(abs(r1 - r0), abs(c1 - c0)))
+        total = math.hypot(r1 - r0, c1 - c0)
+        for s in range(1, n):
+            t = s / n
+            rf, cf = r0 + (r1 - r0) * t, c0 + (c1 - c0) * t
+            z = (_bilinear_sample(h, rf, cf) if bilinear
+                 else h[math.floor(rf + 0.5), math.floor(cf + 0.5)])
+            d = t * total
+            if z + d * (total - d) * inv_2rk > z0 + (z1 - z0) * t + 1e-9:
+                out[i] = False
+                break
+    return out
+
+
+def test_raycast_matches_reference_march():
+    h = synthetic_dem(120, "rough") * 5.0
+    dem = DEM(h)
+    rng = np.random.default_rng(5)
+    n = 800
+    src = np.column_stack([rng.uniform(0, 119, (n, 2)),
+                           rng.uniform(h.min(), h.max() + 30.0, n)])
+    for interpolation in ("nearest", "bilinear"):
+        dst = surface_points(dem, rng.uniform(0, 119, (n, 2)), 1.0,
+                             coords="grid", interpolation=interpolation)
+        for k in (0.0, 1.3):
+            ref = _reference(h, src, dst, interpolation == "bilinear", k)
+            assert 0.0 < ref.mean() < 1.0
+            for pyramid in (True, None):
+                res = raycast(dem, src, dst, "grid", interpolation, k, pyramid)
+                assert np.array_equal(res, ref)
+    with pytest.raises(ValueError):
+        raycast(dem, [(0.0, 0.0, 1.0)], [(0.0, 130.0, 1.0)], coords="grid")
+    with pytest.raises(ValueError):
+        raycast(dem, src, dst)   # map coordinates need a transform
+
+
+def test_drone_over_ridge():
+    # north-south ridge of 100 m through the middle of a 2 m grid
+    h = np.zeros((50, 200))
+    h[:, 95:105] = 100.0
+    transform = Affine(2.0, 0.0, 5000.0, 0.0, -2.0, 8000.0)
+    dem = DEM(h, transform=transform)
+    x, y = 5000.0 + 2.0 * 20.5, 8000.0 - 2.0 * 25.5   # centre of cell (25, 20)
+    ground = surface_points(dem, [(x, y)], 1.5)
+    assert ground[0, 2] == pytest.approx(1.5)
+    xs = np.full(3, x + 300.0)
+    drones = np.column_stack([xs, np.full(3, y), [50.0, 250.0, 2000.0]])
+    visible = raycast(dem, drones, np.repeat(ground, 3, axis=0))
+    assert visible.tolist() == [False, True, True]
+    # same answer on a quantized copy
+    assert raycast(dem, drones, np.repeat(ground, 3, axis=0),
+                   precision="int16").tolist() == [False, True, True]
@@ -0,0 +1,62 @@
+# tests/test_siting.py
+import numpy as np
+from aetherpy.core.multiobserver import inverse_visibility, best_observers_from_index
+from aetherpy.core.siting import visibility_signatures, greedy_sites, site_observers
+from aetherpy.core.validation import synthetic_dem
+from aetherpy.data.loader import DEM
+
+
+def _setup(n=48):
+    dem = DEM(synthetic_dem(n, "rough"))
+    target_mask = np.zeros((n, n))
+    target_mask[::3, ::2] = np.linspace(0.2, 1.0, target_mask[::3, ::2].size
+                                        ).reshape(target_mask[::3, ::2].shape)
+    observer_mask = np.zeros((n, n), dtype=bool)
+    observer_mask[1::2, 1::2] = True
+    return dem, target_mask, observer_mask
+
+
+def test_signatures_match_inverse_counts():
+    dem, target_mask, observer_mask = _setup()
+    for engine in ("naive", "r2"):
+        kw = dict(obs_h=3.0, tgt_h=1.0, max_dist=15.0,
+                  observer_mask=observer_mask, weight_by_cell=True,
+                  engine=engine)
+        sig = visibility_signatures(dem, target_mask, **kw)
+        res = inverse_visibility(dem, target_mask, **kw)
+        bits = np.unpackbits(sig.bits.view(np.uint8), axis=1,
+                             bitorder="little")[:, :len(sig.targets)]
+        seen = bits @ sig.weights
+        r, c = sig.candidates.T
+        assert np.allclose(seen, res.obs_counts[r, c])
+
+
+def test_lazy_greedy_equals_plain_greedy():
+    dem, target_mask, observer_mask = _setup()
+    for weight_by_cell in (False, True):
+        sig = visibility_signatures(dem, target_mask, obs_h=3.0, tgt_h=1.0,
+                                    max_dist=15.0, observer_mask=observer_mask,
+                                    weight_by_cell=weight_by_cell)
+        lazy = greedy_sites(sig, 8)
+        plain = greedy_sites(sig, 8, lazy=False)
+        assert np.array_equal(lazy.sites, plain.sites)
+        assert np.allclose(lazy.gains, plain.gains)
+        assert (np.diff(lazy.gains) <= 1e-12).all()
+        assert np.isclose(lazy.coverage[-1],
+                          sig.weights[lazy.covered].sum())
+
+
+def test_greedy_spacing_and_coverage_beats_top_k():
+    dem, target_mask, observer_mask = _setup()
+    kw = dict(obs_h=3.0, tgt_h=1.0, max_dist=15.0, observer_mask=observer_mask)
+    res = site_observers(dem, target_mask, 5, min_spacing=10.0, **kw)
+    d = np.hypot(*(res.sites[:, None, :] - res.sites[None, :, :]).T)
+    assert (d[np.triu_indices(len(res.sites), 1)] >= 10.0).all()
+
+    sig = visibility_signatures(dem, target_mask, **kw)
+    greedy = greedy_sites(sig, 5)
+    top = best_observers_from_index(inverse_visibility(dem, target_mask, **kw), k=5)
+    index = {tuple(c): n for n, c in enumerate(sig.candidates)}
+    union = np.bitwise_or.reduce(sig.bits[[index[tuple(t)] for t in top]], axis=0)
+    top_cov = np.unpackbits(union.view(np.uint8))[:].sum()
+    assert greedy.coverage[-1] >= top_cov
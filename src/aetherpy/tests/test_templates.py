@@ -0,0 +1,30 @@
+# tests/test_templates.py
+import numpy as np
+from aetherpy.core.sweep import _r2_into
+from aetherpy.core.templates import ray_template
+from aetherpy.core.validation import synthetic_dem
+
+
+def test_template_is_cached_and_read_only():
+    tpl = ray_template(0.5, 0.5, 20.0, "bilinear", 1.3)
+    assert ray_template(0.5, 0.5, 20.0, "bilinear", 1.3) is tpl
+    assert not tpl.cell_inv_d.flags.writeable
+    assert tpl.ray_start.size == 4 * (tpl.half_r + tpl.half_c) + 1
+    assert ray_template(0.5, 0.5, None) is None
+
+
+def test_template_walk_matches_direct_r2():
+    from aetherpy.core import viewshed_sweep
+    from aetherpy.data.loader import DEM
+    dem = DEM(synthetic_dem(91, kind="rough"))
+    for interpolation in ("nearest", "bilinear"):
+        for obs in [(45, 45), (2, 80)]:
+            vs = viewshed_sweep(dem, obs, obs_h=2.0, max_dist=30.0,
+                                interpolation=interpolation, curvature_k=0.01,
+                                tgt_h=0.5, engine="r2")
+            direct = np.zeros_like(vs)
+            _r2_into(dem.array, direct, np.empty((0, 0)), 0, 0,
+                     obs[0], obs[1], 2.0, 0.5, 30.0, 1.0, 1.0,
+                     interpolation == "bilinear",
+                     0.0, 2 * np.pi, -np.pi / 2, np.pi / 2, 0.0, 0.01)
+            assert np.array_equal(vs, direct)
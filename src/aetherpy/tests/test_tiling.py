@@ -0,0 +1,84 @@
+# tests/test_tiling.py
+import numpy as np
+import pytest
+import rasterio
+from aetherpy.core import viewshed_sweep, cumulative_viewshed
+from aetherpy.data.loader import DEM, LazyDEM
+from aetherpy.data.tiling import TiledDEM, tiled_viewshed, tile_size_for_budget
+
+
+def test_tiled_viewshed_matches_in_memory(tmp_path, write_dem):
+    yy, xx = np.mgrid[:90, :110]
+    arr = 20 * np.sin(xx / 13.0) * np.cos(yy / 17.0) + 0.05 * xx
+    src = str(tmp_path / "dem.tif")
+    write_dem(src, arr)
+    observers = [(10, 12), (45, 55), (80, 100), (44, 20)]
+
+    dem = DEM(src)
+    expected = np.zeros(arr.shape, np.uint32)
+    for obs in observers:
+        expected += viewshed_sweep(dem, obs, obs_h=2.0, max_dist=40.0)
+
+    out = str(tmp_path / "count.tif")
+    tiled_viewshed(src, observers, out, max_dist=40.0, obs_h=2.0,
+                   tile_size=32)
+    with rasterio.open(out) as ds:
+        got = ds.read(1)
+        assert ds.transform == dem.transform
+    assert np.array_equal(got, expected)
+
+
+def test_tiled_viewshed_skips_nodata(tmp_path, write_dem):
+    yy, xx = np.mgrid[:40, :50]
+    relief = np.round(10 * np.sin(xx / 7.0) * np.cos(yy / 9.0))
+    observers = [(10, 10), (30, 40), (20, 14)]
+    for nodata in (32767, -9999):
+        arr = relief.copy()
+        arr[:, 14] = nodata
+        src = str(tmp_path / f"dem{nodata}.tif")
+        write_dem(src, arr, dtype="int16", nodata=nodata)
+        for voids in ("transparent", "opaque"):
+            expected = cumulative_viewshed(DEM(src, voids=voids), observers,
+                                           obs_h=2.0, max_dist=30.0,
+                                           engine="naive")
+            out = str(tmp_path / "count.tif")
+            tiled_viewshed(src, observers, out, max_dist=30.0, obs_h=2.0,
+                           engine="naive", voids=voids, tile_size=16)
+            with rasterio.open(out) as ds:
+                assert np.array_equal(ds.read(1), expected)
+            assert not expected[:, 14].any()
+            # an open LazyDEM brings its own nodata and voids
+            with LazyDEM(src, voids=voids) as lazy:
+                tiled_viewshed(lazy, observers, out, max_dist=30.0,
+                               obs_h=2.0, engine="naive", tile_size=16)
+            with rasterio.open(out) as ds:
+                assert np.array_equal(ds.read(1), expected)
+
+
+def test_tiled_dem_windows(tmp_path, write_dem):
+    arr = np.arange(50 * 40, dtype=np.float64).reshape(50, 40)
+    src = str(tmp_path / "dem.tif")
+    write_dem(src, arr)
+    with TiledDEM(src) as tdem:
+        tiles = list(tdem.tiles(16, 3, 3))
+        covered = np.zeros(arr.shape, int)
+        for tile in tiles:
+            core = tile.core
+            covered[core.row_off:core.row_off + core.height,
+                    core.col_off:core.col_off + core.width] += 1
+        assert (covered == 1).all()
+        sub = tdem.read_window(tiles[5].halo)
+        h = tiles[5].halo
+        assert np.array_equal(
+            sub.array, arr[h.row_off:h.row_off + h.height,
+                           h.col_off:h.col_off + h.width])
+        assert sub.transform.c == tdem.transform.c + 2.0 * h.col_off
+        assert sub.transform.f == tdem.transform.f - 2.0 * h.row_off
+        assert tdem.coord(7, 9) == (1018.0, 1986.0)
+        assert tdem.index(1019.0, 1985.0) == (7, 9)
+
+
+def test_tile_size_budget():
+    assert tile_size_for_budget(64 * 1024 ** 2, 100, 100) % 16 == 0
+    with pytest.raises(ValueError):
+        tile_size_for_budget(1024, 100, 100)
@@ -1,7 +1,8 @@
 # tests/test_viewshed.py
 import numpy as np
-from arguspy.core import viewshed_sweep
-from arguspy.data.loader import DEM
+import pytest
+from aetherpy.core import viewshed_sweep
+from aetherpy.data.loader import DEM
 
 def test_viewshed_center_flat():
     arr = np.zeros((5,5))
@@ -9,3 +10,130 @@ def test_viewshed_center_flat():
     vs = viewshed_sweep(dem, (2,2))
     # on flat ground, center sees all
     assert vs.all()
+
+
+def _rolling_terrain(n=121):
+    yy, xx = np.mgrid[:n, :n]
+    return 20 * np.sin(xx / 13.0) * np.cos(yy / 17.0) + 0.05 * xx
+
+
+def test_engines_flat_with_edge_observer():
+    dem = DEM(np.zeros((7, 9)))
+    for engine in ("naive", "r2", "xdraw"):
+        assert viewshed_sweep(dem, (0, 3), engine=engine).all()
+
+
+def test_r2_matches_naive_reference():
+    dem = DEM(_rolling_terrain())
+    for interpolation in ("nearest", "bilinear"):
+        ref = viewshed_sweep(dem, (60, 50), obs_h=2.0, max_dist=50.0,
+                             interpolation=interpolation, engine="naive")
+        r2 = viewshed_sweep(dem, (60, 50), obs_h=2.0, max_dist=50.0,
+                            interpolation=interpolation, engine="r2")
+        assert (ref == r2).mean() > 0.97
+
+
+def test_curvature_is_honoured():
+    dem = DEM(np.zeros((3, 200)))
+    vs = viewshed_sweep(dem, (1, 0), obs_h=0.0, curvature_k=1e-6)
+    # a strongly curved earth hides the far end of a flat strip
+    assert not vs[1, -1]
+
+
+def test_unknown_engine():
+    with pytest.raises(ValueError):
+        viewshed_sweep(DEM(np.zeros((3, 3))), (1, 1), engine="magic")
+
+
+def test_engine_agreement_bounds():
+    from aetherpy.core.validation import AGREEMENT_BOUNDS, harness_agreement
+    for interpolation in ("nearest", "bilinear"):
+        worst = harness_agreement(("r2", "xdraw"), interpolation)
+        for engine in ("r2", "xdraw"):
+            assert worst[engine] >= AGREEMENT_BOUNDS[engine, interpolation]
+
+
+def test_horizon_output_matches_mask():
+    dem = DEM(_rolling_terrain(61))
+    for engine in ("naive", "r2", "xdraw"):
+        vs = viewshed_sweep(dem, (30, 20), obs_h=2.0, max_dist=25.0,
+                            engine=engine)
+        res = viewshed_sweep(dem, (30, 20), obs_h=2.0, max_dist=25.0,
+                             engine=engine, output="horizon")
+        assert res.horizon_angle.dtype == np.float32
+        assert (res.visible == vs).all()
+        assert ((res.min_target_h <= 0.0) == vs).all()
+
+
+def test_min_target_height_thresholds_naive_los():
+    from aetherpy.core import is_visible
+    dem = DEM(_rolling_terrain(61))
+    res = viewshed_sweep(dem, (30, 20), obs_h=2.0, engine="naive",
+                         output="horizon")
+    for cell in [(5, 50), (50, 55), (10, 5), (58, 30)]:
+        t = float(res.min_target_h[cell])
+        assert is_visible(dem, (30, 20), cell, obs_h=2.0, tgt_h=t + 1e-3)
+        if t > 1e-2:
+            assert not is_visible(dem, (30, 20), cell, obs_h=2.0,
+                                  tgt_h=t - 1e-2)
+
+
+def test_crop_matches_full_window():
+    dem = DEM(_rolling_terrain(81))
+    full = viewshed_sweep(dem, (5, 70), obs_h=2.0, max_dist=12.0)
+    win = viewshed_sweep(dem, (5, 70), obs_h=2.0, max_dist=12.0, crop=True)
+    r, c = win.row_off, win.col_off
+    assert (r, c) == (0, 58)
+    assert win.transform is None
+    assert np.array_equal(win.data, full[r:r + win.data.shape[0],
+                                         c:c + win.data.shape[1]])
+    # nothing outside the window is ever marked
+    assert full.sum() == win.data.sum()
+
+
+def test_void_cells_are_skipped():
+    terrain = _rolling_terrain(61)
+    h = terrain.copy()
+    h[:, 30:34] = np.nan            # void strip across the raster
+    dem = DEM(h)
+    opaque = DEM(h, voids="opaque")
+    pit = DEM(np.where(np.isnan(h), -1.0e6, h))
+    for engine in ("naive", "r2", "xdraw"):
+        vs = viewshed_sweep(dem, (30, 10), obs_h=2.0, engine=engine)
+        # transparent voids act as a bottomless pit, and are never visible
+        ref = viewshed_sweep(pit, (30, 10), obs_h=2.0, engine=engine)
+        assert np.array_equal(vs, ref & dem.valid)
+        assert not vs[:, 30:34].any() and vs[:, 34:].any()
+        # opaque voids hide everything behind them
+        assert not viewshed_sweep(opaque, (30, 10), obs_h=2.0,
+                                  engine=engine)[:, 30:].any()
+        assert not viewshed_sweep(dem, (30, 31), engine=engine).any()
+    hz = viewshed_sweep(dem, (30, 10), obs_h=2.0, output="horizon")
+    assert np.isnan(hz.min_target_h[:, 30:34]).all()
+
+
+def test_observer_heights_in_one_sweep():
+    dem = DEM(_rolling_terrain(81) * 2.0)
+    heights = [2.0, 30.0, 10.0, 60.0]
+    for interpolation in ("nearest", "bilinear"):
+        for kw in ({"max_dist": 30.0}, {"azimuth_range": (20.0, 80.0),
+                                        "curvature_k": 0.01}):
+            kw["engine"] = "r2"
+            stack = viewshed_sweep(dem, (40, 40), obs_h=heights,
+                                   interpolation=interpolation, **kw)
+            assert stack.shape == (4,) + dem.array.shape
+            for vs, h in zip(stack, heights):
+                ref = viewshed_sweep(dem, (40, 40), obs_h=h,
+                                     interpolation=interpolation, **kw)
+                assert np.array_equal(vs, ref)
+            low = viewshed_sweep(dem, (40, 40), obs_h=heights,
+                                 interpolation=interpolation,
+                                 output="min_obs_h", **kw)
+            # a higher observer sees everything a lower one sees
+            assert np.array_equal(np.isnan(low), ~stack[3])
+            assert np.array_equal(low <= 10.0, stack[2])
+    with pytest.raises(ValueError):
+        viewshed_sweep(dem, (40, 40), obs_h=heights)
+    with pytest.raises(ValueError):
+        viewshed_sweep(dem, (40, 40), obs_h=heights, engine="r2",
+                       elev_angle_range=(-5.0, 5.0))
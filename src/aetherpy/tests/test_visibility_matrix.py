@@ -0,0 +1,93 @@
+# tests/test_visibility_matrix.py
+import numpy as np
+import pytest
+from aetherpy.core.multiobserver import inverse_visibility
+from aetherpy.core.siting import greedy_sites
+from aetherpy.core.visibility_matrix import VisibilityMatrix
+from aetherpy.data.loader import DEM
+
+
+def _matrix(terrain):
+    dem = DEM(terrain())
+    weights = np.zeros(dem.array.shape)
+    weights[8:17, 6:15] = np.linspace(0.1, 1.0, 81).reshape(9, 9)
+    observer_mask = np.zeros(dem.array.shape, dtype=bool)
+    observer_mask[::2, ::2] = True
+    kwargs = dict(obs_h=1.5, tgt_h=0.5, max_dist=12.0, weight_by_cell=True,
+                  observer_mask=observer_mask)
+    return dem, weights, kwargs
+
+
+def test_matrix_counts_match_inverse_visibility(terrain):
+    dem, weights, kwargs = _matrix(terrain)
+    for engine in ("naive", "r2"):
+        ref = inverse_visibility(dem, weights, engine=engine, **kwargs)
+        res, mat = inverse_visibility(dem, weights, engine=engine,
+                                      return_matrix=True, **kwargs)
+        assert np.allclose(res.obs_counts, ref.obs_counts)
+        assert np.array_equal(res.tgt_counts, ref.tgt_counts)
+        assert np.array_equal(res.tgt_possible_counts, ref.tgt_possible_counts)
+        assert np.allclose(res.tgt_active_ratio, ref.tgt_active_ratio)
+        # only observers that see something get a row
+        assert mat.n_observers == int((ref.obs_counts > 0).sum())
+        assert mat.nbytes == mat.n_observers * 8 * ((mat.n_targets + 63) // 64)
+
+    with pytest.raises(ValueError):
+        inverse_visibility(dem, weights, obs_h=1.0, tgt_h=1.0,
+                           weight_by_cell=True, symmetric=True,
+                           return_matrix=True)
+
+
+def test_default_counts_do_not_depend_on_return_matrix(terrain):
+    # targets that are also observers, at the same height: the pairs are
+    # still traced from the target unless symmetric=True is asked for
+    dem = DEM(terrain())
+    target_mask = np.random.default_rng(4).random(dem.array.shape) < 0.2
+    ref = inverse_visibility(dem, target_mask, obs_h=2.0, tgt_h=2.0)
+    res, _ = inverse_visibility(dem, target_mask, obs_h=2.0, tgt_h=2.0,
+                                return_matrix=True)
+    for field in ref._fields:
+        assert np.array_equal(getattr(res, field), getattr(ref, field))
+
+
+def test_matrix_set_operations():
+    rng = np.random.default_rng(3)
+    visible = rng.random((40, 150)) < 0.2
+    observers = np.argwhere(np.ones((5, 8), bool))
+    targets = np.argwhere(np.ones((10, 15), bool))
+    weights = rng.random(150)
+    mat = VisibilityMatrix.from_dense(observers, targets, visible, weights,
+                                      drop_empty=False)
+    assert np.array_equal(mat.to_dense(), visible)
+    assert np.array_equal(mat.row_counts(), visible.sum(axis=1))
+    assert np.allclose(mat.row_counts(weighted=True), visible @ weights)
+    assert np.array_equal(mat.col_counts(), visible.sum(axis=0))
+
+    rows = [1, 7, 20]
+    assert np.array_equal(mat.unpack(mat.union(rows)), visible[rows].any(axis=0))
+    assert np.array_equal(mat.unpack(mat.intersection(rows)),
+                          visible[rows].all(axis=0))
+    assert mat.unpack(mat.intersection([])).all()
+    assert mat.coverage(rows, weighted=False) == visible[rows].any(axis=0).sum()
+    assert mat.coverage(rows) == pytest.approx(
+        weights[visible[rows].any(axis=0)].sum())
+    assert list(mat.rows_of([(0, 1), (4, 7), (9, 9)])) == [1, 39, -1]
+
+
+def test_matrix_save_load_and_siting(tmp_path, terrain):
+    dem, weights, kwargs = _matrix(terrain)
+    _, mat = inverse_visibility(dem, weights, return_matrix=True, **kwargs)
+
+    for path in (str(tmp_path / "vm.npz"), str(tmp_path / "vm")):
+        mat.save(path)
+        back = VisibilityMatrix.load(path, mmap_mode="r")
+        assert np.array_equal(back.bits, mat.bits)
+        assert np.array_equal(back.observers, mat.observers)
+        assert np.allclose(back.weights, mat.weights)
+        assert back.shape == mat.shape
+    assert isinstance(back.bits, np.memmap)
+
+    site = greedy_sites(mat.to_signatures(), 3)
+    rows = mat.rows_of(site.sites)
+    assert (rows >= 0).all()
+    assert site.coverage[-1] == pytest.approx(mat.coverage(rows))